@@ -0,0 +1,130 @@
+"""
+WCS 类别权重检验: 置换重要性 + 类别剔除
+与 regress_weights.py 使用同一份按对局百分位化的特征矩阵和同样的按 matchId 分组切分，
+对照 SHAP 推导出的类别权重 (wcs_shap_analysis.json)，输出各方法的权重与跨重复的波动
+
+使用: pixi run ablation  (或 python scripts/ablation.py wcs_raw_data.json)
+      --repeats 每折每个特征的置换次数 (默认 5)
+      --workers / --threads 并行任务数与每个模型的线程数 (默认按 CPU 核数切分)
+      --params wcs_hyperparam_search.json 使用超参搜索的最优配置
+      --profile 记录各阶段耗时/内存到 wcs_ablation.profile.json
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+from ba_analysis import pipeline
+from ba_analysis.ablation import DEFAULT_REPEATS, ablation, normalized
+from ba_analysis.pipeline import CATEGORIES, CV_FOLDS, CV_SPLIT, MODEL_PARAMS
+from ba_analysis.profiling import add_profile_args, profile_path, profiler_from_args
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WCS 类别权重检验 (置换重要性 + 类别剔除)')
+    parser.add_argument('data', nargs='?', default='wcs_raw_data.json', help='wcs_raw_data.json 路径')
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS,
+                        help=f'每折每个特征/类别的置换次数 (默认 {DEFAULT_REPEATS})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='并行训练任务数 (默认按 CPU 核数)；1 = 当前进程内顺序执行')
+    parser.add_argument('--threads', type=int, default=None, help='每个 XGBoost 模型的线程数')
+    parser.add_argument('--params', default=None, help='从超参搜索排行榜 JSON 读取最优超参')
+    parser.add_argument('--seed', type=int, default=0, help='折切分与置换的随机种子')
+    add_profile_args(parser)
+    args = parser.parse_args()
+
+    prof = profiler_from_args(args)
+    out_path = analyze(args, prof)
+    prof.report()
+    saved = prof.save(profile_path(out_path), script='ablation', args=vars(args))
+    if saved:
+        print(f"  ⏱️ 阶段 profile 已保存到 {saved}")
+
+
+def shap_weights(data_path):
+    """上次 regress_weights.py 输出的类别权重，没有时返回 None"""
+    path = Path(data_path).parent / 'wcs_shap_analysis.json'
+    if not path.exists():
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).get('category_weights')
+
+
+def analyze(args, prof):
+    data_path = pipeline.resolve_data_path(args.data)
+    params = MODEL_PARAMS
+    if args.params:
+        with open(args.params, 'r', encoding='utf-8') as f:
+            params = json.load(f)['best_params']
+
+    prof.stage('load')
+    ds = pipeline.load(data_path)
+    prof.stage('rank', rows=len(ds))
+    feats = pipeline.rank(pipeline.prepare(ds))
+
+    n_tasks = CV_FOLDS * (1 + len(CATEGORIES))
+    prof.stage('ablation', rows=len(feats.y), features=len(feats.names), tasks=n_tasks)
+    print(f"\n{'='*70}")
+    print(f"🧪 置换重要性 + 类别剔除 (按 matchId 分组 {CV_FOLDS} 折, 每折置换 {args.repeats} 次)")
+    print(f"{'='*70}")
+    res = ablation(feats.X, feats.y, feats.groups, feats.names, CATEGORIES, params, CV_FOLDS,
+                   args.repeats, workers=args.workers, threads=args.threads, seed=args.seed)
+    prof.note(workers=res.workers, threads=res.threads)
+    print(f"  基线: log-loss {res.baseline_logloss.mean():.4f}  准确率 {res.baseline_accuracy.mean():.4f} "
+          f"(±{res.baseline_accuracy.std():.4f})")
+    print(f"  并行: {res.workers} 进程 × {res.threads} 线程, {n_tasks} 次训练, 墙钟 {res.wall_s:.2f}s")
+
+    prof.stage('report')
+    print(f"\n  置换重要性 (Δlog-loss，均值 ± 标准差，{len(res.perm_feature.values)} 次重复):")
+    order = np.argsort(-res.perm_feature.mean, kind='stable')
+    for j in order:
+        print(f"    {res.names[j]:22s}: {res.perm_feature.mean[j]:+.4f} ± {res.perm_feature.std[j]:.4f}  "
+              f"(Δ准确率 {res.perm_feature_acc.mean[j]:+.4f})")
+
+    perm_w = normalized(res.perm_category.mean)
+    drop_w = normalized(res.drop_category.mean)
+    shap_w = shap_weights(data_path) or {}
+    print(f"\n  类别权重对照 (置换/剔除按 Δlog-loss 归一化，负值记 0):")
+    print(f"    {'类别':10s}  {'SHAP':>6s}  {'置换':>6s}  {'置换 Δ':>16s}  {'剔除':>6s}  {'剔除 Δ':>16s}")
+    for c, cat in enumerate(res.categories):
+        s = shap_w.get(cat)
+        print(f"    {cat:10s}  {(f'{s:.3f}' if s is not None else '-'):>6s}  {perm_w[c]:6.3f}  "
+              f"{res.perm_category.mean[c]:+.4f} ± {res.perm_category.std[c]:.4f}  {drop_w[c]:6.3f}  "
+              f"{res.drop_category.mean[c]:+.4f} ± {res.drop_category.std[c]:.4f}")
+
+    def spread_json(sp, keys):
+        return {k: {'mean': float(m), 'std': float(s)} for k, m, s in zip(keys, sp.mean, sp.std)}
+
+    result = {
+        'method': 'permutation importance + drop-category ablation',
+        'cv_folds': CV_FOLDS,
+        'cv_split': CV_SPLIT,
+        'repeats': args.repeats,
+        'model_params': params,
+        'baseline': {
+            'logloss': float(res.baseline_logloss.mean()),
+            'accuracy': float(res.baseline_accuracy.mean()),
+            'accuracy_std': float(res.baseline_accuracy.std()),
+        },
+        'permutation_importance': spread_json(res.perm_feature, res.names),
+        'permutation_accuracy_drop': spread_json(res.perm_feature_acc, res.names),
+        'category_permutation': spread_json(res.perm_category, res.categories),
+        'category_drop': spread_json(res.drop_category, res.categories),
+        'category_drop_accuracy': spread_json(res.drop_category_acc, res.categories),
+        'category_weights': {
+            'shap': shap_w or None,
+            'permutation': {cat: float(w) for cat, w in zip(res.categories, perm_w)},
+            'drop': {cat: float(w) for cat, w in zip(res.categories, drop_w)},
+        },
+        'wall_s': res.wall_s,
+    }
+    out_path = Path(data_path).parent / 'wcs_ablation.json'
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 结果已保存到 {out_path}")
+    return out_path
+
+
+if __name__ == '__main__':
+    main()
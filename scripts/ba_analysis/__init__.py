@@ -0,0 +1,10 @@
+"""
+断箭 WCS 分析公共模块
+regress_weights.py / team_effect.py 等脚本共用的计算引擎
+训练管线的分阶段 API 见 ba_analysis.pipeline (xgboost / shap 在用到时才 import)
+"""
+from .cache import load_cached_dataset
+from .dataset import WcsDataset, load_dataset
+from .ranking import match_percentile
+
+__all__ = ['WcsDataset', 'load_cached_dataset', 'load_dataset', 'match_percentile']
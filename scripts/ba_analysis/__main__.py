@@ -0,0 +1,538 @@
+"""
+命令行入口: python -m ba_analysis <命令>   (在 scripts/ 目录下运行)
+
+    info          数据集概况 (行数 / 对局 / 玩家 / 特征 / 缓存键)
+    categories    用缓存的 SHAP 统计重新汇总类别权重，可用 --categories 指定新的分类 JSON
+                  (不 import xgboost / shap，秒级完成)
+    predict       用导出的节点表 (regress_weights.py --export-model) 计算每行获胜概率，不 import xgboost
+    percentiles   构建各特征的总体百分位断点表 (wcs_percentiles.json，前端与 Python 评分共用)，
+                  --update 把新数据文件合并进已保存的分位数草图，不必重扫旧数据
+    player        某玩家的出场记录 / 与其他玩家的共同对局 (查持久化的玩家对局索引，不扫描数据集)
+    wcs           按前端 processFinalData 的公式给数据集每一行打 WCS 分 (向量化)，输出玩家分布 / 排行榜 / 等级，
+                  --percentiles 改用总体断点表的百分位 (同前端 CONFIG.PERCENTILE_TABLE_URL)，
+                  --parity N 用 node 运行前端代码对 N 场缓存的对局详情逐人比对
+    weights       批量评估候选六维权重 (网格 / 单纯形抽样 / 交叉熵优化，一次矩阵乘法打分)，
+                  按 AUC / 局内胜方一致率 / ratingDelta 相关求 Pareto 前沿并给出折中推荐；
+                  前沿在训练对局上选，当前 / 推荐权重的指标在按对局留出的一折上报告
+    merge         合并多份采集结果 (文件或目录，已有的 --out 文件也参与合并)，按 (matchId, playerId) 去重保留 collectedAt 最新的行，
+                  各文件在进程池中并行解析
+    units         从采集缓存的对局详情展平 UnitData 为列式单位表 (增量追加)，报告按玩家聚合的兵种构成特征
+    regress       同 regress_weights.py (其余参数原样透传)
+    team-effect   同 team_effect.py
+"""
+import argparse
+import json
+import runpy
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from . import pipeline
+from .artifacts import load_artifacts, models_dir
+from .cache import CACHE_DIR_NAME, default_cache_dir, source_digest
+from .wcs_config import DEFAULT_CONFIG
+
+_SCRIPTS = {
+    'regress': 'regress_weights.py',
+    'team-effect': 'team_effect.py',
+}
+
+
+def _run_script(name, argv):
+    path = Path(__file__).resolve().parent.parent / _SCRIPTS[name]
+    sys.argv = [str(path)] + argv
+    runpy.run_path(str(path), run_name='__main__')
+
+
+def cmd_info(args):
+    data_path = pipeline.resolve_data_path(args.data)
+    ds = pipeline.load(data_path)
+    feats = pipeline.prepare(ds)
+    print(f"  数据: {data_path}")
+    print(f"  采集时间: {ds.metadata.get('collectedAt')}")
+    print(f"  行数: {len(ds)}  |  对局: {len(ds.match_ids)}  |  "
+          f"玩家: {len(set(ds.columns['playerId'].tolist()))}")
+    print(f"  isWin 修正: {ds.fixed} 条")
+    print(f"  特征 ({len(feats.names)}): {', '.join(feats.names)}")
+
+
+def cmd_categories(args):
+    data_path = pipeline.resolve_data_path(args.data)
+    categories = pipeline.CATEGORIES
+    if args.categories:
+        with open(args.categories, 'r', encoding='utf-8') as f:
+            categories = json.load(f)
+
+    feats = pipeline.rank(pipeline.prepare(pipeline.load(data_path)))
+    shap_mode = {'memory_mb': args.shap_memory_mb, 'plot_sample': args.plot_sample} \
+        if args.shap_memory_mb is not None else None
+    key = pipeline.cache_key(feats, shap_mode=shap_mode)
+    art = load_artifacts(models_dir(data_path), key)
+    if art is None:
+        print(f"  ⚠️ 没有与当前数据/特征/超参匹配的缓存 ({key})，请先运行 regress_weights.py")
+        return 1
+
+    agg = pipeline.aggregate(feats.names, art['shap_stats'], categories)
+    unassigned = [f for f in feats.names if not any(f in fs for fs in categories.values())]
+    print(f"\n  类别权重 (缓存 {key}，留 {pipeline.WIN_BONUS:.0%} 给 winBonus):")
+    for cat in sorted(agg.categories, key=lambda c: -agg.categories[c]['total']):
+        w = agg.categories[cat]['total'] / agg.total if agg.total > 0 else 0
+        print(f"    {cat:12s}: {w:.4f}  (WCS {w * (1 - pipeline.WIN_BONUS):.4f})")
+    if unassigned:
+        print(f"  ⚠️ 未归类特征: {', '.join(unassigned)}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump({cat: float(info['total'] / agg.total) for cat, info in agg.categories.items()},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 已保存到 {args.out}")
+    return 0
+
+
+def cmd_predict(args):
+    from .forest import Forest
+
+    data_path = pipeline.resolve_data_path(args.data)
+    forest = Forest.load(args.model)
+    feats = pipeline.rank(pipeline.prepare(pipeline.load(data_path)), drop_constant=False)
+    missing = [f for f in forest.features if f not in feats.names]
+    if missing:
+        print(f"  ⚠️ 数据缺少模型特征: {', '.join(missing)}")
+        return 1
+    feats = pipeline.select(feats, forest.features)
+    proba = forest.predict_proba(feats.X)
+    acc = float(np.mean((proba > 0.5) == feats.y))
+    print(f"  模型: {args.model} ({forest.n_trees} 棵树)  |  {len(proba)} 行  |  准确率 (训练数据) {acc:.4f}")
+    if args.out:
+        ds = pipeline.load(data_path)
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump([{'matchId': ds.match_ids[int(m)], 'playerId': int(p), 'win_prob': round(float(v), 4)}
+                       for m, p, v in zip(ds.match_code, ds.columns['playerId'], proba)],
+                      f, indent=2, ensure_ascii=False)
+        print(f"✅ 已保存到 {args.out}")
+    return 0
+
+
+def cmd_percentiles(args):
+    from .quantiles import PercentileTable, load_sketches, save_sketches, sketch_dataset
+
+    out = Path(args.out)
+    state_path = Path(args.state) if args.state else out.resolve().parent / CACHE_DIR_NAME / f'{out.stem}.sketch.npz'
+    sketches, meta = load_sketches(state_path) if args.update else ({}, {})
+    sources = meta.get('sources', [])
+
+    for data in args.data:
+        data_path = pipeline.resolve_data_path(data)
+        ds = pipeline.load(data_path)
+        digest = source_digest(data_path, default_cache_dir(data_path))
+        if digest in sources:
+            print(f"  ⏭️ {data_path} 已合并过，跳过")
+            continue
+        names = [k for k in ds.fields if k not in pipeline.EXCLUDE_FIELDS]
+        sketches = sketch_dataset(ds, names, sketches, k=args.k)
+        sources.append(digest)
+        print(f"  + {data_path}: {len(ds)} 行")
+
+    if not sketches:
+        print("  ⚠️ 没有可用数据")
+        return 1
+    meta = {'sources': sources}
+    save_sketches(state_path, sketches, meta)
+    table = PercentileTable.from_sketches(sketches, args.max_points, {'k': args.k, **meta})
+    table.save(out)
+    exact = sum(1 for s in sketches.values() if len(s.levels) == 1)
+    points = sum(len(t.values) for t in table.tables.values())
+    print(f"\n  参考总体 {table.n} 行  |  {len(table.tables)} 个特征 (精确 {exact})  |  共 {points} 个断点")
+    print(f"✅ 已保存到 {out} (草图状态 {state_path})")
+    return 0
+
+
+def cmd_player(args):
+    from .match_index import open_match_index
+
+    data_path = pipeline.resolve_data_path(args.data)
+    ds = pipeline.load(data_path)
+    idx, status = open_match_index(ds, data_path, rebuild=args.rebuild_index)
+    print(f"  索引: {status}  |  玩家 {len(idx.player_ids)}  |  对局 {len(ds.match_ids)}")
+
+    rows = idx.rows_of(args.player)
+    if len(rows) == 0:
+        print(f"  ⚠️ 数据中没有玩家 {args.player}")
+        return 1
+    win = np.asarray(ds.columns['isWin'])
+    wins = int(win[rows].sum())
+    print(f"\n  玩家 {args.player}: {len(rows)} 局, 胜 {wins}, 胜率 {wins / len(rows) * 100:.1f}%")
+    for r in rows[-args.last:]:
+        mc = int(ds.match_code[r])
+        print(f"    {ds.match_ids[mc]}  {'胜' if win[r] else '负'}  队伍 {int(ds.columns['teamId'][r])}  "
+              f"同队 {len(idx.side(mc, ds.columns['teamId'][r])) - 1} 人")
+
+    for other in args.with_players:
+        matches, ra, _, same = idx.shared(args.player, other)
+        together, opposed = int(same.sum()), int((~same).sum())
+        tw = int(win[ra[same]].sum())
+        ow = int(win[ra[~same]].sum())
+        print(f"\n  与 {other}: 共同对局 {len(matches)}  |  同队 {together} 局 (胜 {tw})  |  对阵 {opposed} 局 (胜 {ow})")
+    return 0
+
+
+def cmd_wcs(args):
+    from .wcs_config import load_wcs_levels, load_wcs_weights
+    from .wcs_score import (DIM_KEYS, WCS_DIMENSIONS, category_scores, level_index, parity_check, player_summary,
+                            unit_type_counts, wcs_scores, win_scores)
+
+    data_path = pipeline.resolve_data_path(args.data)
+    weights, levels = load_wcs_weights(args.config), load_wcs_levels(args.config)
+    if args.parity:
+        from .collector import RESPONSES_DIR_NAME
+        matches_dir = Path(args.matches_dir) if args.matches_dir else \
+            default_cache_dir(data_path) / RESPONSES_DIR_NAME / 'matches'
+        files = sorted(matches_dir.glob('*.json'))[:args.parity]
+        if not files:
+            print(f"  ⚠️ {matches_dir} 中没有对局详情 (先运行 pixi run collect)")
+            return 1
+        matches = []
+        for path in files:
+            with open(path, 'r', encoding='utf-8') as f:
+                matches.append((path.stem, json.load(f)))
+        n, dim_err, wcs_err, win_diff = parity_check(matches, weights)
+        print(f"  与前端比对: {len(matches)} 局 {n} 人  |  六维分最大误差 {dim_err:.2e}  |  WCS 最大误差 {wcs_err:.2e}  "
+              f"|  胜负判定不同 {win_diff} 人")
+        return 0 if n and max(dim_err, wcs_err) < 1e-6 else 1
+
+    ds = pipeline.load(data_path)
+    unit_types = None
+    if args.units:
+        from .units import open_unit_table
+        table, status = open_unit_table(data_path)
+        unit_types, covered = unit_type_counts(ds, table)
+        print(f"  单位表 ({status}): 兵种数覆盖 {covered}/{len(ds)} 行，其余沿用 uniqueUnits")
+    reference = None
+    if args.percentiles:
+        from .quantiles import PercentileTable
+        reference = PercentileTable.load(args.percentiles)
+        used = [f for fs in WCS_DIMENSIONS.values() for f in fs if f in reference.tables]
+        print(f"  总体百分位: {args.percentiles} (参考 {reference.n} 行)，{len(used)} 个指标改用断点表，其余按局内百分位")
+    C = category_scores(ds, unit_types, reference)
+    win = win_scores(ds)
+    wcs = wcs_scores(C, win, weights)
+    players = player_summary(ds.columns['playerId'], wcs, C, win)
+    level_keys = [k for _, k in levels]
+
+    def tiers(scores):
+        counts = np.bincount(level_index(scores, levels), minlength=len(levels))
+        return '  '.join(f"{k} {c}" for k, c in zip(level_keys, counts))
+
+    q = np.percentile(wcs, [10, 50, 90])
+    print(f"  {len(ds)} 行 / {len(ds.match_ids)} 局 / {len(players.player_ids)} 名玩家")
+    print(f"  单局 WCS: 均值 {wcs.mean():.1f}  P10 {q[0]:.1f}  中位数 {q[1]:.1f}  P90 {q[2]:.1f}")
+    print(f"  单局等级: {tiers(wcs)}")
+    print(f"  六维均值: " + '  '.join(f"{k} {v:.1f}" for k, v in zip(DIM_KEYS, C.mean(axis=0))))
+
+    keep = np.flatnonzero(players.matches >= args.min_matches)
+    keep = keep[np.lexsort((players.player_ids[keep], -players.mean[keep]))]
+    print(f"\n  玩家等级 (≥ {args.min_matches} 局, {len(keep)} 人): {tiers(players.mean[keep])}")
+    print(f"\n  {'#':>3s}  {'玩家':>10s}  {'局数':>4s}  {'WCS':>6s}  {'±':>5s}  {'中位数':>6s}  {'胜率':>5s}  等级")
+    lv = level_index(players.mean, levels)
+    for rank, i in enumerate(keep[:args.top], 1):
+        print(f"  {rank:3d}  {players.player_ids[i]:10d}  {players.matches[i]:4d}  {players.mean[i]:6.1f}  "
+              f"{players.std[i]:5.1f}  {players.median[i]:6.1f}  {players.win_rate[i] * 100:4.0f}%  {level_keys[lv[i]]}")
+
+    if args.out:
+        result = {
+            'weights': weights,
+            'levels': [{'min': m, 'key': k} for m, k in levels],
+            'min_matches': args.min_matches,
+            'players': [{
+                'playerId': int(players.player_ids[i]),
+                'matches': int(players.matches[i]),
+                'wcs': round(float(players.mean[i]), 2),
+                'std': round(float(players.std[i]), 2),
+                'p10': round(float(players.p10[i]), 2),
+                'median': round(float(players.median[i]), 2),
+                'p90': round(float(players.p90[i]), 2),
+                'level': level_keys[lv[i]],
+                'winRate': round(float(players.win_rate[i]), 4),
+                'breakdown': {k: round(float(v), 2) for k, v in zip(DIM_KEYS, players.breakdown[i])},
+            } for i in keep],
+        }
+        if args.rows:
+            row_lv = level_index(wcs, levels)
+            result['rows'] = [{
+                'matchId': ds.match_ids[int(m)], 'playerId': int(p), 'wcs': round(float(s), 2),
+                'level': level_keys[row_lv[r]],
+                'breakdown': {k: round(float(v), 2) for k, v in zip(DIM_KEYS, C[r])},
+            } for r, (m, p, s) in enumerate(zip(ds.match_code, ds.columns['playerId'], wcs))]
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 已保存到 {args.out}")
+    return 0
+
+
+def cmd_weights(args):
+    from .wcs_config import load_wcs_weights
+    from .wcs_score import DIM_KEYS, category_scores, unit_type_counts, weight_vector
+    from .weight_eval import (OBJECTIVES, Evaluation, evaluate, grid_candidates, knee, optimize, pareto_front,
+                              simplex_candidates)
+
+    data_path = pipeline.resolve_data_path(args.data)
+    weights = load_wcs_weights(args.config)
+    ds = pipeline.load(data_path)
+    unit_types = None
+    if args.units:
+        from .units import open_unit_table
+        table, status = open_unit_table(data_path)
+        unit_types, covered = unit_type_counts(ds, table)
+        print(f"  单位表 ({status}): 兵种数覆盖 {covered}/{len(ds)} 行，其余沿用 uniqueUnits")
+    C = category_scores(ds, unit_types)
+    y, groups, rating = ds.columns['isWin'], ds.match_code, ds.columns['ratingDelta']
+
+    # 按对局留出一折: 候选的前沿与推荐只在训练对局上选，指标在留出对局上报告 (同一批行既挑又评会偏乐观)
+    train = np.arange(len(ds))
+    test = None
+    if args.holdout:
+        from .cv import group_folds
+        test = group_folds(groups, args.holdout, seed=args.seed)[0]
+        train = np.setdiff1d(train, test)
+        print(f"  留出 1/{args.holdout} 的对局: 训练 {len(np.unique(groups[train]))} 局 {len(train)} 行  |  "
+              f"留出 {len(np.unique(groups[test]))} 局 {len(test)} 行")
+    Ct, yt, gt, rt = C[train], y[train], groups[train], rating[train]
+
+    t0 = time.perf_counter()
+    w_ref, bonus = weight_vector(weights)
+    ref = evaluate(Ct, yt, gt, rt, w_ref[None, :])
+    parts = [ref]
+    if args.grid:
+        parts.append(evaluate(Ct, yt, gt, rt, grid_candidates(args.grid), memory_mb=args.memory_mb))
+    if args.simplex:
+        parts.append(evaluate(Ct, yt, gt, rt, simplex_candidates(args.simplex, seed=args.seed),
+                              memory_mb=args.memory_mb))
+    if args.optimize:
+        parts.append(optimize(Ct, yt, gt, rt, objective=args.objective, rounds=args.optimize,
+                              seed=args.seed, memory_mb=args.memory_mb))
+    # 下标 0 是当前权重
+    ev = Evaluation(weights=np.concatenate([e.weights for e in parts]),
+                    **{k: np.concatenate([getattr(e, k) for e in parts]) for k in OBJECTIVES})
+    F = ev.objectives()
+    front = pareto_front(F)
+    front = front[np.argsort(-ev.auc[front], kind='stable')]
+    best = knee(F, front)
+    print(f"  {len(ds)} 行 / {len(ds.match_ids)} 局  |  评估 {len(ev.weights) - 1} 个候选, "
+          f"{time.perf_counter() - t0:.2f}s  |  Pareto 前沿 {len(front)} 个")
+
+    # 当前权重与前沿在留出对局上的指标 (下标与 ev 对齐，其余为 NaN)
+    held = None
+    if test is not None:
+        idx = np.concatenate([[0], front])
+        part = evaluate(C[test], y[test], groups[test], rating[test], ev.weights[idx])
+        held = {k: np.full(len(ev.weights), np.nan) for k in OBJECTIVES}
+        for k in OBJECTIVES:
+            held[k][idx] = getattr(part, k)
+
+    def show(tag, i):
+        w = '  '.join(f"{k} {v:.2f}" for k, v in zip(DIM_KEYS, ev.weights[i]))
+        out = f"  {tag:>4s}  {ev.auc[i]:.4f}  {ev.agreement[i]:.4f}  {ev.corr[i]:+.4f}"
+        if held is not None:
+            out += f"  |  {held['auc'][i]:.4f}  {held['agreement'][i]:.4f}  {held['corr'][i]:+.4f}"
+        print(f"{out}  {w}")
+
+    header = f"  {'':>4s}  {'AUC':>6s}  {'一致率':>4s}  {'相关':>7s}"
+    if held is not None:
+        header = f"  {'':>4s}  {'训练对局':^24s}  |  {'留出对局':^24s}\n" + header + f"  |  {'AUC':>6s}  {'一致率':>4s}  {'相关':>7s}"
+    print(f"\n{header}  六维权重 (和为 1，不含 winBonus)")
+    show('当前', 0)
+    print(f"  当前权重{'位于' if 0 in front else '被支配，不在'} (训练对局的) Pareto 前沿")
+    for rank, i in enumerate(front[:args.top], 1):
+        show(f"#{rank}", i)
+    show('推荐', best)
+    if held is not None:
+        better = [k for k in OBJECTIVES if held[k][best] > held[k][0]]
+        print(f"\n  留出对局上推荐权重优于当前的指标: {', '.join(better) if better else '无'}"
+              f"{'' if len(better) == len(OBJECTIVES) else ' (未全面占优，谨慎替换)'}")
+    else:
+        print(f"\n  ⚠️ 未留出对局 (--holdout 0)，以上指标都是样本内的，推荐结果偏乐观")
+
+    # 推荐权重按当前 winBonus 缩放回 WCS_WEIGHTS 的格式
+    recommended = {k: round(float(v) * (1 - bonus), 4) for k, v in zip(DIM_KEYS, ev.weights[best])}
+    recommended['winBonus'] = bonus
+    print(f"\n  推荐 WCS_WEIGHTS: {json.dumps(recommended)}")
+
+    if args.out:
+        def entry(i):
+            e = {'weights': {k: round(float(v), 4) for k, v in zip(DIM_KEYS, ev.weights[i])},
+                 **{k: round(float(getattr(ev, k)[i]), 6) for k in OBJECTIVES}}
+            if held is not None:
+                e['holdout'] = {k: round(float(held[k][i]), 6) for k in OBJECTIVES}
+            return e
+
+        result = {
+            'candidates': len(ev.weights) - 1,
+            'holdout': {'folds': args.holdout, 'seed': args.seed,
+                        'matches': [ds.match_ids[int(m)] for m in np.unique(groups[test])]} if test is not None else None,
+            'current': {**entry(0), 'onFront': bool(0 in front)},
+            'recommended': {**entry(best), 'wcsWeights': recommended},
+            'front': [entry(i) for i in front],
+        }
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ 已保存到 {args.out}")
+    return 0
+
+
+def cmd_merge(args):
+    from .ingest import dump_paths, merge_dumps, write_merged
+
+    out = Path(args.out)
+    # 已有的输出文件也作为输入 (write_merged 先写临时文件再替换，读写同一文件是安全的)，
+    # 否则覆盖时会丢掉其中不在本次输入里的行
+    paths = dump_paths(([out] if out.is_file() else []) + args.inputs)
+    if not paths:
+        print("  ⚠️ 没有找到采集结果文件")
+        return 1
+    res = merge_dumps(paths, workers=args.workers)
+    for path, reason in res.skipped:
+        print(f"  ⚠️ 跳过 {path}: {reason}")
+    if out.is_file() and any(Path(p).resolve() == out.resolve() for p, _ in res.skipped):
+        print(f"  ⚠️ 输出文件 {out} 无法作为数据集读取，未覆盖")
+        return 1
+    if not res.rows:
+        print("  ⚠️ 没有可合并的行，未写出文件")
+        return 1
+    out = write_merged(out, res)
+    meta = res.metadata
+    print(f"  {res.files} 个文件, {res.input_rows} 行 -> {meta['sampleCount']} 行 / {meta['matchCount']} 局 "
+          f"(去重 {res.duplicates} 行)  |  {res.workers} 进程, {res.wall_s:.2f}s")
+    print(f"✅ 已保存到 {out} (collectedAt {meta['collectedAt']})")
+    return 0
+
+
+def cmd_units(args):
+    from .units import UNIT_FEATURES, aggregate_units, open_unit_table, unit_columns
+
+    data_path = pipeline.resolve_data_path(args.data)
+    table, status = open_unit_table(data_path, rebuild=args.rebuild, matches_dir=args.matches_dir)
+    print(f"  单位表: {status}  |  {len(table)} 条单位记录  |  {len(table.match_ids)} 局  |  "
+          f"{table.n_owners} 个 (对局, 玩家)  |  兵种 {len(np.unique(table.unit_type))}")
+    if len(table) == 0:
+        print("  ⚠️ 没有缓存的对局详情 (先运行 pixi run collect)")
+        return 1
+
+    ds = pipeline.load(data_path)
+    agg = aggregate_units(table)
+    cols, covered = unit_columns(ds, table, agg)
+    print(f"  覆盖数据集 {covered}/{len(ds)} 行")
+    if covered:
+        hit = cols['unitDeployed'] > 0
+        win = np.asarray(ds.columns['isWin']).astype(bool)
+        print(f"\n  {'特征':20s}  {'胜方':>9s}  {'败方':>9s}  说明")
+        for name, desc in UNIT_FEATURES.items():
+            c = cols[name]
+            w = c[hit & win].mean() if (hit & win).any() else float('nan')
+            l = c[hit & ~win].mean() if (hit & ~win).any() else float('nan')
+            print(f"  {name:20s}  {w:9.3f}  {l:9.3f}  {desc}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump([{'matchId': table.match_ids[int(m)], 'playerId': int(p),
+                        **{name: round(float(agg[name][o]), 4) for name in UNIT_FEATURES}}
+                       for o, (m, p) in enumerate(zip(table.owner_match, table.owner_player))],
+                      f, indent=2, ensure_ascii=False)
+        print(f"✅ 已保存到 {args.out}")
+    return 0
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # regress / team-effect 的参数交给对应脚本解析
+    if argv and argv[0] in _SCRIPTS:
+        return _run_script(argv[0], argv[1:])
+
+    parser = argparse.ArgumentParser(prog='python -m ba_analysis', description='断箭 WCS 分析工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, script in _SCRIPTS.items():
+        sub.add_parser(name, help=f'运行 {script} (参数原样透传)', add_help=False)
+
+    p = sub.add_parser('info', help='数据集概况')
+    p.add_argument('data', nargs='?', default='wcs_raw_data.json')
+    p.set_defaults(func=cmd_info)
+
+    p = sub.add_parser('categories', help='用缓存的 SHAP 统计重新汇总类别权重')
+    p.add_argument('data', nargs='?', default='wcs_raw_data.json')
+    p.add_argument('--categories', help='分类定义 JSON ({类别: [特征, ...]})，默认使用 pipeline.CATEGORIES')
+    p.add_argument('--shap-memory-mb', type=float, default=None, help='与训练时的分块 SHAP 设置一致')
+    p.add_argument('--plot-sample', type=int, default=2000)
+    p.add_argument('--out', help='把类别权重写入该 JSON')
+    p.set_defaults(func=cmd_categories)
+
+    p = sub.add_parser('player', help='玩家出场记录 / 共同对局')
+    p.add_argument('player', type=int)
+    p.add_argument('--with', dest='with_players', type=int, nargs='*', default=[], help='查询与这些玩家的共同对局')
+    p.add_argument('--last', type=int, default=10, help='列出最近多少局 (默认 10)')
+    p.add_argument('--rebuild-index', action='store_true', help='强制重建玩家对局索引')
+    p.add_argument('--data', default='wcs_raw_data.json')
+    p.set_defaults(func=cmd_player)
+
+    p = sub.add_parser('predict', help='用导出的节点表计算获胜概率')
+    p.add_argument('data', nargs='?', default='wcs_raw_data.json')
+    p.add_argument('--model', default='wcs_model.npz', help='节点表 (.npz 或 .json)')
+    p.add_argument('--out', help='把每行的获胜概率写入该 JSON')
+    p.set_defaults(func=cmd_predict)
+
+    p = sub.add_parser('percentiles', help='构建总体百分位断点表')
+    p.add_argument('data', nargs='*', default=['wcs_raw_data.json'])
+    p.add_argument('--out', default='wcs_percentiles.json', help='断点表 JSON (可放到 public/ 供前端加载)')
+    p.add_argument('--update', action='store_true', help='合并进已有的草图状态，已合并过的数据文件自动跳过')
+    p.add_argument('--state', help=f'草图状态文件 (默认 <out 目录>/{CACHE_DIR_NAME}/<out 名>.sketch.npz)')
+    p.add_argument('--k', type=int, default=2048, help='草图精度参数，秩误差约 1/k；行数不超过 k 时完全精确 (默认 2048)')
+    p.add_argument('--max-points', type=int, default=256, help='每个特征最多保留的断点数 (默认 256)')
+    p.set_defaults(func=cmd_percentiles)
+
+    p = sub.add_parser('wcs', help='批量 WCS 评分: 玩家分布 / 排行榜 / 等级')
+    p.add_argument('data', nargs='?', default='wcs_raw_data.json')
+    p.add_argument('--config', default=str(DEFAULT_CONFIG), help='读取 WCS_WEIGHTS / WCS_LEVELS 的 config.js')
+    p.add_argument('--units', action='store_true', help='uniqueUnits 改用单位表的兵种数 (与前端一致，需要缓存的对局详情)')
+    p.add_argument('--percentiles', help='总体百分位断点表 (percentiles 命令的输出)，给定时按总体而非局内百分位评分')
+    p.add_argument('--min-matches', type=int, default=3, help='进入排行榜的最少局数 (默认 3)')
+    p.add_argument('--top', type=int, default=20, help='打印排行榜前多少名 (默认 20)')
+    p.add_argument('--out', help='把玩家汇总写入该 JSON')
+    p.add_argument('--rows', action='store_true', help='--out 中同时写出每一行的 WCS 与六维分')
+    p.add_argument('--parity', type=int, default=0, metavar='N',
+                   help='不评分，改为用 node 运行前端代码对前 N 场缓存的对局详情逐人比对')
+    p.add_argument('--matches-dir', help='--parity 使用的对局详情目录 (默认 <数据目录>/.wcs_cache/responses/matches)')
+    p.set_defaults(func=cmd_wcs)
+
+    p = sub.add_parser('weights', help='批量评估候选六维权重，求 Pareto 前沿')
+    p.add_argument('data', nargs='?', default='wcs_raw_data.json')
+    p.add_argument('--config', default=str(DEFAULT_CONFIG), help='读取当前 WCS_WEIGHTS 的 config.js (作为对照)')
+    p.add_argument('--grid', type=int, default=0, metavar='M', help='步长 1/M 的单纯形网格 (M=20 约 5.3 万个)')
+    p.add_argument('--simplex', type=int, default=100000, metavar='N', help='单纯形均匀抽样数 (默认 100000，0 = 不抽样)')
+    p.add_argument('--optimize', type=int, default=0, metavar='ROUNDS', help='交叉熵优化轮数 (每轮 5000 个候选)')
+    p.add_argument('--objective', choices=['auc', 'agreement', 'corr'], default='auc', help='--optimize 挑选精英的指标')
+    p.add_argument('--units', action='store_true', help='uniqueUnits 改用单位表的兵种数')
+    p.add_argument('--holdout', type=int, default=5, metavar='K',
+                   help='按对局分 K 折，留出一折只用于报告指标 (默认 5；0 = 不留出，指标为样本内)')
+    p.add_argument('--seed', type=int, default=0, help='抽样 / 优化 / 留出划分的随机种子')
+    p.add_argument('--memory-mb', type=float, default=256, help='每块候选的临时内存上限 (默认 256)')
+    p.add_argument('--top', type=int, default=10, help='打印前沿中 AUC 最高的多少个 (默认 10)')
+    p.add_argument('--out', help='把前沿与推荐权重写入该 JSON')
+    p.set_defaults(func=cmd_weights)
+
+    p = sub.add_parser('merge', help='合并多份采集结果并按 (matchId, playerId) 去重')
+    p.add_argument('inputs', nargs='+', help='wcs_raw_data.json 结构的文件或包含它们的目录')
+    p.add_argument('--out', required=True, help='合并后的数据集；文件已存在时其中的行一并参与合并')
+    p.add_argument('--workers', type=int, default=None, help='并行解析的进程数 (默认按 CPU 核数)；1 = 当前进程内顺序执行')
+    p.set_defaults(func=cmd_merge)
+
+    p = sub.add_parser('units', help='UnitData 单位表 + 按玩家聚合的兵种构成特征')
+    p.add_argument('data', nargs='?', default='wcs_raw_data.json')
+    p.add_argument('--matches-dir', help='对局详情 JSON 目录 (默认 <数据目录>/.wcs_cache/responses/matches)')
+    p.add_argument('--rebuild', action='store_true', help='忽略已保存的单位表，重新展平全部对局')
+    p.add_argument('--out', help='把每个 (对局, 玩家) 的单位特征写入该 JSON')
+    p.set_defaults(func=cmd_units)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+置换重要性 + 类别剔除 (进程池并行 + 共享内存)
+
+用按对局分组的各折检验 SHAP 推导出的类别权重:
+    置换重要性  每折训练一次全特征模型，在验证折上逐个特征 / 逐个类别 (类别内各列同一置换)
+                打乱 n_repeats 次，记录 log-loss / 准确率的变化
+    类别剔除    每折 × 每个类别各训练一次去掉该类别全部特征的模型，与同折全特征模型比较
+
+任务 = (折, 类别或全特征)，共 n_folds × (1 + 类别数) 次训练，进程池并行；
+百分位矩阵 X_pct / y 只在主进程放入 SharedMemory 一次 (同 search.py)。
+每折的随机数由 (seed, 折) 决定，结果与并行度和调度顺序无关。
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .cv import group_folds, thread_split
+from .search import _attach, _logloss, _share
+
+DEFAULT_REPEATS = 5
+
+# worker 进程内挂载的共享数组
+_shared = {}
+
+
+@dataclass
+class Spread:
+    """重复 (折 × 置换次数) 上的均值 / 标准差；values 保留原始样本"""
+    mean: np.ndarray
+    std: np.ndarray
+    values: np.ndarray      # (重复数, K)
+
+
+@dataclass
+class AblationResult:
+    names: list
+    categories: list                # 类别名 (与 groups 顺序一致)
+    baseline_logloss: np.ndarray    # 每折全特征模型
+    baseline_accuracy: np.ndarray
+    perm_feature: Spread            # Δlog-loss (置换后 - 基线)，越大越重要
+    perm_feature_acc: Spread        # Δ准确率 (基线 - 置换后)
+    perm_category: Spread
+    drop_category: Spread           # Δlog-loss (剔除后 - 基线)
+    drop_category_acc: Spread
+    wall_s: float
+    workers: int
+    threads: int
+
+
+def _spread(values):
+    values = np.asarray(values, dtype=np.float64)
+    return Spread(mean=values.mean(axis=0), std=values.std(axis=0), values=values)
+
+
+def _init_worker(specs, folds):
+    for key, spec in specs.items():
+        _shared[key] = _attach(spec)
+    _shared['folds'] = (None, folds)
+
+
+def _fit_eval(X, y, test_idx, cols, params):
+    from xgboost import XGBClassifier
+
+    train_mask = np.ones(len(y), dtype=bool)
+    train_mask[test_idx] = False
+    model = XGBClassifier(**params).fit(X[train_mask][:, cols], y[train_mask])
+    X_val, y_val = X[test_idx][:, cols], y[test_idx]
+    proba = model.predict_proba(X_val)[:, 1]
+    return model, X_val, y_val, _logloss(y_val, proba), float(np.mean((proba > 0.5) == y_val))
+
+
+def _run_task(task):
+    fold, drop, groups, params, n_repeats, seed = task
+    X, y, folds = _shared['X'][1], _shared['y'][1], _shared['folds'][1]
+    test_idx = folds[fold]
+    t0 = time.perf_counter()
+
+    if drop is not None:
+        cols = np.setdiff1d(np.arange(X.shape[1]), groups[drop])
+        _, _, _, loss, acc = _fit_eval(X, y, test_idx, cols, params)
+        return {'fold': fold, 'drop': drop, 'logloss': loss, 'accuracy': acc,
+                'fit_s': time.perf_counter() - t0}
+
+    model, X_val, y_val, loss, acc = _fit_eval(X, y, test_idx, np.arange(X.shape[1]), params)
+    rng = np.random.default_rng([seed, fold])
+    n_feat = X.shape[1]
+    targets = [[j] for j in range(n_feat)] + [list(g) for g in groups]
+    d_loss = np.zeros((n_repeats, len(targets)))
+    d_acc = np.zeros((n_repeats, len(targets)))
+    for r in range(n_repeats):
+        perm = rng.permutation(len(y_val))
+        for t, cols in enumerate(targets):
+            if not cols:
+                continue
+            Xp = X_val.copy()
+            Xp[:, cols] = X_val[perm][:, cols]
+            proba = model.predict_proba(Xp)[:, 1]
+            d_loss[r, t] = _logloss(y_val, proba) - loss
+            d_acc[r, t] = acc - float(np.mean((proba > 0.5) == y_val))
+    return {'fold': fold, 'drop': None, 'logloss': loss, 'accuracy': acc,
+            'perm_loss': d_loss, 'perm_acc': d_acc, 'fit_s': time.perf_counter() - t0}
+
+
+def ablation(X, y, groups, names, categories, params, n_folds=5, n_repeats=DEFAULT_REPEATS,
+             workers=None, threads=None, seed=0):
+    """
+    categories: {类别: [特征, ...]}，不在 names 中的特征忽略
+    返回 AblationResult
+    """
+    y = np.asarray(y)
+    folds = group_folds(groups, n_folds, seed)
+    col_of = {f: i for i, f in enumerate(names)}
+    cat_names = list(categories)
+    cat_cols = [np.array([col_of[f] for f in categories[c] if f in col_of], dtype=np.int64) for c in cat_names]
+    params = {k: v for k, v in params.items() if k != 'use_label_encoder'}
+
+    jobs = [(k, None, cat_cols, params, n_repeats, seed) for k in range(n_folds)]
+    jobs += [(k, c, cat_cols, params, n_repeats, seed)
+             for c in range(len(cat_names)) if len(cat_cols[c]) for k in range(n_folds)]
+    workers, threads = thread_split(len(jobs), workers, threads)
+    params['n_jobs'] = threads
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        _shared.update(X=(None, X), y=(None, y), folds=(None, folds))
+        try:
+            results = [_run_task(job) for job in jobs]
+        finally:
+            _shared.clear()
+    else:
+        shms, specs = {}, {}
+        try:
+            for key, arr in (('X', X), ('y', y)):
+                shms[key], specs[key] = _share(arr)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(specs, folds)) as pool:
+                results = list(pool.map(_run_task, jobs))
+        finally:
+            for shm in shms.values():
+                shm.close()
+                shm.unlink()
+    wall = time.perf_counter() - t0
+
+    base = sorted((r for r in results if r['drop'] is None), key=lambda r: r['fold'])
+    base_loss = np.array([r['logloss'] for r in base])
+    base_acc = np.array([r['accuracy'] for r in base])
+    perm_loss = np.concatenate([r['perm_loss'] for r in base])
+    perm_acc = np.concatenate([r['perm_acc'] for r in base])
+    n_feat = len(names)
+
+    # 剔除: (折, 类别) 的 Δ，没有特征的类别记 0
+    drop_loss = np.zeros((n_folds, len(cat_names)))
+    drop_acc = np.zeros((n_folds, len(cat_names)))
+    for r in results:
+        if r['drop'] is not None:
+            drop_loss[r['fold'], r['drop']] = r['logloss'] - base_loss[r['fold']]
+            drop_acc[r['fold'], r['drop']] = base_acc[r['fold']] - r['accuracy']
+
+    return AblationResult(
+        names=list(names), categories=cat_names,
+        baseline_logloss=base_loss, baseline_accuracy=base_acc,
+        perm_feature=_spread(perm_loss[:, :n_feat]), perm_feature_acc=_spread(perm_acc[:, :n_feat]),
+        perm_category=_spread(perm_loss[:, n_feat:]),
+        drop_category=_spread(drop_loss), drop_category_acc=_spread(drop_acc),
+        wall_s=wall, workers=workers, threads=threads,
+    )
+
+
+def normalized(importance):
+    """负值 (打乱后反而更好) 视为 0，归一化为权重"""
+    v = np.clip(np.asarray(importance, dtype=np.float64), 0, None)
+    total = v.sum()
+    return v / total if total > 0 else np.zeros_like(v)
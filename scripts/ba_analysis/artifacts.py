@@ -0,0 +1,133 @@
+"""
+训练产物缓存 (模型 / CV 分数 / SHAP 矩阵)
+
+缓存键 = sha256(训练矩阵 X_pct + 标签 y + 特征列表 + 模型超参 + CV 折数 + xgboost/shap 版本)，
+只改报告或 CATEGORIES 分类时直接复用，不再重训、不再重算 SHAP，
+命中时也不需要 import xgboost / shap。
+
+目录结构:
+    <数据目录>/.wcs_cache/models/<key>/
+        model.ubj          xgboost 原生格式的 booster
+        cv_scores.npy
+        shap_stats.npz     SHAP 汇总统计 (ShapStats)
+        shap_values.npy    完整 SHAP 矩阵 (仅全量模式)，以 mmap 方式加载
+        shap_interactions.npy  上三角平均 |交互值| (首次 --interactions tree 时补写)
+        meta.json
+"""
+import hashlib
+import json
+import os
+import shutil
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+import numpy as np
+
+from .cache import default_cache_dir
+from .shap_stats import ShapStats
+
+MODELS_DIR_NAME = 'models'
+MODEL_FILE = 'model.ubj'
+META_FILE = 'meta.json'
+INTERACTIONS_FILE = 'shap_interactions.npy'
+
+
+def _lib_version(name):
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def models_dir(data_path):
+    return default_cache_dir(data_path) / MODELS_DIR_NAME
+
+
+def artifact_key(X, y, feature_names, params, **extra):
+    """训练输入 + 配置 -> 缓存键；extra 用于区分同一数据上的不同产物 (CV 折数等)"""
+    h = hashlib.sha256()
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    h.update(str(X.shape).encode())
+    h.update(X.tobytes())
+    h.update(np.ascontiguousarray(y, dtype=np.int64).tobytes())
+    h.update(json.dumps({
+        'features': list(feature_names),
+        'params': params,
+        'extra': extra,
+        'xgboost': _lib_version('xgboost'),
+        'shap': _lib_version('shap'),
+    }, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+def load_artifacts(root, key, mmap_mode='r'):
+    """
+    读取缓存产物，返回 dict (cv_scores / shap_stats / shap_values / interactions / model_path / meta)；
+    分块模式没有完整矩阵，shap_values 为 None；未算过交互值时 interactions 为 None；
+    未命中或不完整时返回 None
+    """
+    entry = Path(root) / key
+    try:
+        with open(entry / META_FILE, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        cv_scores = np.load(entry / 'cv_scores.npy')
+        stats = ShapStats.load(entry / 'shap_stats.npz')
+        shap_path = entry / 'shap_values.npy'
+        shap_values = np.load(shap_path, mmap_mode=mmap_mode) if shap_path.exists() else None
+        inter_path = entry / INTERACTIONS_FILE
+        interactions = np.load(inter_path) if inter_path.exists() else None
+    except (OSError, ValueError, KeyError):
+        return None
+    model_path = entry / MODEL_FILE
+    if not model_path.exists():
+        return None
+    return {
+        'cv_scores': cv_scores,
+        'shap_stats': stats,
+        'shap_values': shap_values,
+        'interactions': interactions,
+        'model_path': model_path,
+        'meta': meta,
+    }
+
+
+def save_artifacts(root, key, model, cv_scores, stats, shap_values=None, meta=None):
+    """写入缓存产物 (临时目录 + 原子改名)，返回目录路径"""
+    entry = Path(root) / key
+    tmp = entry.with_name(f'{key}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    model.save_model(tmp / MODEL_FILE)
+    np.save(tmp / 'cv_scores.npy', np.asarray(cv_scores, dtype=np.float64))
+    stats.save(tmp / 'shap_stats.npz')
+    if shap_values is not None:
+        np.save(tmp / 'shap_values.npy', np.asarray(shap_values))
+    with open(tmp / META_FILE, 'w', encoding='utf-8') as f:
+        json.dump(meta or {}, f, indent=2, ensure_ascii=False)
+
+    if entry.exists():
+        shutil.rmtree(entry, ignore_errors=True)
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return entry
+
+
+def save_interactions(root, key, interactions):
+    """向已有缓存条目补写交互强度 (先写临时文件再改名)"""
+    entry = Path(root) / key
+    if not entry.is_dir():
+        return
+    tmp = entry / f'{INTERACTIONS_FILE}.tmp-{os.getpid()}.npy'
+    np.save(tmp, np.asarray(interactions, dtype=np.float64))
+    os.replace(tmp, entry / INTERACTIONS_FILE)
+
+
+def load_model(model_path):
+    """从缓存加载 XGBClassifier (此时才 import xgboost)"""
+    from xgboost import XGBClassifier
+    model = XGBClassifier()
+    model.load_model(model_path)
+    return model
@@ -0,0 +1,218 @@
+"""
+对局级 bootstrap 置信区间 (向量化)
+
+配对效应、有我/没我影响、阵容协同都是 "按对局可加的计数" 之比:
+    玩家出场 / 胜场、配对同队局数 / 胜场、阵容同队局数 / 胜场
+把每种计数拆成稀疏贡献表 (对局, 列, 值)，对局重抽样权重 W (B × M，多项分布，每行和为 M) 下
+各列的重抽样计数 = W @ C。一批重抽样一次矩阵运算完成，
+总代价 ∝ B × 贡献条数 (≈ B × 对局数 × 每局条目数)，不随统计量个数相乘。
+
+同一对局的 10 名玩家整体进出重抽样，保留了队友/对手之间的相关性。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from .pairs import _match_pairs
+
+DEFAULT_REPLICATES = 2000
+# 单批 W[:, 对局] * 值 的元素上限，控制中间数组内存
+_CHUNK_CELLS = 1 << 24
+
+
+@dataclass
+class Table:
+    """稀疏贡献表: 第 k 条 = 对局 match[k] 给列 col[k] 贡献 values[k] (每列若干计数量)"""
+    match: np.ndarray     # (nnz,) 对局编号
+    col: np.ndarray       # (nnz,) 列号
+    values: np.ndarray    # (nnz, Q)
+    n_cols: int
+
+
+@dataclass
+class Interval:
+    """每个统计量的点估计、百分位置信区间与双侧 bootstrap p 值 (H0: 统计量 = 0)"""
+    estimate: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+    p_value: np.ndarray
+    valid: np.ndarray     # 分母非零的重抽样数
+
+
+def _sorted(table):
+    order = np.argsort(table.col, kind='stable')
+    col = table.col[order]
+    starts = np.flatnonzero(np.r_[True, col[1:] != col[:-1]]) if len(col) else np.zeros(0, np.int64)
+    return table.match[order], table.values[order].astype(np.float64), col[starts], starts
+
+
+def replicate_sums(tables, n_matches, n_replicates=DEFAULT_REPLICATES, seed=0):
+    """
+    所有贡献表在同一组对局重抽样权重下的计数
+    返回 [(B+1, n_cols, Q)]，第 0 行为原始数据 (权重全 1)，其余为 B 次重抽样
+    """
+    prepared = [_sorted(t) for t in tables]
+    out = [np.zeros((n_replicates + 1, t.n_cols, t.values.shape[1])) for t in tables]
+    for res, (match, values, cols, starts) in zip(out, prepared):
+        if len(match):
+            res[0, cols] = np.add.reduceat(values, starts, axis=0)
+
+    nnz = max(1, sum(len(p[0]) * p[1].shape[1] for p in prepared))
+    per_batch = max(1, _CHUNK_CELLS // nnz)
+    rng = np.random.default_rng(seed)
+    p = np.full(n_matches, 1.0 / n_matches)
+    for b0 in range(0, n_replicates, per_batch):
+        b1 = min(n_replicates, b0 + per_batch)
+        W = rng.multinomial(n_matches, p, size=b1 - b0).astype(np.float64)
+        for res, (match, values, cols, starts) in zip(out, prepared):
+            if len(match):
+                cell = W[:, match, None] * values[None]
+                res[1 + b0:1 + b1, cols] = np.add.reduceat(cell, starts, axis=1)
+    return out
+
+
+def interval(stat, alpha=0.05):
+    """
+    stat: (B+1, K)，第 0 行为点估计，NaN 表示该次重抽样中分母为 0
+    百分位区间 + 双侧 p 值 2 × min(P(θ* ≤ 0), P(θ* ≥ 0))，(计数+1)/(有效数+1) 修正
+    """
+    est, reps = stat[0], stat[1:]
+    ok = ~np.isnan(reps)
+    valid = ok.sum(axis=0)
+    low = np.full(stat.shape[1], np.nan)
+    high = np.full(stat.shape[1], np.nan)
+    has = valid > 0
+    if has.any():
+        low[has], high[has] = np.nanquantile(reps[:, has], [alpha / 2, 1 - alpha / 2], axis=0)
+    le = ((reps <= 0) & ok).sum(axis=0)
+    ge = ((reps >= 0) & ok).sum(axis=0)
+    p_value = np.minimum(1.0, 2 * (np.minimum(le, ge) + 1) / (valid + 1))
+    return Interval(estimate=est, low=low, high=high, p_value=p_value, valid=valid)
+
+
+def _ratio(num, den):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(den > 0, num / np.where(den > 0, den, 1), np.nan)
+
+
+def player_table(ds, pm, codes, player_code):
+    """
+    codes: 需要的玩家行号 (PairMatrix 编号)；player_code: 数据集每行的玩家行号
+    列 k = codes[k]，计数量 (出场, 胜场)
+    """
+    col_of = np.full(pm.n_players, -1, dtype=np.int64)
+    col_of[np.asarray(codes, dtype=np.int64)] = np.arange(len(codes))
+    rows = np.flatnonzero(col_of[player_code] >= 0)
+    win = np.asarray(ds.columns['isWin'], dtype=np.float64)[rows]
+    return Table(match=np.asarray(ds.match_code, dtype=np.int64)[rows], col=col_of[player_code[rows]],
+                 values=np.column_stack([np.ones(len(rows)), win]), n_cols=len(codes))
+
+
+def pair_table(ds, pm, nz, player_code):
+    """
+    nz: PairMatrix 非零元下标；列 k = nz[k] 这对玩家，计数量 (同队局数, 同队胜场)
+    """
+    col_of = np.full(len(pm.indices), -1, dtype=np.int64)
+    col_of[np.asarray(nz, dtype=np.int64)] = np.arange(len(nz))
+    team = np.asarray(ds.columns['teamId'], dtype=np.int64)
+    win = np.asarray(ds.columns['isWin'], dtype=np.float64)
+    match_code = np.asarray(ds.match_code, dtype=np.int64)
+    order, offsets = ds.match_groups()
+    parts = []
+    for a, b in _match_pairs(np.asarray(order, dtype=np.int64), np.asarray(offsets, dtype=np.int64)):
+        same = (team[a] == team[b]) & (player_code[a] != player_code[b])
+        a, b = a[same], b[same]
+        k = pm.lookup(player_code[a], player_code[b])
+        col = np.where(k >= 0, col_of[np.maximum(k, 0)], -1)
+        keep = col >= 0
+        parts.append((match_code[a[keep]], col[keep], win[a[keep]]))
+    match = np.concatenate([p[0] for p in parts]) if parts else np.zeros(0, np.int64)
+    col = np.concatenate([p[1] for p in parts]) if parts else np.zeros(0, np.int64)
+    w = np.concatenate([p[2] for p in parts]) if parts else np.zeros(0)
+    return Table(match=match, col=col, values=np.column_stack([np.ones(len(match)), w]), n_cols=len(nz))
+
+
+def lineup_table(ds, lineups, pm, player_code):
+    """
+    lineups: [行号元组]；列 k = 第 k 个阵容，计数量 (全员同队局数, 胜场)
+    代价 ∝ 阵容数 × 含被追踪玩家的对局侧数
+    """
+    members = sorted({c for combo in lineups for c in combo})
+    bit_of = np.full(pm.n_players, -1, dtype=np.int64)
+    bit_of[members] = np.arange(len(members))
+    rows = np.flatnonzero(bit_of[player_code] >= 0)
+    match_code = np.asarray(ds.match_code, dtype=np.int64)[rows]
+    team = np.asarray(ds.columns['teamId'], dtype=np.int64)[rows]
+    sides, side = np.unique(match_code * 256 + team, return_inverse=True)
+    side = side.reshape(-1)
+    present = np.zeros((len(sides), len(members)), dtype=bool)
+    present[side, bit_of[player_code[rows]]] = True
+    side_win = np.zeros(len(sides))
+    np.maximum.at(side_win, side, np.asarray(ds.columns['isWin'], dtype=np.float64)[rows])
+    side_match = sides // 256
+
+    match, col, w = [], [], []
+    for k, combo in enumerate(lineups):
+        hit = np.flatnonzero(present[:, bit_of[list(combo)]].all(axis=1))
+        match.append(side_match[hit])
+        col.append(np.full(len(hit), k, dtype=np.int64))
+        w.append(side_win[hit])
+    match = np.concatenate(match) if match else np.zeros(0, np.int64)
+    col = np.concatenate(col) if col else np.zeros(0, np.int64)
+    w = np.concatenate(w) if w else np.zeros(0)
+    return Table(match=match, col=col, values=np.column_stack([np.ones(len(match)), w]), n_cols=len(lineups))
+
+
+def team_effect_intervals(ds, pm, pairs=None, impacts=None, lineups=None,
+                          n_replicates=DEFAULT_REPLICATES, alpha=0.05, seed=0):
+    """
+    对局级 bootstrap 区间 (与 pairs.py 的点估计口径一致):
+        pairs    pair_effects() 的结果     -> 配对效应 = 同队胜率 - 双方个人胜率均值
+        impacts  teammate_impact() 的结果  -> 影响 = 有 x 时 o 的胜率 - 没有 x 时 o 的胜率
+        lineups  [行号元组]                -> 协同 = 阵容胜率 - 成员个人胜率均值
+    返回 {'pairs': Interval, 'impacts': Interval, 'lineups': Interval} (只含传入的部分)
+    """
+    pid_col = np.asarray(ds.columns['playerId'], dtype=np.int64)
+    player_code = pm.codes(pid_col)
+
+    pair_i = pair_j = imp_x = imp_o = np.zeros(0, dtype=np.int64)
+    if pairs is not None:
+        pair_i, pair_j = pairs['i'], pairs['j']
+    if impacts is not None:
+        imp_x, imp_o = impacts['x'], impacts['o']
+    lineups = list(lineups or [])
+
+    # 需要的玩家 / 配对
+    players = np.unique(np.concatenate([pair_i, pair_j, imp_o,
+                                        np.array([c for combo in lineups for c in combo], dtype=np.int64)]))
+    nz = np.unique(np.concatenate([pm.lookup(pair_i, pair_j), pm.lookup(imp_x, imp_o)]))
+    tables = [player_table(ds, pm, players, player_code), pair_table(ds, pm, nz, player_code)]
+    if lineups:
+        tables.append(lineup_table(ds, lineups, pm, player_code))
+    sums = replicate_sums(tables, len(ds.match_ids), n_replicates, seed)
+    player_sums, pair_sums = sums[0], sums[1]
+
+    def player_col(c):
+        return np.searchsorted(players, c)
+
+    def pair_col(i, j):
+        return np.searchsorted(nz, pm.lookup(i, j))
+
+    wr = _ratio(player_sums[..., 1], player_sums[..., 0])
+    out = {}
+    if pairs is not None:
+        k = pair_col(pair_i, pair_j)
+        together_wr = _ratio(pair_sums[:, k, 1], pair_sums[:, k, 0])
+        out['pairs'] = interval(together_wr - (wr[:, player_col(pair_i)] + wr[:, player_col(pair_j)]) / 2, alpha)
+    if impacts is not None:
+        k = pair_col(imp_x, imp_o)
+        o = player_col(imp_o)
+        with_n, with_w = pair_sums[:, k, 0], pair_sums[:, k, 1]
+        without_n = player_sums[:, o, 0] - with_n
+        without_w = player_sums[:, o, 1] - with_w
+        out['impacts'] = interval(_ratio(with_w, with_n) - _ratio(without_w, without_n), alpha)
+    if lineups:
+        lineup_sums = sums[2]
+        expected = np.stack([wr[:, player_col(np.array(combo))].mean(axis=1) for combo in lineups], axis=1)
+        out['lineups'] = interval(_ratio(lineup_sums[..., 1], lineup_sums[..., 0]) - expected, alpha)
+    return out
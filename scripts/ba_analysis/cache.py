@@ -0,0 +1,186 @@
+"""
+列式二进制数据集缓存
+
+缓存键 = sha256(源文件内容) + 派生逻辑指纹 (DERIVATION_VERSION + 派生函数源码)，
+内容为每列一个 .npy (以 mmap 方式加载) + manifest.json。
+源数据或派生逻辑不变时，重复运行只需毫秒级加载。
+
+目录结构:
+    <数据目录>/.wcs_cache/
+        index.json               源文件路径 -> (size, mtime, sha256)，免重复哈希
+        <key>/manifest.json
+        <key>/col.<序号>.npy         顺序与 manifest.fields 一致
+        <key>/match_code.npy / match_order.npy / match_offsets.npy
+"""
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .dataset import DERIVATION_VERSION, WcsDataset, derivation_fingerprint, load_dataset
+
+CACHE_DIR_NAME = '.wcs_cache'
+MANIFEST_NAME = 'manifest.json'
+INDEX_NAME = 'index.json'
+
+_HASH_CHUNK = 1 << 20
+
+
+def file_sha256(path):
+    """分块计算文件 sha256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_key(source_sha256):
+    """源文件哈希 + 派生逻辑指纹 -> 缓存目录名"""
+    raw = f'{source_sha256}:{derivation_fingerprint()}'
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def default_cache_dir(data_path):
+    return Path(data_path).resolve().parent / CACHE_DIR_NAME
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, obj):
+    tmp = Path(f'{path}.tmp-{os.getpid()}')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(obj, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def source_digest(data_path, cache_dir):
+    """
+    返回源文件 sha256
+    size + mtime 与 index.json 记录一致时直接复用，避免大文件每次全量哈希
+    """
+    src = Path(data_path).resolve()
+    st = src.stat()
+    index = _read_json(cache_dir / INDEX_NAME) or {}
+    entry = index.get(str(src))
+    if entry and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns:
+        return entry['sha256']
+    return file_sha256(src)
+
+
+def _update_index(cache_dir, data_path, digest, key):
+    """记录源文件指纹；同一源文件的旧缓存若已无人引用则删除"""
+    src = Path(data_path).resolve()
+    st = src.stat()
+    index = _read_json(cache_dir / INDEX_NAME) or {}
+    old = index.get(str(src))
+    entry = {
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'sha256': digest,
+        'key': key,
+    }
+    if old == entry:
+        return
+    index[str(src)] = entry
+    _write_json(cache_dir / INDEX_NAME, index)
+    if old and old.get('key') != key:
+        if all(e.get('key') != old['key'] for e in index.values()):
+            shutil.rmtree(cache_dir / old['key'], ignore_errors=True)
+
+
+def save_dataset(ds, entry_dir, manifest_extra=None):
+    """把 WcsDataset 写成列文件 + manifest (先写临时目录再原子改名)"""
+    entry_dir = Path(entry_dir)
+    tmp = entry_dir.with_name(f'{entry_dir.name}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    order, offsets = ds.match_groups()
+    for i, name in enumerate(ds.fields):
+        np.save(tmp / f'col.{i}.npy', np.ascontiguousarray(ds.columns[name]))
+    np.save(tmp / 'match_code.npy', ds.match_code)
+    np.save(tmp / 'match_order.npy', order)
+    np.save(tmp / 'match_offsets.npy', offsets)
+
+    manifest = {
+        'derivation_version': DERIVATION_VERSION,
+        'rows': len(ds),
+        'fields': ds.fields,
+        'dtypes': {name: ds.columns[name].dtype.str for name in ds.fields},
+        'metadata': ds.metadata,
+        'match_ids': ds.match_ids,
+        'fixed': ds.fixed,
+    }
+    manifest.update(manifest_extra or {})
+    _write_json(tmp / MANIFEST_NAME, manifest)
+
+    if entry_dir.exists():
+        shutil.rmtree(entry_dir, ignore_errors=True)
+    try:
+        os.replace(tmp, entry_dir)
+    except OSError:
+        # 并发进程已写入同一缓存键，内容相同，丢弃本次结果即可
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def open_cached(entry_dir, mmap_mode='r'):
+    """从缓存目录以 mmap 方式打开 WcsDataset；缓存不完整时返回 None"""
+    entry_dir = Path(entry_dir)
+    manifest = _read_json(entry_dir / MANIFEST_NAME)
+    if not manifest or manifest.get('derivation_version') != DERIVATION_VERSION:
+        return None
+    try:
+        columns = {
+            name: np.load(entry_dir / f'col.{i}.npy', mmap_mode=mmap_mode)
+            for i, name in enumerate(manifest['fields'])
+        }
+        match_code = np.load(entry_dir / 'match_code.npy', mmap_mode=mmap_mode)
+        match_order = np.load(entry_dir / 'match_order.npy', mmap_mode=mmap_mode)
+        match_offsets = np.load(entry_dir / 'match_offsets.npy', mmap_mode=mmap_mode)
+    except (OSError, ValueError):
+        return None
+    return WcsDataset(
+        metadata=manifest['metadata'],
+        fields=manifest['fields'],
+        columns=columns,
+        match_ids=manifest['match_ids'],
+        match_code=match_code,
+        fixed=manifest['fixed'],
+        match_order=match_order,
+        match_offsets=match_offsets,
+    )
+
+
+def load_cached_dataset(data_path, cache_dir=None, rebuild=False):
+    """
+    带缓存的 load_dataset
+    命中: mmap 打开列文件；未命中 / rebuild=True: 流式解析 JSON 并写入缓存
+    """
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_dir(data_path)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    digest = source_digest(data_path, cache_dir)
+    key = cache_key(digest)
+    entry_dir = cache_dir / key
+
+    ds = None if rebuild else open_cached(entry_dir)
+    if ds is None:
+        ds = load_dataset(data_path)
+        save_dataset(ds, entry_dir, {
+            'key': key,
+            'source': str(Path(data_path).resolve()),
+            'source_sha256': digest,
+        })
+        ds = open_cached(entry_dir) or ds
+    _update_index(cache_dir, data_path, digest, key)
+    return ds
@@ -0,0 +1,471 @@
+"""
+异步对局数据采集 (collect-data.js 的 Python 版，仅用标准库)
+
+    - 数据源与 src/api/fetcher.js 一致: batrace 直连优先，失败后回退 barmory
+      (Python 端没有 CORS 限制，直接访问 barmory，不需要代理池)
+    - HttpPool: asyncio 上的 HTTP/1.1 keep-alive 连接池，每个主机限制并发连接数
+    - TokenBucket: 全局请求速率限制 (令牌桶，允许短时突发)
+    - 5xx / 429 / 网络错误按指数退避 + 抖动重试，429 / 503 时遵循 Retry-After；
+      404 / 400 等其他 4xx 是永久错误，该数据源不再重试，立即换下一个数据源
+    - 对局详情按 matchId 缓存到磁盘 (<数据目录>/.wcs_cache/responses/matches/)，
+      已缓存的对局永不重复请求；对局列表每次都重新获取
+    - match_records() 按 collect-data.js 的公式把对局详情展开为 wcs_raw_data.json 的行
+"""
+import asyncio
+import gzip
+import json
+import os
+import random
+import ssl
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from .cache import default_cache_dir
+
+BATRACE_BASE = 'https://batrace.aoeiaol.top/api/v1'
+BARMORY_BASE = 'https://www.barmory.net'
+
+# collect-data.js 中的采集名单
+PLAYER_IDS = ['16589', '160368', '194698', '17366', '7720', '209525', '203924']
+MATCHES_PER_PLAYER = 20
+MIN_PLAYERS = 10
+
+RESPONSES_DIR_NAME = 'responses'
+_USER_AGENT = 'broken-arrow-insight-collector/1.0'
+_MAX_REDIRECTS = 3
+
+
+class FetchError(Exception):
+    """所有数据源都重试失败"""
+
+
+class HttpError(Exception):
+    def __init__(self, status, url, retry_after=None):
+        super().__init__(f'HTTP_{status} {url}')
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Conn:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class HttpPool:
+    """
+    最小化的异步 HTTP/1.1 GET 客户端: 按 (scheme, host, port) 复用 keep-alive 连接
+    max_per_host 同时也是对单个主机的并发上限
+    """
+
+    def __init__(self, max_per_host=8, timeout=30.0):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle = {}
+        self._limits = {}
+        self._ssl = None
+        self.opened = 0
+
+    def _limit(self, key):
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.max_per_host)
+        return self._limits[key]
+
+    async def _connect(self, scheme, host, port):
+        ssl_ctx = None
+        if scheme == 'https':
+            self._ssl = self._ssl or ssl.create_default_context()
+            ssl_ctx = self._ssl
+        reader, writer = await asyncio.open_connection(host, port, ssl=ssl_ctx)
+        self.opened += 1
+        return _Conn(reader, writer)
+
+    async def get(self, url):
+        """返回 (status, headers, body)；自动跟随重定向"""
+        for _ in range(_MAX_REDIRECTS + 1):
+            status, headers, body = await asyncio.wait_for(self._get_once(url), self.timeout)
+            location = headers.get('location')
+            if status in (301, 302, 303, 307, 308) and location:
+                url = urljoin(url, location)
+                continue
+            return status, headers, body
+        raise HttpError(status, url)
+
+    async def _get_once(self, url):
+        parts = urlsplit(url)
+        scheme = parts.scheme or 'http'
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port)
+        target = parts.path or '/'
+        if parts.query:
+            target += '?' + parts.query
+        request = (f'GET {target} HTTP/1.1\r\n'
+                   f'Host: {parts.netloc}\r\n'
+                   f'User-Agent: {_USER_AGENT}\r\n'
+                   'Accept: application/json\r\n'
+                   'Accept-Encoding: gzip, deflate\r\n'
+                   'Connection: keep-alive\r\n\r\n').encode('ascii')
+
+        async with self._limit(key):
+            idle = self._idle.setdefault(key, [])
+            while True:
+                reused = bool(idle)
+                conn = idle.pop() if reused else await self._connect(*key)
+                try:
+                    conn.writer.write(request)
+                    await conn.writer.drain()
+                    status, headers, body, keep = await self._read_response(conn.reader)
+                    break
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn.close()
+                    # 服务器已关闭的空闲连接: 换一条重试，新建连接失败则向上抛出
+                    if not reused:
+                        raise
+                except BaseException:
+                    # 超时取消等: 连接状态未知，不再放回池中
+                    conn.close()
+                    raise
+            if keep:
+                idle.append(conn)
+            else:
+                conn.close()
+
+        encoding = headers.get('content-encoding', '')
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        return status, headers, body
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readuntil(b'\r\n')
+        version, status = status_line.decode('latin-1').split(' ', 2)[:2]
+        headers = {}
+        while True:
+            line = await reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                if size == 0:
+                    # 跳过 trailer
+                    while await reader.readuntil(b'\r\n') != b'\r\n':
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            return int(status), headers, body, False
+
+        keep = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        return int(status), headers, body, keep
+
+    async def close(self):
+        for conns in self._idle.values():
+            for conn in conns:
+                conn.close()
+        self._idle.clear()
+
+
+class TokenBucket:
+    """令牌桶: 平均 rate 次/秒，最多突发 burst 次；rate <= 0 表示不限速"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._last is not None:
+                    self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _retryable(status):
+    """5xx 与 429 可能是暂时的；其他 4xx (404 / 400 ...) 重试也不会变"""
+    return status >= 500 or status == 429
+
+
+def _retry_after(headers):
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class Collector:
+    """
+    按 fetcher.js 的 URL 映射取数: 每次尝试轮换数据源 (batrace → barmory → batrace ...)，
+    失败后等待 backoff * 2^尝试次数 (含抖动) 再试，最多 retries 次；
+    返回永久 4xx 的数据源直接移出轮换，不等待
+    """
+
+    def __init__(self, pool, bucket, cache_dir=None, batrace_base=BATRACE_BASE,
+                 barmory_base=BARMORY_BASE, retries=5, backoff=0.5):
+        self.pool = pool
+        self.bucket = bucket
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.batrace_base = batrace_base.rstrip('/')
+        self.barmory_base = barmory_base.rstrip('/')
+        self.retries = retries
+        self.backoff = backoff
+        self.stats = {'requests': 0, 'retries': 0, 'cache_hits': 0, 'fetched': 0}
+
+    # ---- URL 映射 (与 toBatraceUrl 一致) ----
+    def match_list_urls(self, pid):
+        now = datetime.now()
+        time_str = f"{now:%Y-%m-%d}_{now:%H}"
+        return [f'{self.batrace_base}/stb/matchlistid_by_stbId?stbId={pid}',
+                f'{self.barmory_base}/stb/commander/{pid}/matches?time={time_str}']
+
+    def match_detail_urls(self, match_id):
+        return [f'{self.batrace_base}/stb/match_by_matchid?match_id={match_id}',
+                f'{self.barmory_base}/stb/match/{match_id}']
+
+    async def fetch_json(self, urls):
+        last = None
+        live = list(urls)
+        for attempt in range(self.retries):
+            url = live[attempt % len(live)]
+            await self.bucket.acquire()
+            self.stats['requests'] += 1
+            delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+            try:
+                status, headers, body = await self.pool.get(url)
+                if status != 200:
+                    raise HttpError(status, url, _retry_after(headers))
+                return json.loads(body)
+            except HttpError as e:
+                last = e
+                if not _retryable(e.status):
+                    live.remove(url)
+                    if not live:
+                        break
+                    continue
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                last = e
+            if attempt + 1 < self.retries:
+                self.stats['retries'] += 1
+                await asyncio.sleep(delay)
+        raise FetchError(f'{urls[0]}: {last}')
+
+    # ---- 磁盘缓存 ----
+    def _cache_path(self, match_id):
+        return self.cache_dir / 'matches' / f'{match_id}.json'
+
+    def cached_detail(self, match_id):
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._cache_path(match_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, match_id, detail):
+        path = self._cache_path(match_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(detail, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    async def match_ids(self, pid, limit=MATCHES_PER_PLAYER):
+        data = await self.fetch_json(self.match_list_urls(pid))
+        if isinstance(data, list):
+            ids = data
+        elif isinstance(data, dict):
+            # Object.values(matchList).flat()
+            ids = []
+            for v in data.values():
+                ids.extend(v if isinstance(v, list) else [v])
+        else:
+            ids = []
+        return [str(m) for m in ids[:limit]]
+
+    async def match_detail(self, match_id):
+        detail = self.cached_detail(match_id)
+        if detail is not None:
+            self.stats['cache_hits'] += 1
+            return detail
+        detail = await self.fetch_json(self.match_detail_urls(match_id))
+        self.stats['fetched'] += 1
+        if self.cache_dir is not None and detail:
+            self._store(match_id, detail)
+        return detail
+
+
+def _n(p, key):
+    """JS 的 p.Key || 0"""
+    v = p.get(key)
+    return v if v else 0
+
+
+def has_elo(detail):
+    """与 collect-data.js 相同的有效对局判定: ≥ 10 人且有 ELO 变化"""
+    if not detail or not detail.get('Data'):
+        return False
+    players = list(detail['Data'].values())
+    if len(players) < MIN_PLAYERS:
+        return False
+    return any(abs(_n(p, 'NewRating') - _n(p, 'OldRating')) > 0.01 for p in players)
+
+
+def match_records(match_id, detail):
+    """对局详情 -> wcs_raw_data.json 的行 (字段与公式同 collect-data.js)"""
+    players = [p for p in detail['Data'].values() if p.get('Name')]
+    if len(players) < MIN_PLAYERS:
+        return []
+
+    # 推断胜方 — 优先用 ELO delta，match.WinnerTeam 可能编号不一致
+    d0 = d1 = 0
+    for p in players:
+        delta = _n(p, 'NewRating') - _n(p, 'OldRating')
+        if p.get('TeamId') == 0:
+            d0 += delta
+        else:
+            d1 += delta
+    if abs(d0) + abs(d1) > 1:
+        winner_team = 0 if d0 > d1 else 1
+    else:
+        winner_team = detail['WinnerTeam'] if 'WinnerTeam' in detail else 101
+
+    totals = {0: {'dmg': 0, 'dest': 0, 'loss': 0, 'spawn': 0},
+              1: {'dmg': 0, 'dest': 0, 'loss': 0, 'spawn': 0}}
+    for p in players:
+        t = totals[1 if p.get('TeamId') == 1 else 0]
+        t['dmg'] += _n(p, 'DamageDealt')
+        t['dest'] += _n(p, 'DestructionScore')
+        t['loss'] += _n(p, 'LossesScore')
+        t['spawn'] += _n(p, 'TotalSpawnedUnitScore')
+
+    rows = []
+    for p in players:
+        t = 1 if p.get('TeamId') == 1 else 0
+        rd = _n(p, 'NewRating') - _n(p, 'OldRating')
+        is_win = 1 if rd > 0.01 else (0 if rd < -0.01 else (1 if t == winner_team and winner_team != 101 else 0))
+        net_inv = max(_n(p, 'TotalSpawnedUnitScore') - _n(p, 'TotalRefundedUnitScore'), 1)
+
+        unit_count = buildings = unique_units = 0
+        if p.get('UnitData'):
+            units = p['UnitData'].values() if isinstance(p['UnitData'], dict) else p['UnitData']
+            units = list(units)
+            unit_count = sum(_n(u, 'Destruction') for u in units)
+            buildings = sum(_n(u, 'BuildingDestroyedCount') for u in units)
+            unique_units = len(units)
+
+        rows.append({
+            'matchId': match_id,
+            'playerId': p.get('Id'),
+            'teamId': t,
+            'isWin': is_win,
+
+            'destructionScore': _n(p, 'DestructionScore'),
+            'lossesScore': _n(p, 'LossesScore'),
+            'damageDealt': _n(p, 'DamageDealt'),
+            'damageReceived': _n(p, 'DamageReceived'),
+            'objectivesCaptured': _n(p, 'ObjectivesCaptured'),
+            'supplyCaptured': _n(p, 'SupplyCaptured'),
+            'totalSpawned': _n(p, 'TotalSpawnedUnitScore'),
+            'totalRefunded': _n(p, 'TotalRefundedUnitScore'),
+            'supplyConsumed': _n(p, 'SupplyPointsConsumed'),
+            'supplyFromAllies': _n(p, 'SupplyPointsConsumedFromAllies'),
+            'supplyToAllies': _n(p, 'SupplyPointsConsumedByAllies'),
+            'selfDamage': _n(p, 'TotalSelfDamageDealt'),
+            'buildingsDestroyed': buildings,
+            'unitCount': unit_count,
+            'uniqueUnits': unique_units,
+            'dlRatio': _n(p, 'DLRatio'),
+
+            'netInvestment': net_inv,
+            'costEfficiency': _n(p, 'DestructionScore') / net_inv,
+            'damageTrade': _n(p, 'DamageDealt') / max(_n(p, 'DamageReceived'), 1),
+            'survivalRate': max(0, 1 - _n(p, 'LossesScore') / net_inv),
+            'refundRate': _n(p, 'TotalRefundedUnitScore') / max(_n(p, 'TotalSpawnedUnitScore'), 1),
+
+            'teamDmgShare': _n(p, 'DamageDealt') / max(totals[t]['dmg'], 1),
+            'teamDestShare': _n(p, 'DestructionScore') / max(totals[t]['dest'], 1),
+            'teamLossShare': _n(p, 'LossesScore') / max(totals[t]['loss'], 1),
+            'teamSpawnShare': _n(p, 'TotalSpawnedUnitScore') / max(totals[t]['spawn'], 1),
+
+            'oldRating': _n(p, 'OldRating'),
+            'newRating': _n(p, 'NewRating'),
+            'ratingDelta': _n(p, 'NewRating') - _n(p, 'OldRating'),
+        })
+    return rows
+
+
+async def collect(collector, player_ids, per_player=MATCHES_PER_PLAYER, log=print):
+    """
+    并发拉取全部玩家的对局列表与对局详情，返回 (有效对局 [(matchId, detail)], 失败数)
+    对局顺序与 collect-data.js 的串行循环一致 (按玩家顺序首次出现)
+    """
+    lists = await asyncio.gather(*(collector.match_ids(pid, per_player) for pid in player_ids),
+                                 return_exceptions=True)
+    order, seen = [], set()
+    for pid, ids in zip(player_ids, lists):
+        if isinstance(ids, Exception):
+            log(f"⚠️ 玩家 {pid} 失败: {ids}")
+            continue
+        log(f"📋 玩家 {pid}: 找到 {len(ids)} 场对局")
+        for m in ids:
+            if m not in seen:
+                seen.add(m)
+                order.append(m)
+
+    details = await asyncio.gather(*(collector.match_detail(m) for m in order), return_exceptions=True)
+    matches, failed = [], 0
+    for m, detail in zip(order, details):
+        if isinstance(detail, Exception):
+            failed += 1
+            log(f"  ⚠️ 对局 {m} 失败: {detail}")
+        elif has_elo(detail):
+            matches.append((m, detail))
+    return matches, failed
+
+
+def build_dataset(matches):
+    """[(matchId, detail)] -> wcs_raw_data.json 的内容"""
+    dataset = [row for m, detail in matches for row in match_records(m, detail)]
+    now = datetime.now(timezone.utc)
+    return {
+        'metadata': {
+            'collectedAt': now.strftime('%Y-%m-%dT%H:%M:%S.') + f'{now.microsecond // 1000:03d}Z',
+            'matchCount': len(matches),
+            'sampleCount': len(dataset),
+        },
+        'dataset': dataset,
+    }
+
+
+def responses_dir(data_path):
+    return default_cache_dir(data_path) / RESPONSES_DIR_NAME
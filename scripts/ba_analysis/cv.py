@@ -0,0 +1,153 @@
+"""
+按对局分组的交叉验证 (进程池并行)
+
+同一 matchId 的 10 行只会落在同一折: 特征是按对局百分位化的，
+随机切分会让验证集玩家的队友/对手出现在训练集里，cv_accuracy 偏高。
+
+各折 (以及可选的全量训练) 作为独立任务提交到进程池，
+CPU 核数在 "并行的任务数 workers" 与 "每个 XGBoost 的线程数 threads" 之间切分。
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+# 全量训练任务在结果中的编号
+FULL_FIT = -1
+
+
+@dataclass
+class FoldResult:
+    fold: int
+    train_rows: int
+    test_rows: int
+    test_matches: int
+    accuracy: float
+    fit_s: float
+    predict_s: float
+    threads: int
+
+
+@dataclass
+class CvResult:
+    scores: np.ndarray      # 每折准确率 (与 cross_val_score 的返回值相同)
+    folds: list             # [FoldResult]
+    wall_s: float
+    workers: int
+    threads: int
+    model: object = None    # fit_full=True 时的全量模型
+    fit_s: float = None
+
+
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Windows / macOS
+        return os.cpu_count() or 1
+
+
+def thread_split(n_tasks, workers=None, threads=None, cpus=None):
+    """
+    workers / threads 缺省时按 CPU 核数切分: 先让任务尽量并行，剩余的核分给每个模型
+    返回 (workers, threads)
+    """
+    cpus = cpus or available_cpus()
+    if workers is None:
+        workers = min(n_tasks, cpus) if threads is None else max(1, min(n_tasks, cpus // threads))
+    workers = max(1, min(workers, n_tasks))
+    if threads is None:
+        threads = max(1, cpus // workers)
+    return workers, threads
+
+
+def group_folds(groups, n_folds, seed=0):
+    """
+    按对局编号切分为 n_folds 折，返回每折的验证集行下标
+    对局随机打乱后按大小降序蛇形分配，各折行数尽量均衡
+    """
+    codes, inverse, sizes = np.unique(groups, return_inverse=True, return_counts=True)
+    if len(codes) < n_folds:
+        raise ValueError(f'对局数 {len(codes)} 少于折数 {n_folds}')
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(codes))
+    order = order[np.argsort(-sizes[order], kind='stable')]
+    pos = np.arange(len(codes)) % (2 * n_folds)
+    fold_of = np.empty(len(codes), dtype=np.int64)
+    fold_of[order] = np.where(pos < n_folds, pos, 2 * n_folds - 1 - pos)
+    row_fold = fold_of[inverse.ravel()]
+    return [np.flatnonzero(row_fold == k) for k in range(n_folds)]
+
+
+# 进程池中每个 worker 只接收一次完整的 X / y
+_X = _y = None
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _run_task(task):
+    from xgboost import XGBClassifier
+
+    fold, test_idx, params, threads = task
+    model = XGBClassifier(**{**params, 'n_jobs': threads})
+    if fold == FULL_FIT:
+        t0 = time.perf_counter()
+        model.fit(_X, _y)
+        return fold, (model, time.perf_counter() - t0)
+
+    train_mask = np.ones(len(_y), dtype=bool)
+    train_mask[test_idx] = False
+    t0 = time.perf_counter()
+    model.fit(_X[train_mask], _y[train_mask])
+    t1 = time.perf_counter()
+    acc = float(np.mean(model.predict(_X[test_idx]) == _y[test_idx]))
+    t2 = time.perf_counter()
+    return fold, (acc, len(_y) - len(test_idx), t1 - t0, t2 - t1)
+
+
+def grouped_cv(X, y, groups, params, n_folds=5, workers=None, threads=None, seed=0, fit_full=False):
+    """
+    按对局分组的 n_folds 折交叉验证；fit_full=True 时全量训练作为额外任务同时进行
+    workers=1 时在当前进程内顺序执行 (不启动进程池)
+    """
+    y = np.asarray(y)
+    folds = group_folds(groups, n_folds, seed)
+    tasks = list(enumerate(folds))
+    if fit_full:
+        # 全量训练最慢，排在最前面先提交
+        tasks.insert(0, (FULL_FIT, None))
+    workers, threads = thread_split(len(tasks), workers, threads)
+    jobs = [(k, idx, params, threads) for k, idx in tasks]
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        _init_worker(X, y)
+        try:
+            outputs = [_run_task(job) for job in jobs]
+        finally:
+            _init_worker(None, None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(X, y)) as pool:
+            outputs = list(pool.map(_run_task, jobs))
+    wall = time.perf_counter() - t0
+
+    result = CvResult(scores=np.zeros(n_folds), folds=[], wall_s=wall, workers=workers, threads=threads)
+    groups = np.asarray(groups)
+    for k, out in outputs:
+        if k == FULL_FIT:
+            result.model, result.fit_s = out
+            continue
+        acc, train_rows, fit_s, predict_s = out
+        test_idx = folds[k]
+        result.scores[k] = acc
+        result.folds.append(FoldResult(
+            fold=k, train_rows=train_rows, test_rows=len(test_idx),
+            test_matches=len(np.unique(groups[test_idx])),
+            accuracy=acc, fit_s=fit_s, predict_s=predict_s, threads=threads,
+        ))
+    return result
@@ -0,0 +1,266 @@
+"""
+wcs_raw_data.json 流式加载
+
+逐条解析 dataset 中的记录，直接写入预分配的定长列数组，
+同一遍中完成 isWin 修正和交互特征注入。
+峰值内存 ≈ 数值矩阵本身，而不是整个 JSON 对象图。
+"""
+import hashlib
+import inspect
+import json
+from dataclasses import dataclass
+
+import numpy as np
+
+# 特征派生版本号: 修改列布局或 load_dataset 的写入逻辑时 +1，数据集缓存据此重建
+# (fix_is_win / derive_features 的源码改动由 derivation_fingerprint 自动识别)
+DERIVATION_VERSION = 1
+
+# 交互特征 (让 SHAP 判断这些交互项是否真的影响胜率)
+DERIVED_FEATURES = ('tankEfficiency', 'firepowerROI', 'combatPresence', 'lossEfficiency')
+
+# 非浮点列的存储类型，其余字段一律 float64
+INT_FIELDS = {'playerId': np.int64, 'teamId': np.int8, 'isWin': np.int8}
+
+_CHUNK_SIZE = 1 << 20
+_WHITESPACE = ' \t\r\n'
+
+
+@dataclass
+class WcsDataset:
+    """列式数据集: 每个字段一个 ndarray，matchId 以整数编码存储"""
+    metadata: dict
+    fields: list
+    columns: dict
+    match_ids: list            # 编码 -> 原始 matchId (按首次出现顺序)
+    match_code: np.ndarray     # 每行的 matchId 编码 (int32)
+    fixed: int = 0             # 被 ratingDelta 修正的 isWin 条数
+    match_order: np.ndarray = None    # 按对局分组后的行序
+    match_offsets: np.ndarray = None  # 第 k 局的行 = match_order[offsets[k]:offsets[k+1]]
+
+    def __len__(self):
+        return len(self.match_code)
+
+    def match_groups(self):
+        """返回 (match_order, match_offsets)，首次调用时计算"""
+        if self.match_order is None:
+            self.match_order = np.argsort(self.match_code, kind='stable')
+            counts = np.bincount(self.match_code, minlength=len(self.match_ids))
+            self.match_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        return self.match_order, self.match_offsets
+
+    def matrix(self, names):
+        """按给定字段顺序拼成 (n, F) float64 矩阵"""
+        out = np.empty((len(self), len(names)), dtype=np.float64)
+        for j, name in enumerate(names):
+            out[:, j] = self.columns[name]
+        return out
+
+
+def fix_is_win(d):
+    """
+    修正 isWin bug (原地)
+    collect-data.js 中 match.WinnerTeam 编号可能与 TeamId 不一致，
+    用 ratingDelta > 0 = 赢 覆盖原始 isWin。返回是否发生了修正。
+    """
+    correct = 1 if d.get('ratingDelta', 0) > 0 else 0
+    if d.get('isWin') != correct:
+        d['isWin'] = correct
+        return True
+    return False
+
+
+def derive_features(d):
+    """注入交互特征 (原地)"""
+    net_inv = max(d.get('netInvestment', 1), 1)
+    loss_score = d.get('lossesScore', 0)
+    dmg_trade = d.get('damageTrade', 0)
+    team_loss = d.get('teamLossShare', 0)
+    team_dmg = d.get('teamDmgShare', 0)
+    team_dest = d.get('teamDestShare', 0)
+    cost_eff = d.get('costEfficiency', 0)
+    dmg_dealt = d.get('damageDealt', 0)
+
+    # 承伤效率: 承压多 + 打得回来 = 高 → 好; 承压多 + 打不回来 = 低 → 差
+    d['tankEfficiency'] = team_loss * dmg_trade
+    # 火力性价比: 每点投入产出多少伤害
+    d['firepowerROI'] = dmg_dealt / net_inv
+    # 火力集中度: 伤害占比 × 击杀占比都高 = 输出集中在你身上
+    d['combatPresence'] = team_dmg * team_dest
+    # 损失有效度: 亏了多少 × 但成本效率高不高
+    d['lossEfficiency'] = loss_score * cost_eff
+
+
+def derivation_fingerprint():
+    """派生逻辑指纹 = 版本号 + fix_is_win / derive_features 源码哈希，改代码即自动失效缓存"""
+    h = hashlib.sha256(f'v{DERIVATION_VERSION}'.encode())
+    for fn in (fix_is_win, derive_features):
+        h.update(inspect.getsource(fn).encode())
+    return h.hexdigest()[:16]
+
+
+class _JsonStream:
+    """最小化的增量 JSON 读取器：只在需要时从文件补充缓冲区"""
+
+    def __init__(self, f, chunk_size=_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # 丢弃已消费部分，避免缓冲区无限增长
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """跳过空白并返回下一个字符 (文件结束返回 '')"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, ch):
+        got = self.peek()
+        if got != ch:
+            raise ValueError(f"JSON 格式错误: 期望 {ch!r}，实际 {got!r} (偏移 {self.pos})")
+        self.pos += 1
+
+    def value(self):
+        """解析下一个完整的 JSON 值；缓冲区不足时继续读取"""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # 数字可能恰好被 chunk 截断，未到文件结尾时补读一次确认
+            if end == len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_top_level(stream):
+    """
+    遍历顶层对象: 普通键产出 (key, value)，
+    'dataset' 数组逐条产出 ('record', dict)
+    """
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if key == 'dataset':
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield 'record', stream.value()
+                    if stream.peek() == ',':
+                        stream.pos += 1
+                        continue
+                    stream.expect(']')
+                    break
+        else:
+            yield key, stream.value()
+        if stream.peek() == ',':
+            stream.pos += 1
+            continue
+        stream.expect('}')
+        return
+
+
+def iter_records(path):
+    """逐条产出 dataset 记录 (未修正、未注入特征)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for key, value in _iter_top_level(_JsonStream(f)):
+            if key == 'record':
+                yield value
+
+
+def load_dataset(path, chunk_size=_CHUNK_SIZE):
+    """
+    流式加载 wcs_raw_data.json 为 WcsDataset
+
+    列数组按 metadata.sampleCount 预分配 (缺失时倍增扩容)，
+    每条记录解析后立即修正 isWin、注入交互特征并写入列中，随即丢弃。
+    """
+    metadata = {}
+    fields = None
+    columns = {}
+    match_index = {}
+    match_code = None
+    capacity = 0
+    n = 0
+    fixed = 0
+
+    def alloc(size):
+        return {name: np.zeros(size, dtype=INT_FIELDS.get(name, np.float64)) for name in fields}
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for key, value in _iter_top_level(_JsonStream(f, chunk_size)):
+            if key != 'record':
+                if key == 'metadata':
+                    metadata = value
+                continue
+
+            d = value
+            if fix_is_win(d):
+                fixed += 1
+            derive_features(d)
+
+            if fields is None:
+                # 字段顺序 = 首条记录的键顺序 (交互特征追加在末尾)
+                fields = [k for k in d if k != 'matchId']
+                capacity = max(int(metadata.get('sampleCount', 0) or 0), 1024)
+                columns = alloc(capacity)
+                match_code = np.zeros(capacity, dtype=np.int32)
+            elif n == capacity:
+                capacity *= 2
+                grown = alloc(capacity)
+                for name in fields:
+                    grown[name][:n] = columns[name][:n]
+                columns = grown
+                match_code = np.resize(match_code, capacity)
+
+            mid = str(d['matchId'])
+            code = match_index.get(mid)
+            if code is None:
+                code = match_index[mid] = len(match_index)
+            match_code[n] = code
+            for name in fields:
+                columns[name][n] = d.get(name, 0)
+            n += 1
+
+    if fields is None:
+        fields = []
+        match_code = np.zeros(0, dtype=np.int32)
+    elif n < capacity:
+        columns = {name: col[:n].copy() for name, col in columns.items()}
+        match_code = match_code[:n].copy()
+
+    return WcsDataset(
+        metadata=metadata,
+        fields=fields,
+        columns=columns,
+        match_ids=list(match_index),
+        match_code=match_code,
+        fixed=fixed,
+    )
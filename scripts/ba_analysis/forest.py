@@ -0,0 +1,218 @@
+"""
+XGBoost 模型导出为数组节点表 + 纯 NumPy 批量预测 (不 import xgboost)
+
+所有树的节点拼成一组全局数组 (下标即全局节点号):
+    feature       int32    分裂特征列，叶子为 -1
+    threshold     float32  x < threshold 走左子树 (与 xgboost 相同，按 float32 比较)
+    left / right  int32    子节点全局编号
+    default_left  bool     缺失值 (NaN) 走左子树
+    value         float32  叶子值 (已含学习率)
+    roots         int32    每棵树的根节点
+    base_margin   float    初始 margin (binary:logistic 下为 logit(base_score))
+
+预测前把节点表编译成每棵树一个深度为 max_depth 的完全二叉树 (堆序，提前结束的叶子
+向下补成直通节点)，(行, 树) 的当前位置矩阵逐层同时下推: 子节点 = 2i + 1 + 是否向右，
+每层只需取 特征 / 阈值 / x 三次，max_depth 步后全部到达叶子，
+margin = base_margin + Σ 叶子值，概率 = sigmoid(margin)。
+堆占 (2^max_depth - 1) × 树数 个格子，max_depth 超过 _MAX_HEAP_DEPTH (lossguide / max_leaves 模型
+常见) 时不编译，改为在原节点表上逐层跟随 left / right 指针，每层多取一次子节点编号。
+同一份节点表可保存为 .npz (Python) 或 JSON (前端 src/engine/forest.js)。
+"""
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 1
+# 分块预测时 (行 × 树) 节点矩阵的元素上限
+_CHUNK_CELLS = 1 << 22
+# 超过此深度不编译完全二叉树 (深度 16 × 200 棵树约 130 MB，每加一层翻倍)
+_MAX_HEAP_DEPTH = 16
+
+_ARRAYS = ('roots', 'feature', 'threshold', 'left', 'right', 'default_left', 'value')
+
+
+@dataclass
+class Forest:
+    features: list
+    base_margin: float
+    roots: np.ndarray
+    feature: np.ndarray
+    threshold: np.ndarray
+    left: np.ndarray
+    right: np.ndarray
+    default_left: np.ndarray
+    value: np.ndarray
+    max_depth: int
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _compile(self):
+        """节点表 -> 堆序完全二叉树 (特征, 阈值, 缺失走左, 叶子值)，结果缓存在实例上"""
+        if getattr(self, '_heap', None) is not None:
+            return self._heap
+        depth, n_trees = self.max_depth, self.n_trees
+        inner = (1 << depth) - 1
+        feat = np.zeros((n_trees, inner), dtype=np.int32)
+        thr = np.zeros((n_trees, inner), dtype=np.float32)
+        defl = np.ones((n_trees, inner), dtype=bool)
+        cur = self.roots[:, None].astype(np.int64)
+        for d in range(depth):
+            is_inner = self.feature[cur] >= 0
+            sl = slice((1 << d) - 1, (1 << (d + 1)) - 1)
+            feat[:, sl] = np.where(is_inner, self.feature[cur], 0)
+            # 直通节点: 阈值 +inf 恒走左，缺失也走左
+            thr[:, sl] = np.where(is_inner, self.threshold[cur], np.float32(np.inf))
+            defl[:, sl] = np.where(is_inner, self.default_left[cur], True)
+            left = np.where(is_inner, self.left[cur], cur)
+            right = np.where(is_inner, self.right[cur], cur)
+            cur = np.stack([left, right], axis=2).reshape(n_trees, -1)
+        self._heap = (feat.ravel(), thr.ravel(), defl.ravel(), self.value[cur].ravel())
+        return self._heap
+
+    def predict_margin(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None]
+        out = np.empty(len(X), dtype=np.float64)
+        chunk = max(1, _CHUNK_CELLS // max(1, self.n_trees))
+        for start in range(0, len(X), chunk):
+            out[start:start + chunk] = self._margin(X[start:start + chunk])
+        return out
+
+    def _margin(self, X):
+        if self.max_depth > _MAX_HEAP_DEPTH:
+            return self._margin_pointer(X)
+        feat, thr, defl, leaf_value = self._compile()
+        depth, n_trees = self.max_depth, self.n_trees
+        has_nan = np.isnan(X).any()
+        X_flat = np.ascontiguousarray(X).ravel()
+        row_base = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        tree_base = (np.arange(n_trees, dtype=np.int32) * ((1 << depth) - 1))[None]
+        pos = np.zeros((len(X), n_trees), dtype=np.int32)
+        for _ in range(depth):
+            g = tree_base + pos
+            x = X_flat.take(row_base + feat.take(g))
+            go_right = ~(x < thr.take(g))
+            if has_nan:
+                go_right = np.where(np.isnan(x), ~defl.take(g), go_right)
+            pos = 2 * pos + 1 + go_right
+        leaf = pos - ((1 << depth) - 1) + (np.arange(n_trees, dtype=np.int32) << depth)[None]
+        return self.base_margin + leaf_value.take(leaf).sum(axis=1, dtype=np.float64)
+
+    def _margin_pointer(self, X):
+        """深树: (行, 树) 的全局节点号逐层沿指针下推，到达叶子后原地不动"""
+        has_nan = np.isnan(X).any()
+        X_flat = np.ascontiguousarray(X).ravel()
+        row_base = (np.arange(len(X), dtype=np.int64) * X.shape[1])[:, None]
+        pos = np.broadcast_to(self.roots[None, :], (len(X), self.n_trees)).astype(np.int32)
+        for _ in range(self.max_depth):
+            f = self.feature.take(pos)
+            inner = f >= 0
+            if not inner.any():
+                break
+            x = X_flat.take(row_base + np.maximum(f, 0))
+            go_right = ~(x < self.threshold.take(pos))
+            if has_nan:
+                go_right = np.where(np.isnan(x), ~self.default_left.take(pos), go_right)
+            nxt = np.where(go_right, self.right.take(pos), self.left.take(pos))
+            pos = np.where(inner, nxt, pos)
+        return self.base_margin + self.value.take(pos).sum(axis=1, dtype=np.float64)
+
+    def predict_proba(self, X):
+        """获胜概率 (n,)"""
+        return 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+
+    # ---------- 保存 / 读取 ----------
+    def save_npz(self, path):
+        np.savez(path, version=np.int64(FORMAT_VERSION), features=np.array(json.dumps(self.features)),
+                 base_margin=np.float64(self.base_margin), max_depth=np.int64(self.max_depth),
+                 **{name: getattr(self, name) for name in _ARRAYS})
+        return Path(path)
+
+    @classmethod
+    def load_npz(cls, path):
+        with np.load(path) as z:
+            return cls(features=json.loads(str(z['features'])), base_margin=float(z['base_margin']),
+                       max_depth=int(z['max_depth']), **{name: z[name] for name in _ARRAYS})
+
+    def to_json(self):
+        return {
+            'version': FORMAT_VERSION,
+            'features': self.features,
+            'base_margin': self.base_margin,
+            'max_depth': self.max_depth,
+            **{name: (getattr(self, name).astype(np.int8) if name == 'default_left' else getattr(self, name)).tolist()
+               for name in _ARRAYS},
+        }
+
+    def save_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, separators=(',', ':'))
+        return Path(path)
+
+    @classmethod
+    def load_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            d = json.load(f)
+        dtypes = {'roots': np.int32, 'feature': np.int32, 'threshold': np.float32, 'left': np.int32,
+                  'right': np.int32, 'default_left': bool, 'value': np.float32}
+        return cls(features=d['features'], base_margin=float(d['base_margin']), max_depth=int(d['max_depth']),
+                   **{name: np.asarray(d[name], dtype=dtypes[name]) for name in _ARRAYS})
+
+    @classmethod
+    def load(cls, path):
+        return cls.load_json(path) if str(path).endswith('.json') else cls.load_npz(path)
+
+
+def _base_margin(learner):
+    """learner_model_param.base_score ("[5E-1]" 或 "5E-1") -> margin"""
+    base = float(str(learner['learner_model_param']['base_score']).strip('[]'))
+    objective = learner['objective']['name']
+    if objective not in ('binary:logistic', 'reg:logistic'):
+        raise ValueError(f'不支持的目标函数: {objective}')
+    return float(np.log(base / (1 - base)))
+
+
+def _depth(left, right, root):
+    depth, level = 0, np.array([root])
+    while True:
+        level = level[left[level] >= 0]
+        if len(level) == 0:
+            return depth
+        level = np.concatenate([left[level], right[level]])
+        depth += 1
+
+
+def export_booster(model, features):
+    """XGBClassifier / Booster -> Forest (只支持数值分裂的二分类模型)"""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(bytes(booster.save_raw(raw_format='json')))['learner']
+    trees = learner['gradient_booster']['model']['trees']
+
+    roots, parts, offset, max_depth = [], [], 0, 0
+    for t in trees:
+        if any(t['split_type']):
+            raise ValueError('不支持类别特征分裂')
+        left = np.asarray(t['left_children'], dtype=np.int32)
+        right = np.asarray(t['right_children'], dtype=np.int32)
+        leaf = left < 0
+        max_depth = max(max_depth, _depth(left, right, 0))
+        parts.append((
+            np.where(leaf, -1, np.asarray(t['split_indices'], dtype=np.int32)),
+            np.where(leaf, np.float32(0), np.asarray(t['split_conditions'], dtype=np.float32)),
+            np.where(leaf, -1, left + offset).astype(np.int32),
+            np.where(leaf, -1, right + offset).astype(np.int32),
+            np.asarray(t['default_left'], dtype=bool),
+            np.where(leaf, np.asarray(t['split_conditions'], dtype=np.float32), np.float32(0)),
+        ))
+        roots.append(offset)
+        offset += len(left)
+
+    cols = [np.concatenate([p[i] for p in parts]) for i in range(6)]
+    return Forest(features=list(features), base_margin=_base_margin(learner),
+                  roots=np.asarray(roots, dtype=np.int32), feature=cols[0], threshold=cols[1],
+                  left=cols[2], right=cols[3], default_left=cols[4], value=cols[5], max_depth=max_depth)
@@ -0,0 +1,96 @@
+"""
+增量权重刷新的持久状态
+
+    <数据目录>/.wcs_cache/incremental/
+        model.ubj      上次的 booster (在其基础上继续 boosting)
+        sample.npz     SHAP 用的蓄水池样本 (百分位特征 X + 标签 y)
+        state.json     已训练过的 matchId / 特征列表 / 已见行数 / 上次类别权重
+
+每次只取 matchId 未出现过的新对局行继续训练若干轮，
+蓄水池按 Algorithm R 吸收新行，SHAP 只在样本上计算，代价与历史总量无关。
+"""
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .cache import default_cache_dir
+from .shap_stats import reservoir_writes
+
+STATE_DIR_NAME = 'incremental'
+MODEL_FILE = 'model.ubj'
+SAMPLE_FILE = 'sample.npz'
+STATE_FILE = 'state.json'
+
+
+def state_dir(data_path):
+    return default_cache_dir(data_path) / STATE_DIR_NAME
+
+
+def load_state(root):
+    """读取增量状态，返回 dict (model_path / sample_X / sample_y / state)；不存在或不完整时返回 None"""
+    root = Path(root)
+    try:
+        with open(root / STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        with np.load(root / SAMPLE_FILE) as z:
+            sample_X, sample_y = z['X'], z['y']
+    except (OSError, ValueError, KeyError):
+        return None
+    model_path = root / MODEL_FILE
+    if not model_path.exists():
+        return None
+    return {'model_path': model_path, 'sample_X': sample_X, 'sample_y': sample_y, 'state': state}
+
+
+def save_state(root, model, sample_X, sample_y, state):
+    """写入增量状态 (临时目录 + 原子改名)"""
+    root = Path(root)
+    tmp = root.with_name(f'{root.name}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    model.save_model(tmp / MODEL_FILE)
+    np.savez(tmp / SAMPLE_FILE, X=sample_X, y=sample_y)
+    with open(tmp / STATE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp, root)
+    return root
+
+
+def new_match_rows(ds, seen_match_ids):
+    """matchId 不在 seen_match_ids 中的行 (bool 掩码)"""
+    seen = set(seen_match_ids)
+    fresh = np.array([mid not in seen for mid in ds.match_ids], dtype=bool)
+    return fresh[np.asarray(ds.match_code)] if len(fresh) else np.zeros(len(ds), dtype=bool)
+
+
+def reservoir_update(sample_X, sample_y, n_seen, X_new, y_new, size, seed=42):
+    """
+    Algorithm R: 已见 n_seen 行时的样本吸收新行，样本上限 size
+    随机数以 (seed, n_seen) 派生，同样的输入得到同样的样本；size 调小时截断旧样本
+    槽位由 reservoir_writes 一次算出 (与 ShapAccumulator 共用)
+    返回 (sample_X, sample_y)
+    """
+    n_feat = X_new.shape[1] if X_new.ndim == 2 else sample_X.shape[1]
+    X_new = np.asarray(X_new, dtype=np.float64).reshape(-1, n_feat)
+    y_new = np.asarray(y_new, dtype=np.int64)
+    X = np.asarray(sample_X[:size], dtype=np.float64).reshape(-1, n_feat)
+    y = np.asarray(sample_y[:size], dtype=np.int64)
+
+    fill, slots, rows = reservoir_writes(len(X), n_seen, len(X_new), size,
+                                         np.random.default_rng([seed, n_seen]))
+    X = np.concatenate([X, np.empty((fill, n_feat))])
+    y = np.concatenate([y, np.empty(fill, dtype=np.int64)])
+    X[slots] = X_new[rows]
+    y[slots] = y_new[rows]
+    return X, y
+
+
+def weight_drift(old, new):
+    """类别权重漂移: 返回 ({类别: 新 - 旧}, L1 总漂移)；旧权重缺失的类别按 0 计"""
+    cats = list(new) + [c for c in old if c not in new]
+    diff = {c: new.get(c, 0.0) - old.get(c, 0.0) for c in cats}
+    return diff, float(sum(abs(v) for v in diff.values()))
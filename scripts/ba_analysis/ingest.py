@@ -0,0 +1,184 @@
+"""
+多份采集结果合并 + 按 (matchId, playerId) 去重 (进程池并行解析)
+
+不同采集名单各自产出一份 wcs_raw_data.json 结构的文件，对局互有重叠。
+    1. 每份文件是一个任务，在 worker 进程里解析，只回传每行的 (matchId, playerId) 与采集时间
+    2. 主进程按文件 collectedAt 从旧到新依次登记，同一 (matchId, playerId) 保留采集时间最新的行，
+       行的位置保持首次出现的顺序 (同一局的行仍然相邻)
+    3. 仍有行被选中的文件再分给 worker，只把选中的行序列化为输出格式的文本
+       (json.dump(indent=2) 走纯 Python 编码器，比解析慢数倍，被覆盖的行不做这一步)
+    4. 主进程直接拼接行文本写出，格式与 collect_data.py 的 json.dump(indent=2) 相同
+
+collectedAt 缺失或无法解析时用文件修改时间；时间相同时命令行中靠后的文件优先。
+
+合并结果的 metadata 记录每行的来源采集时间 (sourceCollectedAt 去重列表 + rowCollectedAt 下标，
+与 dataset 逐行对应)。合并结果再次作为输入时按行取这些时间，而不是文件的 collectedAt
+(那是所有来源中最新的一个，会让旧行压过之后合并进来的较新文件)。
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .cv import thread_split
+
+# 每行在 "dataset" 数组中的缩进 (json.dump(indent=2) 的第二层)
+_ROW_INDENT = ' ' * 4
+
+
+@dataclass
+class MergeResult:
+    rows: list                  # 去重后的行 (已序列化的 JSON 文本)
+    metadata: dict
+    files: int                  # 成功解析的文件数
+    input_rows: int
+    duplicates: int             # 被更新文件覆盖或文件内重复的行数
+    skipped: list = field(default_factory=list)     # [(路径, 原因)]
+    wall_s: float = 0.0
+    workers: int = 1
+
+
+def dump_paths(inputs):
+    """文件 / 目录 (取其中的 *.json，按文件名排序) -> 路径列表 (同一文件只出现一次)"""
+    paths, seen = [], set()
+    for item in inputs:
+        item = Path(item)
+        for p in (sorted(item.glob('*.json')) if item.is_dir() else [item]):
+            r = p.resolve()
+            if r not in seen:
+                seen.add(r)
+                paths.append(p)
+    return paths
+
+
+def _timestamp(collected_at, path):
+    if collected_at:
+        text = str(collected_at)
+        try:
+            dt = datetime.fromisoformat(text[:-1] + '+00:00' if text.endswith('Z') else text)
+            return (dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)).timestamp()
+        except ValueError:
+            pass
+    return os.path.getmtime(path)
+
+
+def _row_text(row):
+    return _ROW_INDENT + json.dumps(row, indent=2, ensure_ascii=False).replace('\n', '\n' + _ROW_INDENT)
+
+
+def _row_stamps(metadata, n_rows):
+    """合并结果中逐行的来源 collectedAt；没有或与行数不符时返回 None"""
+    sources, index = metadata.get('sourceCollectedAt'), metadata.get('rowCollectedAt')
+    if not isinstance(sources, list) or not isinstance(index, list) or len(index) != n_rows:
+        return None
+    try:
+        return [sources[i] for i in index]
+    except (TypeError, IndexError):
+        return None
+
+
+def _scan_dump(path):
+    """
+    worker: 解析一份采集结果
+    返回 (路径, 文件时间戳, collectedAt, [(matchId, playerId)], [逐行 (时间戳, collectedAt)]) 或错误信息
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        return str(path), None, f'无法解析: {e}', None, None
+    if not isinstance(data, dict) or not isinstance(data.get('dataset'), list):
+        return str(path), None, '不是 wcs_raw_data.json 结构 (缺少 dataset)', None, None
+    metadata = data.get('metadata') or {}
+    collected_at = metadata.get('collectedAt')
+    rows = data['dataset']
+    keys = [(str(r.get('matchId')), str(r.get('playerId'))) for r in rows]
+    file_ts = _timestamp(collected_at, path)
+    texts = _row_stamps(metadata, len(rows))
+    if texts is None:
+        stamps = [(file_ts, collected_at)] * len(rows)
+    else:
+        parsed = {t: _timestamp(t, path) for t in set(texts)}
+        stamps = [(parsed[t], t) for t in texts]
+    return str(path), file_ts, collected_at, keys, stamps
+
+
+def _render_rows(task):
+    """worker: 再次解析文件，把选中的行序列化为输出文本"""
+    path, picks = task
+    with open(path, 'r', encoding='utf-8') as f:
+        rows = json.load(f)['dataset']
+    return [_row_text(rows[i]) for i in picks]
+
+
+def merge_dumps(paths, workers=None):
+    """并行解析 paths 并按 (matchId, playerId) 去重，保留采集时间最新的行"""
+    workers, _ = thread_split(max(len(paths), 1), workers, None)
+    t0 = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        def run(fn, tasks):
+            if pool is None:
+                return [fn(t) for t in tasks]
+            return list(pool.map(fn, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+        scanned = run(_scan_dump, paths)
+        skipped = [(p, reason) for p, ts, reason, _, _ in scanned if ts is None]
+        # 按文件时间从旧到新登记 (决定行的位置)，同时间按输入顺序 (sorted 稳定)；
+        # 每行是否覆盖取决于该行自己的采集时间，相同时后登记的优先
+        dumps = sorted((d for d in scanned if d[1] is not None), key=lambda d: d[1])
+        best, stamp_of = {}, {}
+        input_rows = 0
+        for k, (_, _, _, keys, stamps) in enumerate(dumps):
+            input_rows += len(keys)
+            for i, (key, stamp) in enumerate(zip(keys, stamps)):
+                if key not in best or stamp[0] >= stamp_of[key][0]:
+                    best[key] = (k, i)
+                    stamp_of[key] = stamp
+
+        picks = {}
+        for k, i in best.values():
+            picks.setdefault(k, []).append(i)
+        tasks = [(dumps[k][0], sorted(idx)) for k, idx in picks.items()]
+        text_of = {(k, i): text for k, (_, idx), texts in zip(picks, tasks, run(_render_rows, tasks))
+                   for i, text in zip(idx, texts)}
+        rows = [text_of[ki] for ki in best.values()]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    stamps = [d for d in dumps if d[2]]
+    newest = max(stamps, key=lambda d: d[1])[2] if stamps else None
+    row_texts = [stamp_of[key][1] for key in best]
+    sources = sorted({t for t in row_texts if t is not None})
+    source_index = {t: j for j, t in enumerate(sources)}
+    metadata = {
+        'collectedAt': newest,
+        'matchCount': len({m for m, _ in best}),
+        'sampleCount': len(rows),
+        'mergedFrom': len(dumps),
+        # 逐行来源采集时间 (collectedAt 缺失的来源记 null)，再次合并时按行比较
+        'sourceCollectedAt': sources,
+        'rowCollectedAt': [source_index.get(t) for t in row_texts],
+    }
+    return MergeResult(rows=rows, metadata=metadata, files=len(dumps), input_rows=input_rows,
+                       duplicates=input_rows - len(rows), skipped=skipped,
+                       wall_s=time.perf_counter() - t0, workers=workers)
+
+
+def write_merged(path, result):
+    """写出合并结果 (先写临时文件再替换)"""
+    path = Path(path)
+    meta = json.dumps({'metadata': result.metadata}, indent=2, ensure_ascii=False)
+    tmp = path.with_name(f'{path.name}.tmp-{os.getpid()}')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(meta[:-2])
+        f.write(',\n  "dataset": [\n' if result.rows else ',\n  "dataset": []\n}')
+        if result.rows:
+            f.write(',\n'.join(result.rows))
+            f.write('\n  ]\n}')
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,159 @@
+"""
+位掩码阵容引擎
+
+把每个 (matchId, teamId) 一侧的阵容编码成整数位掩码 (每 64 人一个 uint64 字)，
+按 Apriori 逐层统计组合同队出场次数:
+    - 相同阵容先合并计数，每层只对不同阵容做一次向量化的 k 人子集枚举
+    - 不足 min_matches 局的组合，其成员在下一层被剔出对应阵容
+      (超集不可能达标)，枚举量随层数迅速收缩
+代价 ≈ Σ C(阵容内被追踪人数, k)，与名单总人数无关；
+30~60 人的战队名单也能在秒级完成，而不是枚举 2^k 个组合逐一扫描对局。
+"""
+from itertools import combinations
+
+import numpy as np
+
+_WORD_BITS = 64
+
+
+def side_masks(ds, players):
+    """
+    把数据集中 players 的出场记录编码为阵容掩码
+
+    players: 玩家 ID 序列，位序即列表顺序
+    返回 (masks, totals, wins):
+        masks  (U, W) uint64  去重后的阵容掩码 (只含 players 中的人)
+        totals (U,)   int64   该阵容出现的次数 (对局侧数)
+        wins   (U,)   int64   其中获胜的次数
+    """
+    n_words = max(1, (len(players) + _WORD_BITS - 1) // _WORD_BITS)
+    empty = (np.zeros((0, n_words), dtype=np.uint64),
+             np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    if not players:
+        return empty
+
+    # playerId -> 位序 (排序 + 二分查找)
+    keys = np.array([int(pid) for pid in players], dtype=np.int64)
+    key_order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[key_order]
+    pid_col = np.asarray(ds.columns['playerId'], dtype=np.int64)
+    pos = np.searchsorted(sorted_keys, pid_col).clip(0, len(keys) - 1)
+    rows = np.nonzero(sorted_keys[pos] == pid_col)[0]
+    if len(rows) == 0:
+        return empty
+    bit = key_order[pos[rows]]
+
+    # (matchId, teamId) -> 侧编号
+    match_code = np.asarray(ds.match_code, dtype=np.int64)[rows]
+    team = np.asarray(ds.columns['teamId'], dtype=np.int64)[rows]
+    _, side = np.unique(match_code * 256 + team, return_inverse=True)
+    side = side.reshape(-1)
+    n_sides = side.max() + 1
+
+    masks = np.zeros((n_sides, n_words), dtype=np.uint64)
+    np.bitwise_or.at(masks, (side, bit // _WORD_BITS),
+                     np.left_shift(np.uint64(1), (bit % _WORD_BITS).astype(np.uint64)))
+    # 同侧同输赢
+    side_win = np.zeros(n_sides, dtype=np.int64)
+    np.maximum.at(side_win, side, np.asarray(ds.columns['isWin'], dtype=np.int64)[rows])
+
+    # 相同阵容合并计数，后续只需处理不同阵容
+    uniq, inv = np.unique(masks, axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    totals = np.bincount(inv, minlength=len(uniq)).astype(np.int64)
+    wins = np.bincount(inv, weights=side_win, minlength=len(uniq)).astype(np.int64)
+    return uniq, totals, wins
+
+
+def _members(masks, n_players):
+    """(U, W) 掩码 -> (U, m_max) 成员位序矩阵 (升序，空位填 n_players) + 每行人数"""
+    bits = np.unpackbits(np.ascontiguousarray(masks).view(np.uint8), axis=1,
+                         bitorder='little')[:, :n_players]
+    counts = bits.sum(axis=1).astype(np.int64)
+    m_max = int(counts.max()) if len(counts) else 0
+    members = np.full((len(masks), m_max), n_players, dtype=np.int64)
+    rows, cols = np.nonzero(bits)
+    slot = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    members[rows, slot] = cols
+    return members, counts
+
+
+def _count_level(members, counts, totals, wins, k, n_players):
+    """
+    统计所有阵容中出现的 k 人子组合 (按阵容人数分桶，每桶一次向量化枚举)
+    返回 (combos (D, k), support (D,), won (D,))
+    """
+    chunks, sup_parts, won_parts = [], [], []
+    for m in np.unique(counts[counts >= k]):
+        rows = np.nonzero(counts == m)[0]
+        pats = np.array(list(combinations(range(m), k)), dtype=np.int64)
+        chunks.append(members[rows][:, pats].reshape(-1, k))
+        sup_parts.append(np.repeat(totals[rows], len(pats)))
+        won_parts.append(np.repeat(wins[rows], len(pats)))
+    if not chunks:
+        return np.zeros((0, k), dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    tuples = np.concatenate(chunks)
+    if k * np.log2(n_players + 1) < 62:
+        # 名单不大时把 k 元组压成单个 int64 键，去重更快
+        key = np.zeros(len(tuples), dtype=np.int64)
+        for j in range(k):
+            key = key * (n_players + 1) + tuples[:, j]
+        _, first, inv = np.unique(key, return_index=True, return_inverse=True)
+        combos = tuples[first]
+    else:
+        combos, inv = np.unique(tuples, axis=0, return_inverse=True)
+    inv = inv.reshape(-1)
+    sup = np.bincount(inv, weights=np.concatenate(sup_parts), minlength=len(combos))
+    won = np.bincount(inv, weights=np.concatenate(won_parts), minlength=len(combos))
+    return combos, sup.astype(np.int64), won.astype(np.int64)
+
+
+def frequent_lineups(masks, totals, wins, n_players, min_matches=3, min_size=1, max_size=None):
+    """
+    Apriori 统计所有同队出场 ≥ min_matches 的组合
+
+    返回 [(combo, total, wins)]，combo 为升序位序元组，
+    按 (人数, 位序字典序) 排列，与 itertools.combinations 的枚举顺序一致。
+    """
+    max_size = n_players if max_size is None else min(max_size, n_players)
+    members, counts = _members(masks, n_players)
+    results = []
+
+    k = 1
+    while k <= max_size and len(members):
+        combos, sup, won = _count_level(members, counts, totals, wins, k, n_players)
+        keep = sup >= min_matches
+        if not keep.any():
+            break
+        combos, sup, won = combos[keep], sup[keep], won[keep]
+        if k >= min_size:
+            for i in np.lexsort(combos.T[::-1]):
+                results.append((tuple(int(b) for b in combos[i]), int(sup[i]), int(won[i])))
+
+        # 剪枝: 阵容只保留出现在频繁 k 组合中的成员，且人数 > k 才可能含 k+1 组合
+        alive = np.zeros(n_players + 1, dtype=bool)
+        alive[combos.reshape(-1)] = True
+        alive[n_players] = False
+        members = np.where(alive[members], members, n_players)
+        members.sort(axis=1)
+        counts = (members < n_players).sum(axis=1)
+        rows = counts > k
+        members, counts = members[rows], counts[rows]
+        totals, wins = totals[rows], wins[rows]
+        members = members[:, :int(counts.max()) if len(counts) else 0]
+        k += 1
+    return results
+
+
+def lineup_stats(ds, players, min_size=3, max_size=None, min_matches=3):
+    """
+    players 中所有同队出场 ≥ min_matches 局、人数在 [min_size, max_size] 的组合
+
+    返回 [(玩家 ID 元组, 同队局数, 胜场)]，玩家顺序与 players 一致
+    """
+    players = list(players)
+    masks, totals, wins = side_masks(ds, players)
+    found = frequent_lineups(masks, totals, wins, len(players),
+                             min_matches=min_matches, min_size=min_size, max_size=max_size)
+    return [(tuple(players[b] for b in combo), total, won) for combo, total, won in found]
@@ -0,0 +1,219 @@
+"""
+持久化的玩家 → 对局索引
+
+    玩家索引  player_ids (升序) + CSR (player_offsets, player_rows)，每个玩家的行号升序
+    对局阵容  沿用数据集缓存的 match_order / match_offsets (对局编号 -> 行切片)
+    阵容位图  (对局, teamId) -> uint64 位图，第 b 位 = 该局阵容切片中的第 b 行
+
+查询都是二分查找 + 切片: 某玩家的全部出场、两名玩家的共同对局 (同队 / 对阵)、某侧阵容，
+不需要扫描整个数据集。
+
+索引保存在 <数据目录>/.wcs_cache/match_index/。数据集是上次索引的 "追加" 时
+(前 n 行的 playerId / 对局编号与 match_ids 前缀都不变) 只为新行建索引并合并，
+否则整体重建 (向量化排序，同样不解析 JSON)。
+"""
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+
+from .cache import CACHE_DIR_NAME, MANIFEST_NAME, _read_json, _write_json
+
+INDEX_DIR_NAME = 'match_index'
+# 索引文件格式版本，改动存储内容时 +1
+INDEX_VERSION = 1
+# 阵容位图的位数 (单局行数上限)
+ROSTER_BITS = 64
+
+_ARRAYS = ('row_player', 'row_match', 'player_ids', 'player_offsets', 'player_rows',
+           'side_key', 'side_mask')
+
+
+def _side_key(match, team):
+    return np.asarray(match, dtype=np.int64) * 256 + np.asarray(team, dtype=np.int64)
+
+
+def _player_csr(pid):
+    """每行的 playerId -> (升序 ID, offsets, 按 (ID, 行号) 排序的行号)"""
+    order = np.argsort(pid, kind='stable').astype(np.int64)
+    ids, counts = np.unique(pid[order], return_counts=True)
+    offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    return ids.astype(np.int64), offsets, order
+
+
+def _merge_csr(ids, offsets, rows, new_pid, base):
+    """把行号从 base 开始的新行并入已有 CSR，旧行块整体平移，新行接在各玩家块尾部"""
+    new_ids, new_offsets, new_rows = _player_csr(new_pid)
+    all_ids = np.union1d(ids, new_ids)
+    old_cnt = np.zeros(len(all_ids), dtype=np.int64)
+    add_cnt = np.zeros(len(all_ids), dtype=np.int64)
+    old_pos = np.searchsorted(all_ids, ids)
+    add_pos = np.searchsorted(all_ids, new_ids)
+    old_cnt[old_pos] = np.diff(offsets)
+    add_cnt[add_pos] = np.diff(new_offsets)
+    out_offsets = np.concatenate(([0], np.cumsum(old_cnt + add_cnt))).astype(np.int64)
+
+    out = np.empty(out_offsets[-1], dtype=np.int64)
+    # 旧行: 每个块的起点从 offsets[k] 移到 out_offsets[old_pos[k]]
+    shift = np.repeat(out_offsets[old_pos] - offsets[:-1], np.diff(offsets))
+    out[np.arange(len(rows)) + shift] = rows
+    # 新行: 接在该玩家旧块之后
+    start = out_offsets[add_pos] + old_cnt[add_pos]
+    shift = np.repeat(start - new_offsets[:-1], np.diff(new_offsets))
+    out[np.arange(len(new_rows)) + shift] = new_rows + base
+    return all_ids, out_offsets, out
+
+
+def _side_masks(ds, matches):
+    """指定对局的 (side_key, 位图)，side_key 升序"""
+    order, offsets = ds.match_groups()
+    matches = np.asarray(matches, dtype=np.int64)
+    sizes = offsets[matches + 1] - offsets[matches]
+    if len(sizes) and sizes.max() > ROSTER_BITS:
+        raise ValueError(f'单局行数超过 {ROSTER_BITS}，无法编码阵容位图')
+    starts = np.repeat(offsets[matches], sizes)
+    pos = np.arange(sizes.sum()) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    rows = np.asarray(order, dtype=np.int64)[starts + pos]
+    key = _side_key(np.repeat(matches, sizes), np.asarray(ds.columns['teamId'])[rows])
+    keys, inv = np.unique(key, return_inverse=True)
+    masks = np.zeros(len(keys), dtype=np.uint64)
+    np.bitwise_or.at(masks, inv.reshape(-1), np.left_shift(np.uint64(1), pos.astype(np.uint64)))
+    return keys, masks
+
+
+class MatchIndex:
+    """数据集 + 玩家/阵容索引；行号即数据集行号"""
+
+    def __init__(self, ds, arrays):
+        self.ds = ds
+        for name in _ARRAYS:
+            setattr(self, name, arrays[name])
+
+    # ---------- 玩家 ----------
+    def rows_of(self, pid):
+        """该玩家的全部出场行号 (升序)"""
+        k = np.searchsorted(self.player_ids, int(pid))
+        if k == len(self.player_ids) or self.player_ids[k] != int(pid):
+            return self.player_rows[:0]
+        return self.player_rows[self.player_offsets[k]:self.player_offsets[k + 1]]
+
+    def matches_of(self, pid):
+        """该玩家的对局编号 (按出场行序)"""
+        return self.row_match[self.rows_of(pid)]
+
+    def shared(self, a, b):
+        """
+        两名玩家的共同对局
+        返回 (对局编号, a 的行号, b 的行号, 是否同队)，按对局编号升序
+        """
+        ra, rb = self.rows_of(a), self.rows_of(b)
+        ma, mb = self.row_match[ra], self.row_match[rb]
+        matches, ia, ib = np.intersect1d(ma, mb, return_indices=True)
+        ra, rb = ra[ia], rb[ib]
+        team = self.ds.columns['teamId']
+        return matches, ra, rb, np.asarray(team[ra] == team[rb])
+
+    # ---------- 对局 ----------
+    def roster(self, match):
+        """该局全部行号"""
+        order, offsets = self.ds.match_groups()
+        return order[offsets[match]:offsets[match + 1]]
+
+    def side(self, match, team):
+        """该局某一方的行号 (按位图解码)"""
+        key = _side_key(match, team)
+        k = np.searchsorted(self.side_key, key)
+        if k == len(self.side_key) or self.side_key[k] != key:
+            return self.roster(match)[:0]
+        roster = self.roster(match)
+        bits = (int(self.side_mask[k]) >> np.arange(len(roster))) & 1
+        return roster[bits.astype(bool)]
+
+
+def _build(ds):
+    pid = np.asarray(ds.columns['playerId'], dtype=np.int64)
+    ids, offsets, rows = _player_csr(pid)
+    keys, masks = _side_masks(ds, np.arange(len(ds.match_ids)))
+    return {
+        'row_player': pid,
+        'row_match': np.asarray(ds.match_code, dtype=np.int32),
+        'player_ids': ids, 'player_offsets': offsets, 'player_rows': rows,
+        'side_key': keys, 'side_mask': masks,
+    }
+
+
+def _extend(ds, old, n0):
+    """只为第 n0 行之后的新行建索引，合并进旧索引"""
+    pid = np.asarray(ds.columns['playerId'], dtype=np.int64)
+    match_code = np.asarray(ds.match_code, dtype=np.int32)
+    ids, offsets, rows = _merge_csr(np.asarray(old['player_ids']), np.asarray(old['player_offsets']),
+                                    np.asarray(old['player_rows']), pid[n0:], n0)
+    # 新行涉及的对局 (可能包含旧对局的补充行) 重新编码位图
+    touched = np.unique(match_code[n0:]).astype(np.int64)
+    new_keys, new_masks = _side_masks(ds, touched)
+    old_keys, old_masks = np.asarray(old['side_key']), np.asarray(old['side_mask'])
+    keep = ~np.isin(old_keys // 256, touched)
+    keys = np.concatenate([old_keys[keep], new_keys])
+    masks = np.concatenate([old_masks[keep], new_masks])
+    order = np.argsort(keys, kind='stable')
+    return {
+        'row_player': pid, 'row_match': match_code,
+        'player_ids': ids, 'player_offsets': offsets, 'player_rows': rows,
+        'side_key': keys[order], 'side_mask': masks[order],
+    }
+
+
+def _is_prefix(ds, manifest, arrays):
+    n0 = manifest['rows']
+    if n0 > len(ds) or manifest['match_ids'] != ds.match_ids[:len(manifest['match_ids'])]:
+        return False
+    return (np.array_equal(arrays['row_player'], np.asarray(ds.columns['playerId'][:n0], dtype=np.int64))
+            and np.array_equal(arrays['row_match'], np.asarray(ds.match_code[:n0], dtype=np.int32)))
+
+
+def _load(index_dir, mmap_mode='r'):
+    manifest = _read_json(index_dir / MANIFEST_NAME)
+    if not manifest or manifest.get('version') != INDEX_VERSION:
+        return None, None
+    try:
+        return manifest, {name: np.load(index_dir / f'{name}.npy', mmap_mode=mmap_mode) for name in _ARRAYS}
+    except (OSError, ValueError):
+        return None, None
+
+
+def _save(index_dir, ds, arrays):
+    tmp = index_dir.with_name(f'{index_dir.name}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name in _ARRAYS:
+        np.save(tmp / f'{name}.npy', arrays[name])
+    _write_json(tmp / MANIFEST_NAME, {'version': INDEX_VERSION, 'rows': len(ds), 'match_ids': ds.match_ids})
+    shutil.rmtree(index_dir, ignore_errors=True)
+    try:
+        os.replace(tmp, index_dir)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def open_match_index(ds, data_path, cache_dir=None, rebuild=False):
+    """
+    打开 (必要时增量更新 / 重建) 数据集的玩家对局索引
+    返回 (MatchIndex, 状态)，状态为 'hit' / 'extended' / 'built'
+    """
+    cache_dir = Path(cache_dir) if cache_dir else Path(data_path).resolve().parent / CACHE_DIR_NAME
+    index_dir = cache_dir / INDEX_DIR_NAME
+    manifest, arrays = (None, None) if rebuild else _load(index_dir)
+    if manifest and manifest['rows'] == len(ds) and _is_prefix(ds, manifest, arrays):
+        return MatchIndex(ds, arrays), 'hit'
+
+    # 需要改写索引: 先放开 mmap (Windows 下被映射的文件无法删除)，旧索引读入内存
+    arrays = None
+    manifest, arrays = (None, None) if rebuild else _load(index_dir, mmap_mode=None)
+    if manifest and _is_prefix(ds, manifest, arrays):
+        arrays, status = _extend(ds, arrays, manifest['rows']), 'extended'
+    else:
+        arrays, status = _build(ds), 'built'
+    _save(index_dir, ds, arrays)
+    manifest, saved = _load(index_dir)
+    return MatchIndex(ds, saved or arrays), status
@@ -0,0 +1,237 @@
+"""
+全体玩家的稀疏配对矩阵
+
+一次向量化遍历所有对局阵容 (matchId / teamId / isWin)，得到 player × player 的稀疏矩阵:
+    together       同队局数
+    together_wins  同队且获胜局数
+    opposed        对阵局数
+    opposed_wins   对阵且行玩家获胜局数
+四个量对称 (opposed_wins 的转置 = opposed - opposed_wins)，只存上三角 (行号 < 列号) 的 CSR，
+且只存真实出现过的组合，内存 ∝ 共同出场的玩家对数。
+配对效应、「有我/没我」影响、对手效应和蛆指数都在矩阵非零元上做向量运算。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# 单批生成的玩家对上限，控制中间数组内存
+_CHUNK_PAIRS = 1 << 23
+
+
+@dataclass
+class PairMatrix:
+    """上三角 CSR: 第 i 行的非零元位于 indptr[i]:indptr[i+1]，列号 > i 且已排序"""
+    player_ids: np.ndarray    # (P,) 升序 playerId，行/列编号即下标
+    games: np.ndarray         # (P,) 出场局数
+    wins: np.ndarray          # (P,) 胜场
+    indptr: np.ndarray        # (P+1,)
+    indices: np.ndarray       # (nnz,)
+    together: np.ndarray
+    together_wins: np.ndarray
+    opposed: np.ndarray
+    opposed_wins: np.ndarray
+
+    @property
+    def n_players(self):
+        return len(self.player_ids)
+
+    def codes(self, pids):
+        """playerId -> 行号 (不存在为 -1)"""
+        pids = np.atleast_1d(np.asarray(pids, dtype=np.int64))
+        pos = np.searchsorted(self.player_ids, pids).clip(0, max(self.n_players - 1, 0))
+        found = self.player_ids[pos] == pids if self.n_players else np.zeros(len(pids), bool)
+        return np.where(found, pos, -1)
+
+    def row_of(self):
+        """每个非零元所在行号"""
+        return np.repeat(np.arange(self.n_players), np.diff(self.indptr))
+
+    def lookup(self, i, j):
+        """(i, j) 行列号数组 -> 非零元下标 (不存在为 -1)，i / j 顺序无关"""
+        i = np.atleast_1d(np.asarray(i, dtype=np.int64))
+        j = np.atleast_1d(np.asarray(j, dtype=np.int64))
+        i, j = np.minimum(i, j), np.maximum(i, j)
+        out = np.full(len(i), -1, dtype=np.int64)
+        ok = (i >= 0) & (j >= 0)
+        key = i[ok] * self.n_players + j[ok]
+        all_keys = self.row_of() * self.n_players + self.indices
+        pos = np.searchsorted(all_keys, key).clip(0, max(len(all_keys) - 1, 0))
+        hit = all_keys[pos] == key if len(all_keys) else np.zeros(len(key), bool)
+        out[np.nonzero(ok)[0][hit]] = pos[hit]
+        return out
+
+    def directed(self):
+        """
+        展开为有向非零元 (两个方向各一条)
+        返回 (行, 列, together, together_wins, opposed, opposed_wins)
+        """
+        r, c = self.row_of(), self.indices
+        return (np.concatenate([r, c]), np.concatenate([c, r]),
+                np.concatenate([self.together, self.together]),
+                np.concatenate([self.together_wins, self.together_wins]),
+                np.concatenate([self.opposed, self.opposed]),
+                np.concatenate([self.opposed_wins, self.opposed - self.opposed_wins]))
+
+    def win_rates(self, default=0.5):
+        """个人胜率，无出场时取 default"""
+        return np.where(self.games > 0, self.wins / np.maximum(self.games, 1), default)
+
+
+def _match_pairs(match_order, match_offsets, chunk_pairs=_CHUNK_PAIRS):
+    """按对局人数分桶，批量产出同一对局内所有无序行对 (a, b)"""
+    sizes = np.diff(match_offsets)
+    for m in np.unique(sizes[sizes >= 2]):
+        starts = match_offsets[:-1][sizes == m]
+        ia, ib = np.triu_indices(m, k=1)
+        per_batch = max(1, chunk_pairs // len(ia))
+        for s in range(0, len(starts), per_batch):
+            rows = match_order[starts[s:s + per_batch, None] + np.arange(m)]
+            yield rows[:, ia].reshape(-1), rows[:, ib].reshape(-1)
+
+
+def build_pair_matrix(ds, chunk_pairs=_CHUNK_PAIRS):
+    """从数据集一次性构建全体玩家的 PairMatrix"""
+    pid_col = np.asarray(ds.columns['playerId'], dtype=np.int64)
+    team = np.asarray(ds.columns['teamId'], dtype=np.int64)
+    win = np.asarray(ds.columns['isWin'], dtype=np.int64)
+    player_ids, code = np.unique(pid_col, return_inverse=True)
+    code = code.reshape(-1)
+    n_players = len(player_ids)
+    games = np.bincount(code, minlength=n_players).astype(np.int64)
+    wins = np.bincount(code, weights=win, minlength=n_players).astype(np.int64)
+
+    order, offsets = ds.match_groups()
+    order = np.asarray(order, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+
+    # 分批聚合 (key = 小行号 * P + 大行号)，最后合并
+    parts = []
+    for a, b in _match_pairs(order, offsets, chunk_pairs):
+        ca, cb = code[a], code[b]
+        swap = ca > cb
+        lo = np.where(swap, cb, ca)
+        hi = np.where(swap, ca, cb)
+        keep = lo != hi
+        key = (lo * n_players + hi)[keep]
+        same = (team[a] == team[b])[keep]
+        row_win = np.where(swap, win[b], win[a])[keep]
+        keys, inv = np.unique(key, return_inverse=True)
+        vals = np.stack([
+            np.bincount(inv, weights=same, minlength=len(keys)),
+            np.bincount(inv, weights=same * row_win, minlength=len(keys)),
+            np.bincount(inv, weights=~same, minlength=len(keys)),
+            np.bincount(inv, weights=~same * row_win, minlength=len(keys)),
+        ]).astype(np.int32)
+        parts.append((keys, vals))
+
+    if len(parts) == 1:
+        keys, vals = parts[0]
+    elif parts:
+        keys, inv = np.unique(np.concatenate([k for k, _ in parts]), return_inverse=True)
+        vals_all = np.concatenate([v for _, v in parts], axis=1)
+        parts.clear()
+        vals = np.stack([np.bincount(inv.reshape(-1), weights=v, minlength=len(keys)) for v in vals_all])
+    else:
+        keys = np.zeros(0, dtype=np.int64)
+        vals = np.zeros((4, 0))
+    vals = vals.astype(np.int32)
+
+    rows = keys // max(n_players, 1)
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=n_players)))).astype(np.int64)
+    return PairMatrix(
+        player_ids=player_ids,
+        games=games,
+        wins=wins,
+        indptr=indptr,
+        indices=keys % max(n_players, 1),
+        together=vals[0],
+        together_wins=vals[1],
+        opposed=vals[2],
+        opposed_wins=vals[3],
+    )
+
+
+def pair_effects(pm, min_together=2, subset=None):
+    """
+    配对效应 (每个无序对只算一次，i < j)
+    effect = 同队胜率 - (i 个人胜率 + j 个人胜率) / 2
+    subset: 可选行号数组，只保留双方都在其中的配对
+    """
+    rows = pm.row_of()
+    sel = pm.together >= min_together
+    if subset is not None:
+        member = np.zeros(pm.n_players, dtype=bool)
+        member[np.asarray(subset, dtype=np.int64)] = True
+        sel &= member[rows] & member[pm.indices]
+    i, j = rows[sel], pm.indices[sel]
+    together = pm.together[sel]
+    wins = pm.together_wins[sel]
+    wr = pm.win_rates()
+    together_wr = wins / together
+    expected = (wr[i] + wr[j]) / 2
+    return {
+        'i': i, 'j': j,
+        'together': together, 'wins': wins,
+        'wr': together_wr, 'a_wr': wr[i], 'b_wr': wr[j],
+        'expected': expected,
+        'effect': together_wr - expected,
+    }
+
+
+def teammate_impact(pm, min_with=2, min_without=2, subset=None):
+    """
+    个人对队友的影响 (有向: x 对 o)
+    从 o 的视角: x 在 o 队里时 o 的胜率 - x 不在 o 队里时 o 的胜率
+    """
+    x, o, with_n, with_w, _, _ = pm.directed()
+    without_n = pm.games[o] - with_n
+    without_w = pm.wins[o] - with_w
+    sel = (with_n >= min_with) & (without_n >= min_without)
+    if subset is not None:
+        member = np.zeros(pm.n_players, dtype=bool)
+        member[np.asarray(subset, dtype=np.int64)] = True
+        sel &= member[x] & member[o]
+    with_wr = with_w[sel] / with_n[sel]
+    without_wr = without_w[sel] / without_n[sel]
+    return {
+        'x': x[sel], 'o': o[sel],
+        'with': with_n[sel], 'with_wr': with_wr,
+        'without': without_n[sel], 'without_wr': without_wr,
+        'delta': with_wr - without_wr,
+    }
+
+
+def opponent_effects(pm, min_opposed=1, min_without=2):
+    """
+    对手效应 (有向): 面对 o 时 x 的胜率 - 不面对 o 时 x 的胜率
+    基准去掉与 o 的对局，否则只出场过一次的对手效应恒为 0
+    """
+    x, o, _, _, opposed, opposed_wins = pm.directed()
+    without_n = pm.games[x] - opposed
+    sel = (opposed >= min_opposed) & (without_n >= min_without)
+    vs_wr = opposed_wins[sel] / opposed[sel]
+    without_wr = (pm.wins[x[sel]] - opposed_wins[sel]) / without_n[sel]
+    return {
+        'x': x[sel], 'o': o[sel],
+        'opposed': opposed[sel], 'vs_wr': vs_wr,
+        'without': without_n[sel], 'without_wr': without_wr,
+        'effect': vs_wr - without_wr,
+    }
+
+
+def opponent_pressure(pm, effects):
+    """对手压制: 每个玩家 o 的全部对手在面对 o 时的平均胜率变化 (负 = o 压制对手) 及对手数"""
+    n = pm.n_players
+    count = np.bincount(effects['o'], minlength=n)
+    total = np.bincount(effects['o'], weights=effects['effect'], minlength=n)
+    return np.where(count > 0, total / np.maximum(count, 1), 0.0), count
+
+
+def maggot_index(pm, effects):
+    """蛆指数: 每个玩家所在全部配对效应的平均值 (无配对为 0) 及配对数"""
+    n = pm.n_players
+    idx = np.concatenate([effects['i'], effects['j']])
+    eff = np.concatenate([effects['effect'], effects['effect']])
+    count = np.bincount(idx, minlength=n)
+    total = np.bincount(idx, weights=eff, minlength=n)
+    return np.where(count > 0, total / np.maximum(count, 1), 0.0), count
@@ -0,0 +1,244 @@
+"""
+WCS 权重分析管线 (可导入的分阶段 API)
+
+    ds = load(path)                          列式缓存加载 (isWin 修正 + 交互特征已完成)
+    feats = prepare(ds)                      特征矩阵 + 标签 + 对局分组
+    feats = rank(feats)                      按 matchId 百分位化，去掉零方差特征
+    model, cv = train(feats)                 按对局分组的 CV + 全量训练，进程池并行 (此时才 import xgboost)
+    stats, shap_values = explain(model, feats)  SHAP 汇总统计 (此时才 import shap)
+    agg = aggregate(feats.names, stats)      全局重要性 / 分类别权重 / 胜败对比
+    result = report(agg, cv.scores, ds)      wcs_shap_analysis.json 的内容
+
+只有 train / explain / plot_summary 会 import 重量级库，
+team_effect、类别重新汇总 (python -m ba_analysis categories)、--help 等都不需要付这笔启动开销。
+"""
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+import numpy as np
+
+from .artifacts import artifact_key
+from .cache import load_cached_dataset
+from .cv import grouped_cv
+from .ranking import match_percentile
+from .shap_stats import explain_chunked, shap_stats
+from .shap_stats import chunk_rows_for_budget as shap_chunk_rows
+
+# XGBoost 超参 (同时参与训练产物缓存键)
+MODEL_PARAMS = {
+    'n_estimators': 200,
+    'max_depth': 4,
+    'learning_rate': 0.1,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'random_state': 42,
+    'use_label_encoder': False,
+    'eval_metric': 'logloss',
+}
+CV_FOLDS = 5
+# CV 切分方式 (参与缓存键): 同一 matchId 的行落在同一折
+CV_SPLIT = 'match'
+
+# 排除标签和非特征字段
+EXCLUDE_FIELDS = {'matchId', 'playerId', 'teamId', 'isWin',
+                  'oldRating', 'newRating', 'ratingDelta'}
+
+# 分类别汇总 (雷达图维度)
+CATEGORIES = {
+    '经济管理': ['totalSpawned', 'totalRefunded', 'refundRate', 'netInvestment',
+               'supplyConsumed'],
+    '战斗效率': ['costEfficiency', 'damageTrade', 'dlRatio', 'survivalRate',
+               'tankEfficiency', 'lossEfficiency'],
+    '火力输出': ['damageDealt', 'destructionScore', 'damageReceived',
+               'firepowerROI', 'combatPresence'],
+    '战场贡献': ['lossesScore', 'teamLossShare', 'teamDmgShare',
+               'teamDestShare', 'teamSpawnShare'],
+    '战略目标': ['objectivesCaptured', 'supplyCaptured', 'buildingsDestroyed'],
+    '团队协作': ['supplyFromAllies', 'supplyToAllies', 'uniqueUnits', 'unitCount'],
+}
+
+# WCS 配置中留给 winBonus 的权重
+WIN_BONUS = 0.15
+
+
+@dataclass
+class Features:
+    """一份训练输入: X 的列与 names 对应，groups 为每行的对局编号"""
+    names: list
+    X: np.ndarray
+    y: np.ndarray
+    groups: np.ndarray
+    removed: list = field(default_factory=list)
+
+
+@dataclass
+class Aggregate:
+    """SHAP 汇总后的报告数据"""
+    names: list
+    mean_abs: np.ndarray
+    mean: np.ndarray
+    importance: list       # [(特征, mean |SHAP|, 带方向均值)]，按重要性降序
+    categories: dict       # {类别: {'total': Σ mean |SHAP|, 'features': [(特征, |SHAP|, 方向)]}}
+    total: float
+    win_vs_lose: list      # [(特征, 胜方均值, 败方均值)]，按差异降序
+
+
+def resolve_data_path(path):
+    """依次尝试 path / scripts/path / ../path，都不存在时原样返回"""
+    for p in [path, f'scripts/{path}', f'../{path}']:
+        if Path(p).exists():
+            return p
+    return path
+
+
+def load(data_path, cache_dir=None, rebuild=False):
+    return load_cached_dataset(data_path, cache_dir=cache_dir, rebuild=rebuild)
+
+
+def prepare(ds, exclude=EXCLUDE_FIELDS, rows=None):
+    """取特征列 (排除标签和非特征字段)；rows 为可选的行下标子集"""
+    names = [k for k in ds.fields if k not in exclude]
+    y = ds.columns['isWin'].astype(np.int64)
+    groups = np.asarray(ds.match_code)
+    if rows is None:
+        X = ds.matrix(names)
+    else:
+        X = np.column_stack([np.asarray(ds.columns[f])[rows] for f in names]).astype(np.float64)
+        y, groups = y[rows], groups[rows]
+    return Features(names=names, X=X, y=y, groups=groups)
+
+
+def rank(feats, drop_constant=True):
+    """按 matchId 百分位化；drop_constant 时去掉零方差特征 (记录在 removed)"""
+    X_pct = match_percentile(feats.X, feats.groups)
+    if not drop_constant:
+        return replace(feats, X=X_pct)
+    valid = np.std(X_pct, axis=0) > 1e-8
+    return replace(
+        feats,
+        names=[f for f, v in zip(feats.names, valid) if v],
+        X=X_pct[:, valid],
+        removed=feats.removed + [f for f, v in zip(feats.names, valid) if not v],
+    )
+
+
+def select(feats, names):
+    """按给定特征列表取列 (增量模式沿用上次的特征集)"""
+    idx = [feats.names.index(f) for f in names]
+    return replace(feats, names=list(names), X=feats.X[:, idx])
+
+
+def cross_validate(feats, params=MODEL_PARAMS, cv_folds=CV_FOLDS, workers=None, threads=None):
+    """
+    按对局分组的 XGBoost 交叉验证，返回 CvResult (.scores 为每折准确率，.folds 为每折耗时)
+    workers / threads: 并行折数与每个模型的线程数，缺省按 CPU 核数切分
+    """
+    return grouped_cv(feats.X, feats.y, feats.groups, params, cv_folds, workers, threads)
+
+
+def fit(feats, params=MODEL_PARAMS, **fit_kwargs):
+    """XGBoost 全量训练；fit_kwargs 透传给 XGBClassifier.fit (如 xgb_model 续训)"""
+    from xgboost import XGBClassifier
+    return XGBClassifier(**params).fit(feats.X, feats.y, **fit_kwargs)
+
+
+def train(feats, params=MODEL_PARAMS, cv_folds=CV_FOLDS, workers=None, threads=None):
+    """交叉验证 + 全量训练 (全量训练作为额外任务与各折并行)，返回 (model, CvResult)"""
+    cv = grouped_cv(feats.X, feats.y, feats.groups, params, cv_folds, workers, threads, fit_full=True)
+    return cv.model, cv
+
+
+def cache_key(feats, params=MODEL_PARAMS, cv_folds=CV_FOLDS, shap_mode=None):
+    """训练产物缓存键 (regress_weights.py 与 python -m ba_analysis categories 共用)"""
+    return artifact_key(feats.X, feats.y, feats.names, params,
+                        cv_folds=cv_folds, cv_split=CV_SPLIT, shap_chunked=shap_mode)
+
+
+def explain(model, feats, memory_mb=None, plot_sample=2000):
+    """
+    SHAP 汇总，返回 (ShapStats, shap_values)
+    memory_mb 给定时分块计算，只保留流式统计量 + plot_sample 行样本，shap_values 为 None
+    """
+    import shap
+    explainer = shap.TreeExplainer(model)
+    if memory_mb is not None:
+        chunk_rows = shap_chunk_rows(len(feats.names), memory_mb, plot_sample)
+        return explain_chunked(explainer, feats.X, feats.y, chunk_rows, plot_sample), None
+    shap_values = explainer.shap_values(feats.X)
+    return shap_stats(shap_values, feats.y), shap_values
+
+
+def aggregate(names, stats, categories=CATEGORIES):
+    """全局重要性、分类别汇总、胜败对比"""
+    mean_abs, mean = stats.mean_abs, stats.mean
+    importance = sorted(zip(names, mean_abs, mean), key=lambda x: -x[1])
+
+    fname_to_idx = {f: i for i, f in enumerate(names)}
+    cats = {}
+    for cat, features in categories.items():
+        cat_shap = 0
+        cat_features = []
+        for f in features:
+            if f in fname_to_idx:
+                idx = fname_to_idx[f]
+                cat_shap += mean_abs[idx]
+                cat_features.append((f, mean_abs[idx], mean[idx]))
+        cats[cat] = {'total': cat_shap, 'features': cat_features}
+    total = sum(v['total'] for v in cats.values())
+
+    win_vs_lose = sorted(zip(names, stats.win_mean, stats.lose_mean), key=lambda x: -(x[1] - x[2]))
+    return Aggregate(names=list(names), mean_abs=mean_abs, mean=mean, importance=importance,
+                     categories=cats, total=total, win_vs_lose=win_vs_lose)
+
+
+def category_weights(names, mean_abs_shap, categories=CATEGORIES):
+    """各类别 mean |SHAP| 之和归一化后的权重 (float)"""
+    fname_to_idx = {f: i for i, f in enumerate(names)}
+    totals = {cat: sum((mean_abs_shap[fname_to_idx[f]] for f in features if f in fname_to_idx), 0)
+              for cat, features in categories.items()}
+    total_imp = sum(totals.values())
+    return {cat: float(v / total_imp) if total_imp > 0 else 0.0 for cat, v in totals.items()}
+
+
+def report(agg, cv_scores, ds, interactions=None, params=None):
+    """
+    wcs_shap_analysis.json 的内容；interactions 为 [(特征1, 特征2, 强度)] (Tree SHAP 交互模式)，
+    params 为非默认超参 (超参搜索的最优配置)
+    """
+    result = {
+        'method': 'XGBoost + SHAP',
+        'cv_accuracy': float(cv_scores.mean()),
+        'cv_std': float(cv_scores.std()),
+        'cv_split': CV_SPLIT,
+        'global_shap_importance': {f: float(v) for f, v in zip(agg.names, agg.mean_abs)},
+        'global_shap_direction': {f: float(v) for f, v in zip(agg.names, agg.mean)},
+        'category_weights': {cat: float(info['total'] / agg.total) for cat, info in agg.categories.items()},
+        'win_vs_lose_shap': {
+            f: {'win': float(w), 'lose': float(l), 'diff': float(w-l)}
+            for f, w, l in agg.win_vs_lose
+        },
+        'sample_count': len(ds),
+        'match_count': ds.metadata['matchCount'],
+    }
+    if params is not None:
+        result['model_params'] = params
+    if interactions is not None:
+        result['shap_interactions'] = [
+            {'features': [f1, f2], 'mean_abs_interaction': float(v)} for f1, f2, v in interactions
+        ]
+    return result
+
+
+def plot_summary(shap_values, X, names, path, max_display=20):
+    """SHAP Summary Plot (此时才 import shap / matplotlib)"""
+    import shap
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(12, 8))
+    shap.summary_plot(shap_values, X, feature_names=names, show=False, max_display=max_display)
+    plt.tight_layout()
+    plt.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close()
+    return path
@@ -0,0 +1,285 @@
+"""
+分阶段计时与内存测量
+
+每个阶段记录:
+    wall_s / cpu_s        墙钟与进程 CPU 时间 (CPU > 墙钟说明用上了多线程)
+    peak_rss_mb           阶段内进程 RSS 峰值 (后台线程轮询当前 RSS: Linux 读 /proc/self/statm，
+                          Windows 用 GetProcessMemoryInfo 的 WorkingSetSize，macOS 用 proc_pid_rusage；
+                          都不可用时为 None。ru_maxrss 是进程生命周期峰值，后面的阶段会继承前面的峰值，不采用)
+    tracemalloc_peak_mb   阶段内 Python / NumPy 分配峰值 (可选，xgboost 等 C++ 内存不计入；
+                          无法轮询 RSS 的平台上 --profile 自动开启)
+以及调用方给出的 rows / features 等计数。
+
+measure()  单个 with 块的测量 (benchmark.py)
+Profiler   脚本内按顺序切换阶段，不需要改动代码缩进:
+    prof.stage('load')  ...  prof.stage('train', rows=n)  ...  prof.save(path)
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+_MB = 1 << 20
+_STATM = '/proc/self/statm'
+
+
+def _statm_reader():
+    if not os.path.exists(_STATM):
+        return None
+    page = os.sysconf('SC_PAGE_SIZE')
+
+    def read():
+        with open(_STATM, 'rb') as f:
+            return int(f.read().split()[1]) * page
+    return read
+
+
+def _windows_reader():
+    """GetProcessMemoryInfo 的 WorkingSetSize (当前工作集，可轮询)"""
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + \
+                   [(name, ctypes.c_size_t) for name in (
+                       'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                       'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+    kernel32 = ctypes.WinDLL('kernel32')
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    get_info = kernel32.K32GetProcessMemoryInfo
+    get_info.argtypes = [wintypes.HANDLE, ctypes.POINTER(Counters), wintypes.DWORD]
+    get_info.restype = wintypes.BOOL
+    handle = kernel32.GetCurrentProcess()
+    counters = Counters()
+    counters.cb = ctypes.sizeof(Counters)
+
+    def read():
+        if not get_info(handle, ctypes.byref(counters), counters.cb):
+            raise OSError('GetProcessMemoryInfo 失败')
+        return counters.WorkingSetSize
+    return read
+
+
+def _darwin_reader():
+    """proc_pid_rusage(RUSAGE_INFO_V2) 的 ri_resident_size (当前驻留内存；ru_maxrss 是进程生命周期峰值)"""
+    import ctypes
+
+    libc = ctypes.CDLL('/usr/lib/libSystem.B.dylib')
+    libc.proc_pid_rusage.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+    libc.proc_pid_rusage.restype = ctypes.c_int
+    pid = os.getpid()
+    # rusage_info_v2: uuid[16] 之后依次为 uint64 的 user_time / system_time / pkg_idle_wkups /
+    # interrupt_wkups / pageins / wired_size / resident_size ...；缓冲区取足够大
+    buf = (ctypes.c_uint64 * 64)()
+
+    def read():
+        if libc.proc_pid_rusage(pid, 2, buf) != 0:
+            raise OSError('proc_pid_rusage 失败')
+        return int(buf[2 + 6])
+    return read
+
+
+def _make_rss_reader():
+    """当前平台读取进程当前 RSS 的函数，不支持时为 None"""
+    if sys.platform == 'win32':
+        factory = _windows_reader
+    elif sys.platform == 'darwin':
+        factory = _darwin_reader
+    else:
+        factory = _statm_reader
+    try:
+        read = factory()
+        if read is not None:
+            read()
+        return read
+    except (OSError, AttributeError, ValueError):
+        return None
+
+
+_read_rss = _make_rss_reader()
+
+
+def _rss_bytes():
+    if _read_rss is None:
+        return None
+    try:
+        return _read_rss()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def rss_available():
+    return _read_rss is not None
+
+
+class _RssSampler(threading.Thread):
+    """后台轮询 RSS，记录峰值"""
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = _rss_bytes() or 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            rss = _rss_bytes()
+            if rss is not None and rss > self.peak:
+                self.peak = rss
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        rss = _rss_bytes()
+        if rss is not None and rss > self.peak:
+            self.peak = rss
+        return self.peak
+
+
+class _Meter:
+    """一次测量: start() 开始，stop(record) 把结果写入 record"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+
+    def start(self):
+        self.sampler = _RssSampler() if rss_available() else None
+        if self.sampler:
+            self.sampler.start()
+        self.tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if self.tracing:
+            tracemalloc.start()
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        self.wall0, self.cpu0 = time.perf_counter(), time.process_time()
+        return self
+
+    def stop(self, record):
+        record['wall_s'] = time.perf_counter() - self.wall0
+        record['cpu_s'] = time.process_time() - self.cpu0
+        if self.trace_memory:
+            record['tracemalloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / _MB
+            if self.tracing:
+                tracemalloc.stop()
+        peak = self.sampler.stop() if self.sampler else None
+        record['peak_rss_mb'] = peak / _MB if peak is not None else None
+        return record
+
+
+@contextmanager
+def measure(record, trace_memory=False):
+    """
+    测量 with 块，把结果写入 record (dict)；
+    trace_memory=True 时同时统计 tracemalloc 峰值 (会使纯 Python 代码明显变慢)
+    """
+    meter = _Meter(trace_memory).start()
+    try:
+        yield record
+    finally:
+        meter.stop(record)
+
+
+class Profiler:
+    """
+    按顺序记录脚本各阶段；enabled=False 时所有方法都是空操作
+    cprofile_stage: 对该阶段额外运行 cProfile，save() 时写出 .prof 文件
+    """
+
+    def __init__(self, enabled=False, trace_memory=False, cprofile_stage=None):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self.cprofile_stage = cprofile_stage
+        self.stages = []
+        self._current = None
+        self._meter = None
+        self._cprofile = None
+        self._t0 = time.perf_counter()
+
+    def stage(self, name, **counts):
+        """结束当前阶段并开始 name 阶段；counts 为行数 / 特征数等附加信息"""
+        if not self.enabled:
+            return
+        self.end()
+        self._current = {'stage': name, **counts}
+        if name == self.cprofile_stage:
+            self._cprofile = self._cprofile or cProfile.Profile()
+            self._cprofile.enable()
+        self._meter = _Meter(self.trace_memory).start()
+
+    def note(self, **counts):
+        """给当前阶段补充计数 (阶段中途才知道的行数等)"""
+        if self.enabled and self._current is not None:
+            self._current.update(counts)
+
+    def end(self):
+        """结束当前阶段 (没有进行中的阶段时为空操作)"""
+        if not self.enabled or self._current is None:
+            return
+        self._meter.stop(self._current)
+        if self._current['stage'] == self.cprofile_stage:
+            self._cprofile.disable()
+        self.stages.append(self._current)
+        self._current = None
+
+    def report(self):
+        """打印阶段耗时表"""
+        if not self.enabled:
+            return
+        self.end()
+        skip = {'stage', 'wall_s', 'cpu_s', 'peak_rss_mb', 'tracemalloc_peak_mb'}
+        print(f"\n  {'阶段':18s}  {'墙钟(s)':>9s}  {'CPU(s)':>9s}  {'RSS峰值(MB)':>12s}  计数")
+        for r in self.stages:
+            rss = f"{r['peak_rss_mb']:12.1f}" if r['peak_rss_mb'] is not None else f"{'-':>12s}"
+            counts = ' '.join(f"{k}={v}" for k, v in r.items() if k not in skip)
+            print(f"  {r['stage']:18s}  {r['wall_s']:9.3f}  {r['cpu_s']:9.3f}  {rss}  {counts}")
+
+    def save(self, path, **meta):
+        """写出 profile JSON (及 cProfile 的 .prof)；返回 JSON 路径，未启用时返回 None"""
+        if not self.enabled:
+            return None
+        self.end()
+        path = Path(path)
+        result = {
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'total_wall_s': time.perf_counter() - self._t0,
+            **meta,
+            'stages': self.stages,
+        }
+        if self._cprofile is not None:
+            prof_path = path.with_name(f"{path.name.split('.')[0]}.{self.cprofile_stage}.prof")
+            self._cprofile.dump_stats(prof_path)
+            result['cprofile'] = str(prof_path)
+        elif self.cprofile_stage:
+            result['cprofile'] = None
+            print(f"  ⚠️ 没有名为 {self.cprofile_stage} 的阶段，未生成 cProfile 文件")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        return path
+
+
+def add_profile_args(parser):
+    """给脚本的 argparse 加上 --profile / --profile-memory / --cprofile"""
+    parser.add_argument('--profile', action='store_true',
+                        help='记录各阶段耗时 / CPU / 内存峰值，写入输出旁的 *.profile.json')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='同时统计 tracemalloc 峰值 (隐含 --profile，会拖慢纯 Python 阶段)')
+    parser.add_argument('--cprofile', metavar='STAGE', default=None,
+                        help='对指定阶段运行 cProfile，写出 *.<STAGE>.prof (隐含 --profile)')
+
+
+def profiler_from_args(args):
+    # 无法轮询 RSS 时 ru_maxrss 给不出分阶段峰值，改用 tracemalloc
+    return Profiler(enabled=args.profile or args.profile_memory or args.cprofile is not None,
+                    trace_memory=args.profile_memory or not rss_available(), cprofile_stage=args.cprofile)
+
+
+def profile_path(output_path):
+    """wcs_shap_analysis.json -> wcs_shap_analysis.profile.json"""
+    output_path = Path(output_path)
+    return output_path.with_name(f'{output_path.stem}.profile.json')
@@ -0,0 +1,221 @@
+"""
+分位数草图与百分位查找表
+
+KllSketch   KLL 风格的可合并分位数草图: 第 h 层的每个元素代表 2^h 个原始值，
+            某层超出容量时排序后随机取奇/偶位提升到上一层。
+            内存 O(k·log(n/k))，秩误差约 O(1/k)；n ≤ k 时完全精确。
+            两个草图逐层拼接再压缩即可合并，支持分块构建与增量更新。
+
+PercentileTable  每个特征一张有序断点表 (value, P(X<value), P(X≤value))，
+            百分位 = 中位数法 (below + 0.5·equal) / n，与 analyzer.js 的 percentile() 口径一致；
+            查询为二分查找 O(log 断点数)，落在两个断点之间时线性插值。
+            断点数不超过 max_points 且草图未压缩时结果完全精确。
+"""
+import json
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_K = 2048
+DEFAULT_POINTS = 256
+_SHRINK = 2 / 3
+
+
+class KllSketch:
+    def __init__(self, k=DEFAULT_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [np.zeros(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h):
+        depth = len(self.levels) - 1 - h
+        return max(2, int(np.ceil(self.k * _SHRINK ** depth)))
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self._capacity(h):
+                level = np.sort(level)
+                # 奇数个时最后一个留在本层
+                keep = level[-1:] if len(level) % 2 else level[:0]
+                pairs = level[:len(level) - len(keep)]
+                promoted = pairs[self._rng.integers(2)::2]
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.zeros(0))
+                self.levels[h] = keep
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                # 新增层会改变下层容量，从头检查
+                h = 0
+                continue
+            h += 1
+
+    def update(self, values):
+        """批量加入 (忽略 NaN)"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.n += len(values)
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """合并另一个草图 (k 取两者中较大者)"""
+        self.k = max(self.k, other.k)
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.zeros(0))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+        return self
+
+    @property
+    def size(self):
+        return sum(len(level) for level in self.levels)
+
+    def cdf(self):
+        """(去重升序值, P(X<值), P(X≤值))"""
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        if len(items) == 0:
+            return np.zeros(0), np.zeros(0), np.zeros(0)
+        values, inv = np.unique(items, return_inverse=True)
+        w = np.bincount(inv.reshape(-1), weights=weights, minlength=len(values))
+        total = w.sum()
+        le = np.cumsum(w) / total
+        return values, le - w / total, le
+
+    def state(self, prefix=''):
+        """可存入 npz 的数组字典"""
+        out = {f'{prefix}meta': np.array([self.k, self.n, len(self.levels)], dtype=np.int64)}
+        for h, level in enumerate(self.levels):
+            out[f'{prefix}level{h}'] = level
+        return out
+
+    @classmethod
+    def from_state(cls, arrays, prefix='', seed=0):
+        k, n, n_levels = (int(v) for v in arrays[f'{prefix}meta'])
+        sketch = cls(k, seed)
+        sketch.n = n
+        sketch.levels = [np.asarray(arrays[f'{prefix}level{h}'], dtype=np.float64) for h in range(n_levels)]
+        return sketch
+
+
+@dataclass
+class Breakpoints:
+    values: np.ndarray
+    lt: np.ndarray
+    le: np.ndarray
+
+    def percentile(self, x):
+        """中位数法百分位 (0~1)，x 可为数组；NaN -> 0"""
+        x = np.asarray(x, dtype=np.float64)
+        v, lt, le = self.values, self.lt, self.le
+        if len(v) == 0:
+            return np.full(x.shape, 0.5)
+        i = np.searchsorted(v, x, side='left')
+        ic = np.minimum(i, len(v) - 1)
+        exact = v[ic] == x
+        # 落在 v[i-1] 与 v[i] 之间: 从 P(X≤v[i-1]) 线性插值到 P(X<v[i])
+        lo = np.maximum(i - 1, 0)
+        span = v[ic] - v[lo]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            frac = np.where(span > 0, (x - v[lo]) / np.where(span > 0, span, 1), 0.0)
+        between = le[lo] + frac * (lt[ic] - le[lo])
+        out = np.where(exact, (lt[ic] + le[ic]) / 2, between)
+        out = np.where(i == 0, np.where(exact, out, 0.0), out)
+        out = np.where(i == len(v), 1.0, out)
+        return np.where(np.isnan(x), 0.0, out)
+
+    def thin(self, max_points):
+        """按累计概率均匀保留至多 max_points 个断点 (含首尾)"""
+        if len(self.values) <= max_points:
+            return self
+        targets = np.linspace(0, 1, max_points)
+        idx = np.unique(np.clip(np.searchsorted(self.le, targets, side='left'), 0, len(self.values) - 1))
+        idx = np.unique(np.concatenate([[0], idx, [len(self.values) - 1]]))
+        return Breakpoints(self.values[idx], self.lt[idx], self.le[idx])
+
+
+class PercentileTable:
+    """{特征: Breakpoints} + 参考总体行数；JSON 格式供前端直接使用"""
+
+    def __init__(self, tables, n, meta=None):
+        self.tables = tables
+        self.n = n
+        self.meta = meta or {}
+
+    @classmethod
+    def from_sketches(cls, sketches, max_points=DEFAULT_POINTS, meta=None):
+        tables = {name: Breakpoints(*s.cdf()).thin(max_points) for name, s in sketches.items()}
+        n = max((s.n for s in sketches.values()), default=0)
+        return cls(tables, n, meta)
+
+    def percentile(self, name, x):
+        return self.tables[name].percentile(x)
+
+    def to_json(self):
+        return {
+            **self.meta,
+            'rows': int(self.n),
+            'features': {
+                name: {'values': t.values.tolist(), 'lt': t.lt.tolist(), 'le': t.le.tolist()}
+                for name, t in self.tables.items()
+            },
+        }
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_json(), f, ensure_ascii=False, separators=(',', ':'))
+        return Path(path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            d = json.load(f)
+        tables = {name: Breakpoints(np.asarray(t['values'], dtype=np.float64),
+                                    np.asarray(t['lt'], dtype=np.float64),
+                                    np.asarray(t['le'], dtype=np.float64))
+                  for name, t in d.pop('features').items()}
+        return cls(tables, d.pop('rows'), d)
+
+
+def save_sketches(path, sketches, meta=None):
+    """{特征: KllSketch} -> npz (meta 以 JSON 字符串保存)"""
+    arrays = {'__names__': np.array(json.dumps(list(sketches))),
+              '__meta__': np.array(json.dumps(meta or {}))}
+    for i, s in enumerate(sketches.values()):
+        arrays.update(s.state(f'f{i}_'))
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.stem + '.tmp.npz')
+    np.savez(tmp, **arrays)
+    tmp.replace(path)
+    return path
+
+
+def load_sketches(path):
+    """返回 ({特征: KllSketch}, meta)；文件不存在时返回 ({}, {})"""
+    try:
+        with np.load(path) as z:
+            names = json.loads(str(z['__names__']))
+            meta = json.loads(str(z['__meta__']))
+            return {name: KllSketch.from_state(z, f'f{i}_', seed=i) for i, name in enumerate(names)}, meta
+    except FileNotFoundError:
+        return {}, {}
+
+
+def sketch_dataset(ds, names, sketches=None, k=DEFAULT_K, chunk_rows=1 << 16):
+    """把数据集各列按块送入草图 (列为 mmap 时内存只与块大小有关)，返回 {特征: KllSketch}"""
+    sketches = dict(sketches or {})
+    for i, name in enumerate(names):
+        s = sketches.setdefault(name, KllSketch(k, seed=i))
+        col = ds.columns[name]
+        for start in range(0, len(col), chunk_rows):
+            s.update(col[start:start + chunk_rows])
+    return sketches
@@ -0,0 +1,164 @@
+"""
+XGBoost 超参搜索 (进程池并行 + 共享内存 + 早停)
+
+每个候选配置是一个任务: 在按对局分组的各折上训练，记录平均准确率 / log-loss / 训练耗时 / 早停轮数。
+早停集从每折的训练对局中再按对局切出 (1/INNER_FOLDS)，评分的外层验证折不参与选停止轮数，
+否则排行榜与 n_estimators 中位数都会偏乐观。
+X_pct / y 只在主进程放入 SharedMemory 一次，worker 按名字挂载，不再逐个 pickle 副本。
+
+最优配置 = 平均 log-loss 最低者，n_estimators 取各折早停轮数的中位数，
+随后用于全量训练和 SHAP 权重推导。
+"""
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .cv import group_folds, thread_split
+
+# 默认搜索空间 (n_estimators 为早停上限)
+SEARCH_SPACE = {
+    'max_depth': [3, 4, 5, 6],
+    'learning_rate': [0.03, 0.1, 0.3],
+    'subsample': [0.7, 0.8, 1.0],
+    'colsample_bytree': [0.6, 0.8, 1.0],
+    'min_child_weight': [1, 5],
+}
+MAX_ESTIMATORS = 1000
+EARLY_STOPPING = 30
+# 训练对局中切出早停集的折数 (早停集占训练对局的 1/INNER_FOLDS)
+INNER_FOLDS = 4
+
+
+def grid_configs(space=SEARCH_SPACE):
+    """搜索空间的全部组合 (按 key 顺序展开)"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_configs(space=SEARCH_SPACE, n=20, seed=0):
+    """从全部组合中无放回抽取 n 个"""
+    configs = grid_configs(space)
+    if n >= len(configs):
+        return configs
+    rng = np.random.default_rng(seed)
+    return [configs[i] for i in sorted(rng.choice(len(configs), n, replace=False))]
+
+
+def _share(arr):
+    """把数组复制进 SharedMemory，返回 (shm, spec)；spec 可廉价地 pickle 给 worker"""
+    arr = np.ascontiguousarray(arr)
+    shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+    np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+    return shm, (shm.name, arr.shape, arr.dtype.str)
+
+
+def _attach(spec):
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+# worker 进程内挂载的共享数组 (进程结束前保持引用，避免 buffer 被释放)
+_shared = {}
+
+
+def _init_worker(specs, folds):
+    for key, spec in specs.items():
+        _shared[key] = _attach(spec)
+    _shared['folds'] = (None, folds)
+
+
+def _logloss(y, p):
+    p = np.clip(p, 1e-15, 1 - 1e-15)
+    return float(-np.mean(y * np.log(p) + (1 - y) * np.log(1 - p)))
+
+
+def _evaluate(task):
+    from xgboost import XGBClassifier
+
+    idx, config, base_params, threads, max_estimators, early_stopping = task
+    X, y, folds = _shared['X'][1], _shared['y'][1], _shared['folds'][1]
+    params = {**base_params, **config, 'n_estimators': max_estimators,
+              'early_stopping_rounds': early_stopping, 'n_jobs': threads}
+
+    accs, losses, rounds = [], [], []
+    t0 = time.perf_counter()
+    for fit_idx, stop_idx, test_idx in folds:
+        X_val, y_val = X[test_idx], y[test_idx]
+        model = XGBClassifier(**params)
+        model.fit(X[fit_idx], y[fit_idx], eval_set=[(X[stop_idx], y[stop_idx])], verbose=False)
+        proba = model.predict_proba(X_val)[:, 1]
+        accs.append(float(np.mean((proba > 0.5) == y_val)))
+        losses.append(_logloss(y_val, proba))
+        rounds.append(int(model.best_iteration) + 1)
+    return {
+        'rank': None,
+        'config': config,
+        'accuracy': float(np.mean(accs)),
+        'accuracy_std': float(np.std(accs)),
+        'logloss': float(np.mean(losses)),
+        'n_estimators': int(np.median(rounds)),
+        'fold_rounds': rounds,
+        'train_s': time.perf_counter() - t0,
+        'trial': idx,
+    }
+
+
+def nested_folds(groups, n_folds, seed=0, inner_folds=INNER_FOLDS):
+    """
+    外层按对局 n_folds 折；每折的训练对局再按对局切出一份早停集
+    返回 [(拟合行, 早停行, 验证行)]
+    """
+    groups = np.asarray(groups)
+    out = []
+    for k, test_idx in enumerate(group_folds(groups, n_folds, seed)):
+        train_idx = np.setdiff1d(np.arange(len(groups)), test_idx)
+        stop = train_idx[group_folds(groups[train_idx], inner_folds, seed + 1 + k)[0]]
+        out.append((np.setdiff1d(train_idx, stop), stop, test_idx))
+    return out
+
+
+def search(X, y, groups, configs, base_params, n_folds=5, workers=None, threads=None,
+           max_estimators=MAX_ESTIMATORS, early_stopping=EARLY_STOPPING, seed=0):
+    """
+    并行评估 configs，返回按 log-loss 升序的排行榜 (list of dict)
+    base_params 提供 random_state / eval_metric 等固定参数，config 中的键覆盖它
+    """
+    folds = nested_folds(groups, n_folds, seed)
+    workers, threads = thread_split(len(configs), workers, threads)
+    # use_label_encoder 在 xgboost 2+ 中已无效，只会在每次 fit 时刷警告
+    base_params = {k: v for k, v in base_params.items() if k != 'use_label_encoder'}
+    jobs = [(i, c, base_params, threads, max_estimators, early_stopping) for i, c in enumerate(configs)]
+
+    if workers == 1:
+        _shared.update(X=(None, X), y=(None, np.asarray(y)), folds=(None, folds))
+        try:
+            board = [_evaluate(job) for job in jobs]
+        finally:
+            _shared.clear()
+    else:
+        shms, specs = {}, {}
+        try:
+            for key, arr in (('X', X), ('y', np.asarray(y))):
+                shms[key], specs[key] = _share(arr)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(specs, folds)) as pool:
+                board = list(pool.map(_evaluate, jobs))
+        finally:
+            for shm in shms.values():
+                shm.close()
+                shm.unlink()
+
+    board.sort(key=lambda r: (r['logloss'], -r['accuracy'], r['trial']))
+    for i, r in enumerate(board):
+        r['rank'] = i + 1
+    return board
+
+
+def best_params(board, base_params):
+    """排行榜第一名 + 早停轮数 -> 完整的 XGBClassifier 参数"""
+    top = board[0]
+    return {**base_params, **top['config'], 'n_estimators': top['n_estimators']}
@@ -0,0 +1,169 @@
+"""
+SHAP 汇总统计 (全量 / 分块流式两种来源，同一套结果结构)
+
+regress_weights.py 的报告只需要:
+    mean |SHAP|、带方向均值、胜方/败方均值、SHAP 列间相关系数 (交互表)
+这些都可以按行分块累加，不必保留 (n_samples, n_features) 的完整矩阵。
+分块模式下额外用蓄水池抽样保留固定行数，供 Summary Plot 使用，
+峰值内存由分块大小 + 蓄水池大小决定。
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+# 分块解释时每行的临时内存估计: SHAP 输出 + X 切片 + 绝对值 / 去中心化副本等 (float64)
+_ROW_COPIES = 6
+
+
+def reservoir_writes(filled, n_seen, n_new, size, rng):
+    """
+    Algorithm R 的向量化版本: 已见 n_seen 行、已有 filled 行样本 (上限 size) 时吸收 n_new 行
+    样本未满时先顺序填满，其余第 t 行在 [0, t] 中均匀取槽位，落在 size 内即替换；
+    同一槽位被多次写入时只保留最后一次，与逐行替换的结果一致
+    返回 (填入行数, 槽位, 新数据行号)，调用方按 buf[槽位] = new[行号] 写入
+    """
+    fill = min(max(size - filled, 0), n_new)
+    rest = np.arange(fill, n_new)
+    slots = rng.integers(0, n_seen + rest + 1) if len(rest) else rest
+    hit = slots < size
+    slots = np.concatenate([filled + np.arange(fill), slots[hit]])[::-1]
+    rows = np.concatenate([np.arange(fill), rest[hit]])[::-1]
+    # 倒序后 np.unique 的首次出现 = 原顺序中的最后一次写入
+    slots, first = np.unique(slots, return_index=True)
+    return fill, slots, rows[first]
+
+
+@dataclass
+class ShapStats:
+    """SHAP 汇总结果；sample_* 为 Summary Plot 用的行样本 (可能为 None)"""
+    n: int
+    mean_abs: np.ndarray
+    mean: np.ndarray
+    win_mean: np.ndarray
+    lose_mean: np.ndarray
+    corr: np.ndarray
+    sample_idx: np.ndarray = None
+    sample_shap: np.ndarray = None
+    sample_X: np.ndarray = None
+
+    def save(self, path):
+        arrays = {k: v for k, v in self.__dict__.items() if v is not None and k != 'n'}
+        np.savez(path, n=np.int64(self.n), **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as z:
+            kw = {k: z[k] for k in z.files}
+        kw['n'] = int(kw['n'])
+        return cls(**kw)
+
+
+def shap_stats(shap_values, y, X=None):
+    """从完整 SHAP 矩阵计算汇总 (与逐项 np.mean / np.corrcoef 结果一致)"""
+    y = np.asarray(y)
+    return ShapStats(
+        n=len(shap_values),
+        mean_abs=np.mean(np.abs(shap_values), axis=0),
+        mean=np.mean(shap_values, axis=0),
+        win_mean=np.mean(shap_values[y == 1], axis=0),
+        lose_mean=np.mean(shap_values[y == 0], axis=0),
+        corr=np.corrcoef(np.asarray(shap_values).T),
+        sample_idx=None if X is None else np.arange(len(shap_values)),
+        sample_shap=None if X is None else np.asarray(shap_values),
+        sample_X=None if X is None else np.asarray(X),
+    )
+
+
+class ShapAccumulator:
+    """
+    分块累加 SHAP 统计量
+    均值用 float64 求和；协方差用 Chan 并行合并公式 (数值稳定)；
+    reservoir_size > 0 时用 Algorithm R 蓄水池抽样保留行样本 (reservoir_writes)
+    """
+
+    def __init__(self, n_features, reservoir_size=0, seed=42):
+        self.n = 0
+        self.n_win = 0
+        self.n_lose = 0
+        self.sum_abs = np.zeros(n_features)
+        self.sum = np.zeros(n_features)
+        self.sum_win = np.zeros(n_features)
+        self.sum_lose = np.zeros(n_features)
+        self.cov_mean = np.zeros(n_features)
+        self.m2 = np.zeros((n_features, n_features))
+        self.reservoir_size = reservoir_size
+        self.rng = np.random.default_rng(seed)
+        self.sample_idx = np.zeros(reservoir_size, dtype=np.int64)
+        self.sample_shap = np.zeros((reservoir_size, n_features))
+        self.sample_X = np.zeros((reservoir_size, n_features))
+
+    def update(self, shap_chunk, y_chunk, X_chunk=None):
+        sv = np.asarray(shap_chunk, dtype=np.float64)
+        y_chunk = np.asarray(y_chunk)
+        k = len(sv)
+        if k == 0:
+            return
+        win = y_chunk == 1
+        lose = y_chunk == 0
+        self.sum_abs += np.abs(sv).sum(axis=0)
+        self.sum += sv.sum(axis=0)
+        self.sum_win += sv[win].sum(axis=0)
+        self.sum_lose += sv[lose].sum(axis=0)
+        self.n_win += int(win.sum())
+        self.n_lose += int(lose.sum())
+
+        # Chan: 合并两组的 (count, mean, M2)
+        mean_b = sv.mean(axis=0)
+        centered = sv - mean_b
+        m2_b = centered.T @ centered
+        delta = mean_b - self.cov_mean
+        total = self.n + k
+        self.m2 += m2_b + np.outer(delta, delta) * (self.n * k / total)
+        self.cov_mean += delta * (k / total)
+
+        if self.reservoir_size:
+            self._sample(sv, X_chunk)
+        self.n = total
+
+    def _sample(self, sv, X_chunk):
+        _, slots, rows = reservoir_writes(min(self.n, self.reservoir_size), self.n, len(sv),
+                                          self.reservoir_size, self.rng)
+        self.sample_idx[slots] = self.n + rows
+        self.sample_shap[slots] = sv[rows]
+        if X_chunk is not None:
+            self.sample_X[slots] = X_chunk[rows]
+
+    def result(self):
+        n = max(self.n, 1)
+        std = np.sqrt(np.diag(self.m2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.m2 / np.outer(std, std)
+        kept = min(self.n, self.reservoir_size)
+        order = np.argsort(self.sample_idx[:kept], kind='stable')
+        return ShapStats(
+            n=self.n,
+            mean_abs=self.sum_abs / n,
+            mean=self.sum / n,
+            win_mean=self.sum_win / max(self.n_win, 1),
+            lose_mean=self.sum_lose / max(self.n_lose, 1),
+            corr=np.clip(corr, -1, 1),
+            sample_idx=self.sample_idx[:kept][order] if kept else None,
+            sample_shap=self.sample_shap[:kept][order] if kept else None,
+            sample_X=self.sample_X[:kept][order] if kept else None,
+        )
+
+
+def chunk_rows_for_budget(n_features, memory_mb, reservoir_size=0):
+    """按内存预算 (MB) 计算每块行数；预算先扣除蓄水池占用"""
+    row_bytes = 8 * max(n_features, 1)
+    budget = memory_mb * (1 << 20) - reservoir_size * row_bytes * 2
+    return max(1, int(budget // (row_bytes * _ROW_COPIES)))
+
+
+def explain_chunked(explainer, X, y, chunk_rows, reservoir_size=0, seed=42):
+    """按 chunk_rows 行一块调用 explainer.shap_values 并流式累加，返回 ShapStats"""
+    acc = ShapAccumulator(X.shape[1], reservoir_size, seed)
+    for s in range(0, len(X), chunk_rows):
+        X_chunk = X[s:s + chunk_rows]
+        acc.update(explainer.shap_values(X_chunk), y[s:s + chunk_rows], X_chunk)
+    return acc.result()
@@ -0,0 +1,183 @@
+"""
+合成 Broken Arrow 对局数据 (wcs_raw_data.json 同结构)，用于基准测试
+
+    - 玩家池约为 行数 / 20 (人均 ~20 局)，每人有潜在水平 skill 与风格偏好
+    - 每局 10 人 5v5，胜负由双方 skill 之和 + 噪声决定
+    - 各项数据按 skill / 胜负 / 风格生成对数正态分布，彼此相关
+      (伤害、击杀、损失、投入、补给互相关联)，衍生比率与队内占比按 collect-data.js 的公式计算
+    - ratingDelta 按 ELO 期望胜率计算；少量对局的原始 isWin 故意与 ratingDelta 矛盾，
+      以覆盖 fix_is_win 的修正路径
+全部按列向量化生成，10⁶ 行秒级。
+"""
+import json
+
+import numpy as np
+
+TEAM_SIZE = 5
+MATCH_SIZE = TEAM_SIZE * 2
+# 原始 isWin 与 ratingDelta 矛盾的对局比例 (模拟 WinnerTeam 编号 bug)
+WINNER_BUG_RATE = 0.05
+
+_FIELDS = [
+    'matchId', 'playerId', 'teamId', 'isWin',
+    'destructionScore', 'lossesScore', 'damageDealt', 'damageReceived',
+    'objectivesCaptured', 'supplyCaptured', 'totalSpawned', 'totalRefunded',
+    'supplyConsumed', 'supplyFromAllies', 'supplyToAllies', 'selfDamage',
+    'buildingsDestroyed', 'unitCount', 'uniqueUnits', 'dlRatio',
+    'netInvestment', 'costEfficiency', 'damageTrade', 'survivalRate', 'refundRate',
+    'teamDmgShare', 'teamDestShare', 'teamLossShare', 'teamSpawnShare',
+    'oldRating', 'newRating', 'ratingDelta',
+]
+_INT_FIELDS = {
+    'playerId', 'teamId', 'isWin', 'destructionScore', 'lossesScore', 'damageDealt',
+    'damageReceived', 'objectivesCaptured', 'supplyCaptured', 'totalSpawned', 'totalRefunded',
+    'supplyConsumed', 'supplyFromAllies', 'supplyToAllies', 'selfDamage',
+    'buildingsDestroyed', 'unitCount', 'uniqueUnits', 'netInvestment',
+}
+
+
+def _team_sum(v):
+    """(M, 10) -> 每人所在队伍的合计 (M, 10)，前 5 人为 0 队"""
+    t = v.reshape(len(v), 2, TEAM_SIZE).sum(axis=2)
+    return np.repeat(t, TEAM_SIZE, axis=1)
+
+
+def generate_columns(n_matches, n_players=None, seed=0):
+    """生成 n_matches 局的列数据: {字段: (n_matches*10,) 数组}，matchId 为字符串数组"""
+    rng = np.random.default_rng(seed)
+    M = n_matches
+    n_players = n_players or max(MATCH_SIZE * 2, M * MATCH_SIZE // 20)
+
+    # 玩家池: 水平 + 风格 (偏进攻 / 偏后勤) + 初始分
+    skill = rng.normal(0, 1, n_players)
+    style = rng.normal(0, 1, n_players)
+    base_rating = 2000 + 250 * skill + rng.normal(0, 80, n_players)
+    player_ids = rng.choice(np.arange(100, 100 + n_players * 40), n_players, replace=False)
+
+    # 每局 10 个不同玩家: 按活跃度加权抽样 (近似不放回，重复者在局内顺移)
+    activity = rng.pareto(2.0, n_players) + 0.2
+    p = activity / activity.sum()
+    roster = rng.choice(n_players, size=(M, MATCH_SIZE), p=p)
+    for _ in range(5):
+        srt = np.sort(roster, axis=1)
+        dup = np.zeros_like(roster, dtype=bool)
+        order = np.argsort(roster, axis=1)
+        dup_sorted = np.zeros_like(srt, dtype=bool)
+        dup_sorted[:, 1:] = srt[:, 1:] == srt[:, :-1]
+        np.put_along_axis(dup, order, dup_sorted, axis=1)
+        if not dup.any():
+            break
+        roster[dup] = rng.choice(n_players, size=int(dup.sum()), p=p)
+    roster = roster.reshape(-1)
+
+    sk = skill[roster].reshape(M, MATCH_SIZE)
+    st = style[roster].reshape(M, MATCH_SIZE)
+    team = np.tile(np.repeat([0, 1], TEAM_SIZE), M)
+    strength = sk.reshape(M, 2, TEAM_SIZE).sum(axis=2)
+    winner = (strength[:, 1] + rng.normal(0, 1.5, M) > strength[:, 0]).astype(np.int64)
+    win = (team.reshape(M, MATCH_SIZE) == winner[:, None]).astype(np.int64)
+
+    # 相关的对数正态统计量: 共同的 "表现" 因子 + 各自噪声
+    form = 0.5 * sk + 0.6 * win + rng.normal(0, 0.5, (M, MATCH_SIZE))
+
+    def lognorm(mu, sigma, load, style_load=0.0):
+        return np.exp(mu + load * form + style_load * st + rng.normal(0, sigma, (M, MATCH_SIZE)))
+
+    spawned = np.round(lognorm(9.0, 0.35, 0.15))
+    refunded = np.round(spawned * np.clip(rng.beta(2, 6, (M, MATCH_SIZE)) - 0.05 * form, 0, 0.9))
+    destruction = np.round(lognorm(8.2, 0.55, 0.55, 0.2))
+    losses = np.round(lognorm(8.4, 0.5, -0.35, 0.1))
+    dealt = np.round(lognorm(6.6, 0.6, 0.5, 0.25))
+    received = np.round(lognorm(6.6, 0.6, -0.3))
+    objectives = rng.poisson(np.exp(0.6 + 0.4 * form - 0.2 * st))
+    supply_captured = np.round(lognorm(5.0, 1.5, 0.3) * (rng.random((M, MATCH_SIZE)) < 0.4))
+    consumed = np.round(spawned * lognorm(0.5, 0.4, 0.0))
+    from_allies = np.round(lognorm(6.5, 1.2, 0.0, -0.4) * (rng.random((M, MATCH_SIZE)) < 0.7))
+    to_allies = np.round(lognorm(6.5, 1.2, 0.1, -0.4) * (rng.random((M, MATCH_SIZE)) < 0.7))
+    buildings = rng.poisson(np.exp(1.2 + 0.5 * form))
+    unique_units = np.clip(np.round(65 + 15 * st + rng.normal(0, 15, (M, MATCH_SIZE))), 1, 200)
+
+    net_inv = np.maximum(spawned - refunded, 1)
+    cols = {
+        'destructionScore': destruction,
+        'lossesScore': losses,
+        'damageDealt': dealt,
+        'damageReceived': received,
+        'objectivesCaptured': objectives,
+        'supplyCaptured': supply_captured,
+        'totalSpawned': spawned,
+        'totalRefunded': refunded,
+        'supplyConsumed': consumed,
+        'supplyFromAllies': from_allies,
+        'supplyToAllies': to_allies,
+        'selfDamage': np.zeros((M, MATCH_SIZE)),
+        'buildingsDestroyed': buildings,
+        'unitCount': np.zeros((M, MATCH_SIZE)),
+        'uniqueUnits': unique_units,
+        'dlRatio': np.round(destruction / np.maximum(losses, 1), 7),
+        'netInvestment': net_inv,
+        'costEfficiency': destruction / net_inv,
+        'damageTrade': dealt / np.maximum(received, 1),
+        'survivalRate': np.maximum(0, 1 - losses / net_inv),
+        'refundRate': refunded / np.maximum(spawned, 1),
+        'teamDmgShare': dealt / np.maximum(_team_sum(dealt), 1),
+        'teamDestShare': destruction / np.maximum(_team_sum(destruction), 1),
+        'teamLossShare': losses / np.maximum(_team_sum(losses), 1),
+        'teamSpawnShare': spawned / np.maximum(_team_sum(spawned), 1),
+    }
+
+    # ELO: 按双方平均分的期望胜率结算
+    old = np.round(base_rating[roster] + rng.normal(0, 30, M * MATCH_SIZE), 4).reshape(M, MATCH_SIZE)
+    team_avg = old.reshape(M, 2, TEAM_SIZE).mean(axis=2)
+    opp_avg = np.repeat(team_avg[:, ::-1], TEAM_SIZE, axis=1)
+    expected = 1 / (1 + 10 ** ((opp_avg - old) / 400))
+    delta = np.round(40 * (win - expected) + rng.normal(0, 1.5, (M, MATCH_SIZE)), 4)
+    delta = np.where(win == 1, np.maximum(delta, 0.5), np.minimum(delta, -0.5))
+
+    # 原始 isWin 故意翻转一部分对局
+    bug = rng.random(M) < WINNER_BUG_RATE
+    raw_win = np.where(bug[:, None], 1 - win, win)
+
+    out = {
+        'matchId': np.repeat(np.arange(5_000_000, 5_000_000 + M), MATCH_SIZE).astype(str),
+        'playerId': player_ids[roster],
+        'teamId': team,
+        'isWin': raw_win.reshape(-1),
+    }
+    for k, v in cols.items():
+        out[k] = v.reshape(-1)
+    out['oldRating'] = old.reshape(-1)
+    out['newRating'] = (old + delta).reshape(-1)
+    out['ratingDelta'] = delta.reshape(-1)
+    return out
+
+
+def iter_dataset_records(cols):
+    """列数据 -> 逐行 dict (字段顺序与 collect-data.js 一致)"""
+    names = _FIELDS
+    lists = [cols[k].tolist() if k == 'matchId' else
+             (cols[k].astype(np.int64).tolist() if k in _INT_FIELDS else cols[k].astype(float).tolist())
+             for k in names]
+    for row in zip(*lists):
+        yield dict(zip(names, row))
+
+
+def write_dataset(path, cols, collected_at='2026-01-01T00:00:00.000Z', batch=10000):
+    """以 wcs_raw_data.json 结构写出 (逐批序列化，不在内存里拼整份字符串)"""
+    n = len(cols['matchId'])
+    metadata = {
+        'collectedAt': collected_at,
+        'matchCount': int(len(np.unique(cols['matchId']))),
+        'sampleCount': n,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"metadata": ' + json.dumps(metadata) + ', "dataset": [')
+        buf = []
+        for i, rec in enumerate(iter_dataset_records(cols)):
+            buf.append(('' if i == 0 else ',') + json.dumps(rec, separators=(',', ':')))
+            if len(buf) >= batch:
+                f.write(''.join(buf))
+                buf.clear()
+        f.write(''.join(buf))
+        f.write(']}')
+    return metadata
@@ -0,0 +1,301 @@
+"""
+UnitData 列式单位表 + 按玩家分组聚合 (analyzer.js extractUnitStats 的向量化版)
+
+对局详情 (采集器缓存的 responses/matches/<matchId>.json) 里每名玩家的 UnitData 是
+{单位实例 ID: 记录}，记录的 Id 为兵种。所有对局的单位记录展平成一张列式表:
+
+    unit_owner    int32    所属 (对局, 玩家) 编号
+    unit_type     int32    兵种 Id (没有 Id 的记录与 JS 一样跳过)
+    unit_options  int16    OptionIds 个数 (改装数)
+    unit_values   float32  (单位数, UNIT_FIELDS) 伤害 / 击杀 / 补给 / 退款等数值字段，缺失为 0
+    owner_match   int32    (对局, 玩家) 的对局编号 (match_ids 下标)
+    owner_player  int64    (对局, 玩家) 的 playerId
+
+聚合只做排序 + bincount / reduceat: 按玩家求和 / 计数，按 (玩家, 兵种) 求和后
+用分段 max 取主力兵种占比 (对应 JS 的 topD / topK / topT)，再算伤害构成的熵。
+结果按 (matchId, playerId) 对齐到数据集的行，作为额外特征列进入回归 (regress_weights.py --unit-features)。
+
+表保存在 <数据目录>/.wcs_cache/units/。对局详情缓存只增不改，
+出现新的对局文件时只展平新增的对局并追加到旧表后面，否则直接读 .npy。
+"""
+import json
+import os
+import shutil
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+import numpy as np
+
+from .cache import CACHE_DIR_NAME, MANIFEST_NAME, _read_json, _write_json
+
+UNITS_DIR_NAME = 'units'
+# 单位表格式版本，改动存储内容时 +1
+UNITS_VERSION = 1
+
+# api_data_audit.json 中出现的单位数值字段
+UNIT_FIELDS = ['TotalDamageDealt', 'TotalDamageReceived', 'KilledCount', 'TotalSupplyPointsConsumed',
+               'WasRefunded', 'BuildingDestroyedCount', 'TotalSelfDamageDealt',
+               'TotalDamageFriendlyFireDealt', 'TotalDamageReceivedByFriendlyFire', 'SelfDestruction']
+_COL = {f: j for j, f in enumerate(UNIT_FIELDS)}
+
+# 加入回归的单位聚合特征 (按玩家)
+UNIT_FEATURES = {
+    'unitTypes': '兵种数 (去重 Id)',
+    'unitDeployed': '部署单位数',
+    'unitKills': 'Σ 击杀数',
+    'unitActiveShare': '造成过伤害或击杀的单位占比',
+    'unitRefundShare': '被退款的单位占比',
+    'unitOptions': '平均改装数',
+    'unitFriendlyFire': 'Σ 友伤',
+    'unitTopDmgShare': '主力输出兵种的伤害占比',
+    'unitTopKillShare': '主力击杀兵种的击杀占比',
+    'unitTopTankShare': '主力承伤兵种的承伤占比',
+    'unitDmgEntropy': '伤害按兵种分布的熵 (nats)',
+}
+# 单位特征在类别汇总中的类别名
+UNIT_CATEGORY = '兵种构成'
+
+_ARRAYS = ('unit_owner', 'unit_type', 'unit_options', 'unit_values', 'owner_match', 'owner_player')
+
+
+@dataclass
+class UnitTable:
+    match_ids: list
+    unit_owner: np.ndarray
+    unit_type: np.ndarray
+    unit_options: np.ndarray
+    unit_values: np.ndarray
+    owner_match: np.ndarray
+    owner_player: np.ndarray
+
+    def __len__(self):
+        return len(self.unit_owner)
+
+    @property
+    def n_owners(self):
+        return len(self.owner_match)
+
+    def column(self, name):
+        return self.unit_values[:, _COL[name]]
+
+
+def _num(v):
+    if v is True:
+        return 1.0
+    return float(v) if v else 0.0
+
+
+def flatten(matches):
+    """[(matchId, 对局详情)] -> UnitTable (没有 UnitData 的玩家也占一个 (对局, 玩家) 编号)"""
+    match_ids, owner_match, owner_player = [], [], []
+    owner, types, options, values = [], [], [], []
+    for match_id, detail in matches:
+        if not detail or not detail.get('Data'):
+            continue
+        m = len(match_ids)
+        match_ids.append(str(match_id))
+        for p in detail['Data'].values():
+            if p.get('Id') is None:
+                continue
+            o = len(owner_match)
+            owner_match.append(m)
+            owner_player.append(int(p['Id']))
+            units = p.get('UnitData') or {}
+            for u in (units.values() if isinstance(units, dict) else units):
+                if not u.get('Id'):
+                    continue
+                owner.append(o)
+                types.append(u['Id'])
+                options.append(len(u.get('OptionIds') or ()))
+                values.append([_num(u.get(f)) for f in UNIT_FIELDS])
+    return UnitTable(
+        match_ids=match_ids,
+        unit_owner=np.asarray(owner, dtype=np.int32),
+        unit_type=np.asarray(types, dtype=np.int32),
+        unit_options=np.asarray(options, dtype=np.int16),
+        unit_values=np.asarray(values, dtype=np.float32).reshape(-1, len(UNIT_FIELDS)),
+        owner_match=np.asarray(owner_match, dtype=np.int32),
+        owner_player=np.asarray(owner_player, dtype=np.int64),
+    )
+
+
+def concat(a, b):
+    """把 b 的对局追加到 a 后面 (对局 / 玩家编号顺延)"""
+    return UnitTable(
+        match_ids=a.match_ids + b.match_ids,
+        unit_owner=np.concatenate([a.unit_owner, b.unit_owner + a.n_owners]).astype(np.int32),
+        unit_type=np.concatenate([a.unit_type, b.unit_type]),
+        unit_options=np.concatenate([a.unit_options, b.unit_options]),
+        unit_values=np.concatenate([a.unit_values, b.unit_values]),
+        owner_match=np.concatenate([a.owner_match, b.owner_match + len(a.match_ids)]).astype(np.int32),
+        owner_player=np.concatenate([a.owner_player, b.owner_player]),
+    )
+
+
+# ---------- 分组聚合 ----------
+def _group_max(values, group, n):
+    """group 已升序: 每组最大值，空组为 0"""
+    out = np.zeros(n, dtype=np.float64)
+    if len(values):
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        out[group[starts]] = np.maximum.reduceat(values, starts)
+    return out
+
+
+def _ratio(a, b):
+    return np.divide(a, b, out=np.zeros_like(a, dtype=np.float64), where=b > 0)
+
+
+def aggregate_units(table):
+    """按 (对局, 玩家) 聚合，返回 {UNIT_FEATURES 中的名字: (n_owners,) float64}"""
+    n = table.n_owners
+    owner = table.unit_owner.astype(np.int64)
+
+    def total(w=None):
+        return np.bincount(owner, weights=w, minlength=n).astype(np.float64)
+
+    dmg = table.column('TotalDamageDealt').astype(np.float64)
+    kills = table.column('KilledCount').astype(np.float64)
+    tank = table.column('TotalDamageReceived').astype(np.float64)
+    deployed = total()
+
+    # (玩家, 兵种) 分组: 排序后的唯一键，pair_owner 单调不减
+    type_codes, type_inv = np.unique(table.unit_type, return_inverse=True)
+    pair_key, pair_inv = np.unique(owner * max(len(type_codes), 1) + type_inv.reshape(-1), return_inverse=True)
+    pair_inv = pair_inv.reshape(-1)
+    pair_owner = pair_key // max(len(type_codes), 1)
+
+    def by_pair(w):
+        return np.bincount(pair_inv, weights=w, minlength=len(pair_key))
+
+    dmg_total, kill_total, tank_total = total(dmg), total(kills), total(tank)
+    pair_dmg = by_pair(dmg)
+    p = _ratio(pair_dmg, dmg_total[pair_owner])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plogp = np.where(p > 0, p * np.log(p), 0.0)
+
+    return {
+        'unitTypes': np.bincount(pair_owner, minlength=n).astype(np.float64),
+        'unitDeployed': deployed,
+        'unitKills': kill_total,
+        'unitActiveShare': _ratio(total(((dmg > 0) | (kills > 0)).astype(np.float64)), deployed),
+        'unitRefundShare': _ratio(total(table.column('WasRefunded').astype(np.float64)), deployed),
+        'unitOptions': _ratio(total(table.unit_options.astype(np.float64)), deployed),
+        'unitFriendlyFire': total(table.column('TotalDamageFriendlyFireDealt').astype(np.float64)),
+        'unitTopDmgShare': _ratio(_group_max(pair_dmg, pair_owner, n), dmg_total),
+        'unitTopKillShare': _ratio(_group_max(by_pair(kills), pair_owner, n), kill_total),
+        'unitTopTankShare': _ratio(_group_max(by_pair(tank), pair_owner, n), tank_total),
+        'unitDmgEntropy': -np.bincount(pair_owner, weights=plogp, minlength=n),
+    }
+
+
+def align_rows(ds, table):
+    """数据集每行对应的 (对局, 玩家) 编号，单位表中没有的行为 -1"""
+    code_of = {m: i for i, m in enumerate(ds.match_ids)}
+    owner_code = np.array([code_of.get(m, -1) for m in table.match_ids], dtype=np.int64)[table.owner_match] \
+        if table.n_owners else np.zeros(0, dtype=np.int64)
+    row_player = np.asarray(ds.columns['playerId'], dtype=np.int64)
+    players, inv = np.unique(np.concatenate([row_player, table.owner_player]), return_inverse=True)
+    inv = inv.reshape(-1)
+    row_key = np.asarray(ds.match_code, dtype=np.int64) * len(players) + inv[:len(ds)]
+    owner_key = np.where(owner_code >= 0, owner_code * len(players) + inv[len(ds):], -1)
+
+    order = np.argsort(owner_key, kind='stable')
+    sorted_key = owner_key[order]
+    k = np.minimum(np.searchsorted(sorted_key, row_key), max(len(sorted_key) - 1, 0))
+    found = (sorted_key[k] == row_key) if len(sorted_key) else np.zeros(len(ds), dtype=bool)
+    return np.where(found, order[k] if len(order) else -1, -1)
+
+
+def unit_columns(ds, table, agg=None):
+    """UNIT_FEATURES 对齐到数据集行的列 (没有单位数据的行为 0)，返回 ({名字: 列}, 覆盖行数)"""
+    agg = aggregate_units(table) if agg is None else agg
+    rows = align_rows(ds, table)
+    hit = rows >= 0
+    cols = {}
+    for name in UNIT_FEATURES:
+        col = np.zeros(len(ds), dtype=np.float64)
+        col[hit] = agg[name][rows[hit]]
+        cols[name] = col
+    return cols, int(hit.sum())
+
+
+def with_unit_features(ds, cols):
+    """把单位特征列加到数据集上 (pipeline.prepare 会自动把它们当作特征)"""
+    names = [n for n in cols if n not in ds.fields]
+    return replace(ds, fields=ds.fields + names, columns={**ds.columns, **cols})
+
+
+def unit_categories(categories):
+    return {**categories, UNIT_CATEGORY: list(UNIT_FEATURES)}
+
+
+# ---------- 持久化 ----------
+def _match_files(matches_dir):
+    if not matches_dir.is_dir():
+        return {}
+    return {p.stem: p for p in matches_dir.glob('*.json')}
+
+
+def _read_detail(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _load(units_dir, mmap_mode='r'):
+    manifest = _read_json(units_dir / MANIFEST_NAME)
+    if not manifest or manifest.get('version') != UNITS_VERSION or manifest.get('fields') != UNIT_FIELDS:
+        return None, None
+    try:
+        arrays = {name: np.load(units_dir / f'{name}.npy', mmap_mode=mmap_mode) for name in _ARRAYS}
+    except (OSError, ValueError):
+        return None, None
+    return manifest, UnitTable(match_ids=manifest['match_ids'], **arrays)
+
+
+def _save(units_dir, table, scanned):
+    tmp = units_dir.with_name(f'{units_dir.name}.tmp-{os.getpid()}')
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name in _ARRAYS:
+        np.save(tmp / f'{name}.npy', getattr(table, name))
+    _write_json(tmp / MANIFEST_NAME, {'version': UNITS_VERSION, 'fields': UNIT_FIELDS,
+                                      'match_ids': table.match_ids, 'scanned': sorted(scanned)})
+    shutil.rmtree(units_dir, ignore_errors=True)
+    try:
+        os.replace(tmp, units_dir)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def open_unit_table(data_path, cache_dir=None, rebuild=False, matches_dir=None):
+    """
+    打开 (必要时追加 / 重建) 采集缓存中全部对局的单位表
+    matches_dir 缺省为 <缓存目录>/responses/matches
+    返回 (UnitTable, 状态)，状态为 'hit' / 'extended' / 'built'
+    """
+    from .collector import RESPONSES_DIR_NAME
+
+    cache_dir = Path(cache_dir) if cache_dir else Path(data_path).resolve().parent / CACHE_DIR_NAME
+    matches_dir = Path(matches_dir) if matches_dir else cache_dir / RESPONSES_DIR_NAME / 'matches'
+    units_dir = cache_dir / UNITS_DIR_NAME
+    files = _match_files(matches_dir)
+    manifest, table = (None, None) if rebuild else _load(units_dir)
+    scanned = set(manifest['scanned']) if manifest else set()
+    new = [m for m in sorted(files) if m not in scanned]
+    if table is not None and not new:
+        return table, 'hit'
+
+    # 需要改写: 旧表读入内存后再替换目录 (Windows 下被映射的文件无法删除)
+    table = None
+    manifest, old = (None, None) if rebuild else _load(units_dir, mmap_mode=None)
+    if old is None:
+        new = sorted(files)
+    added = flatten((m, _read_detail(files[m])) for m in new)
+    table, status = (added, 'built') if old is None else (concat(old, added), 'extended')
+    _save(units_dir, table, set(manifest['scanned'] if manifest else ()) | set(new))
+    _, saved = _load(units_dir)
+    return (table if saved is None else saved), status
@@ -0,0 +1,52 @@
+"""
+读取前端 src/config.js 中的 WCS 配置 (只做简单的正则解析，不执行 JS)
+
+    WCS_WEIGHTS   {battlefield: 0.25, ..., winBonus: 0.15}
+    WCS_LEVELS    [(80, 'legendary'), ..., (0, 'poor')]  按 min 降序
+"""
+import re
+from pathlib import Path
+
+# 分析脚本的类别名 -> config.js 中 WCS_WEIGHTS 的键
+CATEGORY_KEYS = {
+    '战场贡献': 'battlefield',
+    '战斗效率': 'combat',
+    '火力输出': 'firepower',
+    '团队协作': 'teamwork',
+    '经济管理': 'economy',
+    '战略目标': 'strategy',
+}
+
+DEFAULT_CONFIG = Path(__file__).resolve().parents[2] / 'src' / 'config.js'
+
+
+def _block(text, name, open_ch, close_ch):
+    m = re.search(rf'\b{name}\s*:\s*\{open_ch}', text)
+    if not m:
+        raise ValueError(f'config.js 中没有 {name}')
+    end = text.index(close_ch, m.end())
+    return text[m.end():end]
+
+
+def _strip_comments(text):
+    return re.sub(r'//[^\n]*', '', text)
+
+
+def load_wcs_weights(path=DEFAULT_CONFIG):
+    """WCS_WEIGHTS -> {键: 权重}"""
+    body = _block(_strip_comments(Path(path).read_text(encoding='utf-8')), 'WCS_WEIGHTS', '{', '}')
+    return {k: float(v) for k, v in re.findall(r'(\w+)\s*:\s*([-\d.eE]+)', body)}
+
+
+def load_wcs_levels(path=DEFAULT_CONFIG):
+    """WCS_LEVELS -> [(min, key)]，按 min 降序 (与 JS 的 find 顺序一致)"""
+    body = _block(_strip_comments(Path(path).read_text(encoding='utf-8')), 'WCS_LEVELS', '[', ']')
+    levels = [(float(m), k) for m, k in re.findall(r"min\s*:\s*([-\d.eE]+)\s*,\s*key\s*:\s*['\"](\w+)['\"]", body)]
+    return sorted(levels, key=lambda lv: -lv[0])
+
+
+def category_reference(weights):
+    """WCS_WEIGHTS -> 按类别名的归一化权重 (去掉 winBonus 后和为 1，可与 SHAP 类别权重直接比较)"""
+    dims = {cat: weights.get(key, 0.0) for cat, key in CATEGORY_KEYS.items()}
+    total = sum(dims.values())
+    return {cat: v / total if total > 0 else 0.0 for cat, v in dims.items()}
@@ -0,0 +1,194 @@
+"""
+WCS 批量评分 (analyzer.js processFinalData 六维评分的向量化版)
+
+前端一次只给一个玩家的若干局打分；这里对数据集的每一行 (对局, 玩家) 同时计算:
+    1. 原始指标   与 processFinalData 的 allMetrics 相同 (数据集中已有的列 + dlRatio 缺失时回退 D/L)
+    2. 局内百分位 ranking.match_percentile 一次处理所有指标列 (中位数法，与 percentileSorted 一致)；
+       传入总体断点表 (quantiles.PercentileTable) 时，表中有的指标改为在断点表上二分 (同 percentileFromTable)
+    3. 六维类别分 各维指标百分位的均值 (0~100)，列顺序同 DIM_KEYS
+    4. WCS        类别分矩阵 @ WCS_WEIGHTS + winBonus × 胜负分 (胜 100 / 负 0)
+再按玩家汇总 (前端的总体 WCS = 各局 WCS 的均值) 并按 WCS_LEVELS 划分等级。
+
+与前端的已知差异:
+    - uniqueUnits: 前端统计 UnitData 中不同兵种 Id 的个数，数据集中的 uniqueUnits 是单位记录数；
+      传入单位表 (units.py) 的 unitTypes 时与前端一致
+    - 胜负取数据集的 isWin (按 ratingDelta 修正)，没有平局 (前端平局记 50)
+    - 数据集只保留有 Name 的玩家，队伍合计不含前端推断队伍的匿名玩家
+parity_check() 用 node 运行 scripts/wcs-parity.js 对同一批对局详情逐人比对。
+"""
+import json
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from .ranking import match_percentile
+
+# 六维类别 -> 指标 (顺序与 processFinalData 中的求和顺序一致)
+WCS_DIMENSIONS = {
+    'battlefield': ['teamLossShare', 'teamDmgShare', 'teamDestShare'],
+    'combat': ['survivalRate', 'tankEfficiency', 'costEfficiency', 'dlRatio', 'damageTrade'],
+    'economy': ['refundRate', 'totalRefunded'],
+    'teamwork': ['uniqueUnits', 'supplyFromAllies', 'supplyToAllies'],
+    'strategy': ['objectivesCaptured', 'supplyCaptured', 'buildingsDestroyed'],
+    'firepower': ['destructionScore', 'firepowerROI', 'damageDealt'],
+}
+DIM_KEYS = list(WCS_DIMENSIONS)
+
+PARITY_SCRIPT = Path(__file__).resolve().parent.parent / 'wcs-parity.js'
+
+
+@dataclass
+class PlayerSummary:
+    player_ids: np.ndarray      # 升序
+    matches: np.ndarray         # 每个玩家的局数
+    mean: np.ndarray            # 总体 WCS (各局均值，同前端)
+    std: np.ndarray
+    p10: np.ndarray
+    median: np.ndarray
+    p90: np.ndarray
+    breakdown: np.ndarray       # (玩家, 6) 各维类别分的均值
+    win_rate: np.ndarray
+
+
+def raw_metrics(ds, unit_types=None):
+    """{指标: (行,)}；unit_types 给定时代替数据集的 uniqueUnits"""
+    names = {f for fs in WCS_DIMENSIONS.values() for f in fs}
+
+    def col(name):
+        return np.asarray(ds.columns[name], dtype=np.float64)
+
+    metrics = {f: col(f) for f in names - {'dlRatio', 'uniqueUnits'}}
+    # JS: p.DLRatio || DestructionScore / max(LossesScore, 1)
+    dl = col('dlRatio')
+    metrics['dlRatio'] = np.where(dl != 0, dl, col('destructionScore') / np.maximum(col('lossesScore'), 1))
+    metrics['uniqueUnits'] = col('uniqueUnits') if unit_types is None else np.asarray(unit_types, dtype=np.float64)
+    return metrics
+
+
+def category_scores(ds, unit_types=None, reference=None):
+    """(行, 6) 六维类别分 (0~100)；reference 为 PercentileTable 时表中有的指标用总体百分位"""
+    metrics = raw_metrics(ds, unit_types)
+    names = [f for fs in WCS_DIMENSIONS.values() for f in fs]
+    X = np.column_stack([metrics[f] for f in names])
+    ref = [j for j, f in enumerate(names) if reference is not None and f in reference.tables]
+    local = [j for j in range(len(names)) if j not in ref]
+    P = np.empty_like(X)
+    if local:
+        P[:, local] = match_percentile(X[:, local], ds.match_code)
+    for j in ref:
+        P[:, j] = reference.percentile(names[j], X[:, j])
+    P *= 100
+    out = np.empty((len(ds), len(DIM_KEYS)), dtype=np.float64)
+    j = 0
+    for c, fs in enumerate(WCS_DIMENSIONS.values()):
+        out[:, c] = P[:, j:j + len(fs)].sum(axis=1) / len(fs)
+        j += len(fs)
+    return out
+
+
+def win_scores(ds):
+    return np.asarray(ds.columns['isWin'], dtype=np.float64) * 100
+
+
+def weight_vector(weights):
+    """WCS_WEIGHTS -> (六维权重 (6,), winBonus)"""
+    return np.array([weights.get(k, 0.0) for k in DIM_KEYS]), weights.get('winBonus', 0.0)
+
+
+def wcs_scores(C, win, weights):
+    w, bonus = weight_vector(weights)
+    return C @ w + bonus * win
+
+
+def level_index(scores, levels):
+    """每个分数的等级下标 (levels 为按 min 降序的 [(min, key)]，低于所有 min 的记最后一级，同 JS)"""
+    mins = np.array([m for m, _ in levels])[::-1]
+    pos = np.searchsorted(mins, np.asarray(scores), side='right') - 1
+    return np.where(pos >= 0, len(levels) - 1 - pos, len(levels) - 1)
+
+
+def _group_quantile(values_sorted, starts, counts, q):
+    """每组 (已按组内值升序) 的线性插值分位数"""
+    h = (counts - 1) * q
+    lo = np.floor(h).astype(np.int64)
+    hi = np.minimum(lo + 1, counts - 1)
+    a, b = values_sorted[starts + lo], values_sorted[starts + hi]
+    return a + (h - lo) * (b - a)
+
+
+def player_summary(player, wcs, C, win):
+    """按玩家分组汇总 (排序 + bincount，一次完成)"""
+    ids, inv = np.unique(np.asarray(player), return_inverse=True)
+    inv = inv.reshape(-1)
+    counts = np.bincount(inv, minlength=len(ids))
+    mean = np.bincount(inv, weights=wcs, minlength=len(ids)) / counts
+    var = np.bincount(inv, weights=(wcs - mean[inv]) ** 2, minlength=len(ids)) / counts
+    order = np.lexsort((wcs, inv))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    v = wcs[order]
+    breakdown = np.column_stack([np.bincount(inv, weights=C[:, c], minlength=len(ids)) / counts
+                                 for c in range(C.shape[1])])
+    return PlayerSummary(
+        player_ids=ids, matches=counts, mean=mean, std=np.sqrt(var),
+        p10=_group_quantile(v, starts, counts, 0.1), median=_group_quantile(v, starts, counts, 0.5),
+        p90=_group_quantile(v, starts, counts, 0.9), breakdown=breakdown,
+        win_rate=np.bincount(inv, weights=win / 100, minlength=len(ids)) / counts,
+    )
+
+
+def unit_type_counts(ds, table):
+    """单位表中的兵种数对齐到数据集行，单位表没有的行沿用数据集的 uniqueUnits；返回 (列, 覆盖行数)"""
+    from .units import aggregate_units, align_rows
+
+    rows = align_rows(ds, table)
+    hit = rows >= 0
+    out = np.asarray(ds.columns['uniqueUnits'], dtype=np.float64).copy()
+    out[hit] = aggregate_units(table)['unitTypes'][rows[hit]]
+    return out, int(hit.sum())
+
+
+# ---------- 与前端比对 ----------
+def parity_check(matches, weights, node='node'):
+    """
+    [(matchId, 对局详情)] 分别用前端 processFinalData (node) 与本模块计算每名玩家的六维分 / WCS
+    返回 (比对人数, 六维分最大绝对误差, WCS 最大绝对误差, 胜负判定不同的人数)
+    胜负分以前端的判定为准，只比较评分公式本身
+    """
+    from .collector import build_dataset
+    from .dataset import load_dataset
+    from .units import flatten
+
+    matches = list(matches)
+    with tempfile.TemporaryDirectory() as tmp:
+        src = Path(tmp) / 'matches.json'
+        with open(src, 'w', encoding='utf-8') as f:
+            json.dump([{'id': str(m), 'data': d} for m, d in matches], f, ensure_ascii=False)
+        proc = subprocess.run([node, str(PARITY_SCRIPT), str(src)], capture_output=True, text=True,
+                              encoding='utf-8', check=True)
+        js = json.loads(proc.stdout)
+
+        data = Path(tmp) / 'wcs_raw_data.json'
+        with open(data, 'w', encoding='utf-8') as f:
+            json.dump(build_dataset(matches), f, ensure_ascii=False)
+        ds = load_dataset(data)
+
+    types, _ = unit_type_counts(ds, flatten(matches))
+    C = category_scores(ds, types)
+    w, bonus = weight_vector(weights)
+    n = 0
+    dim_err = wcs_err = 0.0
+    win_diff = 0
+    for r in range(len(ds)):
+        ref = js.get(ds.match_ids[ds.match_code[r]], {}).get(str(int(ds.columns['playerId'][r])))
+        if ref is None:
+            continue
+        n += 1
+        ref_dims = np.array([ref['breakdown'][k] for k in DIM_KEYS])
+        dim_err = max(dim_err, float(np.abs(C[r] - ref_dims).max()))
+        win = 100.0 if ref['isWin'] else (50.0 if ref['isDraw'] else 0.0)
+        wcs_err = max(wcs_err, abs(float(C[r] @ w + bonus * win) - ref['wcs']))
+        win_diff += int(bool(ref['isWin']) != bool(ds.columns['isWin'][r]))
+    return n, dim_err, wcs_err, win_diff
@@ -0,0 +1,202 @@
+"""
+WCS 六维权重的批量评估 (一次矩阵乘法给所有候选打分)
+
+输入是 wcs_score.category_scores 的 (行, 6) 类别分矩阵 C；K 个候选权重 W (K, 6) 归一化到和为 1，
+S = C @ W.T 就是全部候选下每行的 WCS (不含 winBonus，否则胜负直接泄漏进分数)。
+对每一列 (候选) 同时计算:
+    auc         WCS 区分胜 / 负行的 AUC (中位秩 Mann-Whitney，并列记一半)
+    agreement   逐局比较双方平均 WCS，胜方更高的对局占比 (相等记一半)；
+                行按对局排序后乘 ±1/人数 系数，np.add.reduceat 一次得到所有局 × 所有候选的差值
+    corr        WCS 与 ratingDelta 的 Pearson 相关
+候选按内存预算分块，每块只做一次矩阵乘法 + 每个候选一次排序。
+三项指标上的 Pareto 前沿按字典序降序扫描求出 (排在后面的候选不可能支配前面的)。
+
+候选来源: grid (步长 1/m 的单纯形网格)、simplex (Dirichlet 均匀抽样)、
+optimize (交叉熵法: 每轮在当前精英均值附近按 Dirichlet 抽样，精英按指定指标挑选)。
+"""
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+
+OBJECTIVES = ('auc', 'agreement', 'corr')
+# 每个候选在一块中占用的临时数组份数 (S、排序下标、排序值、秩等)
+_COPIES = 6
+# 比较 WCS 前舍入的小数位
+_DECIMALS = 9
+# 双方平均 WCS 之差小于此值视为相等
+_TIE = 1e-7
+
+
+@dataclass
+class Evaluation:
+    weights: np.ndarray     # (K, 6) 归一化权重
+    auc: np.ndarray
+    agreement: np.ndarray
+    corr: np.ndarray
+
+    def objectives(self):
+        return np.column_stack([getattr(self, k) for k in OBJECTIVES])
+
+    def take(self, idx):
+        return Evaluation(weights=self.weights[idx], auc=self.auc[idx],
+                          agreement=self.agreement[idx], corr=self.corr[idx])
+
+
+# ---------- 候选 ----------
+def grid_candidates(steps, dims=6):
+    """和为 1、步长 1/steps 的全部权重 (C(steps+dims-1, dims-1) 个)"""
+    out = []
+    for bars in itertools.combinations(range(steps + dims - 1), dims - 1):
+        cuts = (-1,) + bars + (steps + dims - 1,)
+        out.append([cuts[i + 1] - cuts[i] - 1 for i in range(dims)])
+    return np.asarray(out, dtype=np.float64) / steps
+
+
+def simplex_candidates(n, dims=6, seed=0):
+    """单纯形上均匀抽样"""
+    return np.random.default_rng(seed).dirichlet(np.ones(dims), n)
+
+
+def _normalize(W):
+    W = np.clip(np.asarray(W, dtype=np.float64), 0, None)
+    s = W.sum(axis=1, keepdims=True)
+    return np.divide(W, s, out=np.full_like(W, 1.0 / W.shape[1]), where=s > 0)
+
+
+# ---------- 评估 ----------
+class _Context:
+    """与候选无关的部分: 标签、对局排序与胜负双方系数、ratingDelta 中心化"""
+
+    def __init__(self, C, y, groups, rating_delta):
+        self.C = np.asarray(C, dtype=np.float64)
+        self.y = np.asarray(y).astype(bool)
+        self.n_pos = int(self.y.sum())
+        self.n_neg = len(self.y) - self.n_pos
+
+        groups = np.asarray(groups)
+        order = np.argsort(groups, kind='stable')
+        g = groups[order]
+        starts = np.flatnonzero(np.r_[True, g[1:] != g[:-1]])
+        win = self.y[order]
+        n_win = np.add.reduceat(win.astype(np.float64), starts)
+        n_all = np.diff(np.r_[starts, len(g)]).astype(np.float64)
+        n_lose = n_all - n_win
+        match_of = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(g)]))
+        # 只有双方都有人的对局参与比较
+        valid = (n_win > 0) & (n_lose > 0)
+        coef = np.where(win, 1.0 / np.maximum(n_win[match_of], 1), -1.0 / np.maximum(n_lose[match_of], 1))
+        self.order, self.starts, self.coef, self.valid = order, starts, coef, valid
+
+        r = np.asarray(rating_delta, dtype=np.float64)
+        self.r = r - r.mean()
+        self.r_norm = np.sqrt(self.r @ self.r)
+
+
+def _auc(S, y, n_pos, n_neg):
+    """S: (候选, 行)，每个候选的 AUC (中位秩，并列记一半)"""
+    n = S.shape[1]
+    # 并列值取同一个中位秩，组内先后无关，不需要稳定排序
+    order = np.argsort(S, axis=1)
+    vs = np.take_along_axis(S, order, axis=1)
+    yo = y[order]
+    # 没有并列的候选: 秩 = 位置 + 1，直接累加胜方的位置
+    rank_sum = (yo * np.arange(1, n + 1)).sum(axis=1, dtype=np.float64)
+    run_start = np.ones(vs.shape, dtype=bool)
+    run_start[:, 1:] = vs[:, 1:] != vs[:, :-1]
+    tied = np.flatnonzero(~run_start.all(axis=1))
+    if len(tied):
+        rs = run_start[tied]
+        run_end = np.ones(rs.shape, dtype=bool)
+        run_end[:, :-1] = rs[:, 1:]
+        pos = np.arange(n)[None, :]
+        first = np.maximum.accumulate(np.where(rs, pos, 0), axis=1)
+        last = np.minimum.accumulate(np.where(run_end, pos, n)[:, ::-1], axis=1)[:, ::-1]
+        rank_sum[tied] = (((first + last) * 0.5 + 1) * yo[tied]).sum(axis=1)
+    return (rank_sum - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg)
+
+
+def _evaluate_block(ctx, W):
+    # (候选, 行) 布局，排序 / 分段求和都沿连续的最后一轴。
+    # 类别分是百分位的均值，不同行常有相同的分数；矩阵乘法的求和顺序会让并列值差 1 ulp，
+    # 先舍入到 1e-9 再比较，并列判定与逐个候选计算一致
+    S = np.round(W @ ctx.C.T, _DECIMALS)
+    auc = _auc(S, ctx.y, ctx.n_pos, ctx.n_neg) if ctx.n_pos and ctx.n_neg else np.full(len(W), 0.5)
+
+    diff = np.add.reduceat(S[:, ctx.order] * ctx.coef[None, :], ctx.starts, axis=1)[:, ctx.valid]
+    tie = np.abs(diff) < _TIE
+    agreement = ((diff > 0) & ~tie).sum(axis=1) + 0.5 * tie.sum(axis=1)
+    agreement = agreement / max(diff.shape[1], 1)
+
+    Sc = S - S.mean(axis=1, keepdims=True)
+    denom = np.sqrt((Sc * Sc).sum(axis=1)) * ctx.r_norm
+    corr = np.divide(Sc @ ctx.r, denom, out=np.zeros(len(W)), where=denom > 0)
+    return auc, agreement, corr
+
+
+def chunk_candidates_for_budget(n_rows, memory_mb):
+    return max(1, int(memory_mb * (1 << 20) // (8 * max(n_rows, 1) * _COPIES)))
+
+
+def evaluate(C, y, groups, rating_delta, W, memory_mb=256):
+    """W: (K, 6) 候选 (自动归一化)，返回 Evaluation"""
+    ctx = _Context(C, y, groups, rating_delta)
+    W = _normalize(W)
+    step = chunk_candidates_for_budget(len(ctx.C), memory_mb)
+    parts = [_evaluate_block(ctx, W[s:s + step]) for s in range(0, len(W), step)]
+    auc, agreement, corr = (np.concatenate([p[i] for p in parts]) if parts else np.zeros(0) for i in range(3))
+    return Evaluation(weights=W, auc=auc, agreement=agreement, corr=corr)
+
+
+def optimize(C, y, groups, rating_delta, objective='auc', rounds=20, batch=5000, elite=0.05,
+             concentration=200.0, seed=0, memory_mb=256):
+    """交叉熵法: 每轮在精英均值附近按 Dirichlet(concentration × 均值) 抽样，返回全部轮次的 Evaluation"""
+    ctx = _Context(C, y, groups, rating_delta)
+    rng = np.random.default_rng(seed)
+    step = chunk_candidates_for_budget(len(ctx.C), memory_mb)
+    dims = ctx.C.shape[1]
+    mean = np.full(dims, 1.0 / dims)
+    seen = []
+    for r in range(rounds):
+        W = rng.dirichlet(np.ones(dims), batch) if r == 0 else \
+            rng.dirichlet(np.maximum(concentration * mean, 1e-3), batch)
+        W = _normalize(W)
+        parts = [_evaluate_block(ctx, W[s:s + step]) for s in range(0, len(W), step)]
+        ev = Evaluation(W, *(np.concatenate([p[i] for p in parts]) for i in range(3)))
+        seen.append(ev)
+        score = getattr(ev, objective)
+        top = np.argsort(-score, kind='stable')[:max(1, int(batch * elite))]
+        mean = W[top].mean(axis=0)
+    return Evaluation(weights=np.concatenate([e.weights for e in seen]),
+                      **{k: np.concatenate([getattr(e, k) for e in seen]) for k in OBJECTIVES})
+
+
+def pareto_front(F, chunk=2048):
+    """
+    F: (K, m) 指标 (都是越大越好)，返回非支配候选的下标 (按字典序降序)
+    字典序降序扫描: 后面的候选不可能支配前面的，只需和已确定的前沿 + 同块内比较
+    """
+    F = np.asarray(F, dtype=np.float64)
+    order = np.lexsort(-F.T[::-1])
+    front = np.zeros(0, dtype=np.int64)
+    for s in range(0, len(order), chunk):
+        idx = order[s:s + chunk]
+        cand = F[idx]
+        keep = np.ones(len(idx), dtype=bool)
+        if len(front):
+            fv = F[front]
+            dom = (fv[:, None, :] >= cand[None]).all(axis=2) & (fv[:, None, :] > cand[None]).any(axis=2)
+            keep &= ~dom.any(axis=0)
+        sub = cand[keep]
+        dom = (sub[:, None, :] >= sub[None]).all(axis=2) & (sub[:, None, :] > sub[None]).any(axis=2)
+        keep[np.flatnonzero(keep)[dom.any(axis=0)]] = False
+        front = np.concatenate([front, idx[keep]])
+    return front
+
+
+def knee(F, front):
+    """前沿中各指标按前沿范围归一化后之和最大的候选 (折中推荐)"""
+    V = np.asarray(F, dtype=np.float64)[front]
+    lo, hi = V.min(axis=0), V.max(axis=0)
+    span = np.where(hi > lo, hi - lo, 1.0)
+    return front[int(np.argmax(((V - lo) / span).sum(axis=1)))]
@@ -0,0 +1,181 @@
+"""
+按时间窗口的类别权重漂移 (进程池并行 + 共享内存)
+
+matchId 随时间递增: 对局按 matchId 排序后切成滚动 (固定局数) 或扩张 (从头累积) 窗口，
+每个窗口独立训练 XGBoost + SHAP，得到该时段的类别权重。
+
+特征是按对局百分位化的，一局的百分位只取决于该局自己的 10 行，
+所以窗口的特征矩阵就是全量百分位矩阵的行切片，不需要按窗口重新计算；
+X_pct / y / 对局编号只放入 SharedMemory 一次，任务里只传窗口的行下标。
+
+每个窗口的权重附带对局级 bootstrap 标准误: 按对局有放回重抽样后重训，
+SHAP 仍在原窗口的行上计算 (百分位特征在每局内分布几乎相同，只重抽 SHAP 行而不重训
+几乎测不到波动，主要的不确定性来自模型拟合本身)。
+(窗口, 重抽样) 都是独立任务，一起提交到进程池。
+用 z 值标记相对参考权重 (config.js 的 WCS_WEIGHTS) 或相对第一个窗口显著漂移的维度。
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from .cv import thread_split
+from .search import _attach, _share
+
+DEFAULT_BOOTSTRAP = 20
+
+# worker 进程内挂载的共享数组
+_shared = {}
+
+
+@dataclass
+class WindowResult:
+    window: int
+    first: str              # 窗口内最小 / 最大 matchId
+    last: str
+    matches: int
+    rows: int
+    weights: np.ndarray     # (类别,) 归一化类别权重
+    se: np.ndarray          # bootstrap 重训的标准误
+    mean_abs: np.ndarray    # (特征,) mean |SHAP|
+    fit_s: float            # 该窗口全部任务的训练 + SHAP 耗时之和
+
+
+def match_time_order(match_ids):
+    """对局编号按 matchId 升序 (数字 ID 按数值比较)"""
+    try:
+        keys = [int(m) for m in match_ids]
+    except (TypeError, ValueError):
+        keys = list(match_ids)
+    return np.array(sorted(range(len(match_ids)), key=lambda i: keys[i]), dtype=np.int64)
+
+
+def match_windows(n_matches, size, step=None, expanding=False):
+    """
+    时间顺序下标的窗口划分，返回 [(start, end)]，每个窗口覆盖第 start..end-1 局
+    滚动: 固定 size 局每次前移 step；扩张: 从第 0 局开始，每次多 step 局
+    最后一个窗口总是以最新一局结尾
+    """
+    step = step or size
+    if size >= n_matches:
+        return [(0, n_matches)]
+    ends = list(range(size, n_matches + 1, step))
+    if ends[-1] != n_matches:
+        ends.append(n_matches)
+    return [(0 if expanding else e - size, e) for e in ends]
+
+
+def membership(names, categories):
+    """(特征, 类别) 0/1 矩阵"""
+    col_of = {f: i for i, f in enumerate(names)}
+    C = np.zeros((len(names), len(categories)))
+    for c, cat in enumerate(categories):
+        for f in categories[cat]:
+            if f in col_of:
+                C[col_of[f], c] = 1.0
+    return C
+
+
+def _normalize(totals):
+    s = totals.sum(axis=-1, keepdims=True)
+    return np.divide(totals, s, out=np.zeros_like(totals), where=s > 0)
+
+
+def _init_worker(specs):
+    for key, spec in specs.items():
+        _shared[key] = _attach(spec)
+
+
+def _resample(rows, groups, rng):
+    """按对局有放回重抽样窗口的行"""
+    codes, inv = np.unique(groups[rows], return_inverse=True)
+    by_match = np.split(rows[np.argsort(inv.reshape(-1), kind='stable')],
+                        np.cumsum(np.bincount(inv.reshape(-1)))[:-1])
+    pick = rng.integers(0, len(codes), len(codes))
+    return np.concatenate([by_match[i] for i in pick])
+
+
+def _run_window(task):
+    import shap
+    from xgboost import XGBClassifier
+
+    k, rep, rows, params, threads, C, seed = task
+    X, y, groups = _shared['X'][1], _shared['y'][1], _shared['groups'][1]
+    fit_rows = rows if rep == 0 else _resample(rows, groups, np.random.default_rng([seed, k, rep]))
+    t0 = time.perf_counter()
+    model = XGBClassifier(**{**params, 'n_jobs': threads}).fit(X[fit_rows], y[fit_rows])
+    mean_abs = np.abs(shap.TreeExplainer(model).shap_values(X[rows])).mean(axis=0)
+    return k, rep, _normalize(mean_abs @ C), mean_abs, time.perf_counter() - t0
+
+
+def window_weights(X, y, groups, match_ids, names, categories, params, size, step=None,
+                   expanding=False, n_bootstrap=DEFAULT_BOOTSTRAP, workers=None, threads=None, seed=0):
+    """
+    groups: 每行的对局编号 (match_ids 的下标)
+    返回 ([WindowResult] 按时间顺序, wall_s, workers, threads)
+    """
+    y = np.asarray(y)
+    groups = np.asarray(groups)
+    order = match_time_order(match_ids)
+    rank_of = np.empty(len(order), dtype=np.int64)
+    rank_of[order] = np.arange(len(order))
+    row_rank = rank_of[groups]
+    spans = match_windows(len(order), size, step, expanding)
+    C = membership(names, categories)
+    params = {k: v for k, v in params.items() if k != 'use_label_encoder'}
+
+    windows = [np.flatnonzero((row_rank >= a) & (row_rank < b)) for a, b in spans]
+    workers, threads = thread_split(len(windows) * (1 + n_bootstrap), workers, threads)
+    # 重抽样 0 = 原窗口
+    jobs = [(k, rep, rows, params, threads, C, seed)
+            for k, rows in enumerate(windows) for rep in range(1 + n_bootstrap)]
+
+    t0 = time.perf_counter()
+    if workers == 1:
+        _shared.update(X=(None, X), y=(None, y), groups=(None, groups))
+        try:
+            outputs = [_run_window(job) for job in jobs]
+        finally:
+            _shared.clear()
+    else:
+        shms, specs = {}, {}
+        try:
+            for key, arr in (('X', X), ('y', y), ('groups', groups)):
+                shms[key], specs[key] = _share(arr)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(specs,)) as pool:
+                outputs = list(pool.map(_run_window, jobs))
+        finally:
+            for shm in shms.values():
+                shm.close()
+                shm.unlink()
+    wall = time.perf_counter() - t0
+
+    results = []
+    for k, (a, b) in enumerate(spans):
+        point = next(o for o in outputs if o[0] == k and o[1] == 0)
+        reps = np.array([o[2] for o in outputs if o[0] == k and o[1] > 0])
+        results.append(WindowResult(
+            window=k, first=str(match_ids[order[a]]), last=str(match_ids[order[b - 1]]),
+            matches=b - a, rows=len(windows[k]), weights=point[2],
+            se=reps.std(axis=0) if len(reps) > 1 else np.zeros_like(point[2]),
+            mean_abs=point[3], fit_s=sum(o[4] for o in outputs if o[0] == k),
+        ))
+    return results, wall, workers, threads
+
+
+def drift_z(results, reference=None):
+    """
+    z 值: 各窗口相对参考权重 (窗口, 类别)，以及最后一个窗口相对第一个窗口 (类别,)
+    reference 为 None 时第一项返回 None
+    """
+    W = np.stack([r.weights for r in results])
+    S = np.stack([r.se for r in results])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vs_ref = None
+        if reference is not None:
+            vs_ref = np.where(S > 0, (W - reference) / S, 0.0)
+        pooled = np.sqrt(S[-1] ** 2 + S[0] ** 2)
+        first_last = np.where(pooled > 0, (W[-1] - W[0]) / pooled, 0.0)
+    return vs_ref, first_last
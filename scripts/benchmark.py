@@ -0,0 +1,179 @@
+"""
+分析管线基准测试
+用合成对局数据 (ba_analysis/synthetic.py) 在 10³ ~ 10⁶ 行规模下测量各阶段耗时与内存峰值，
+结果写入 JSON，便于不同版本之间比较回归。
+
+阶段:
+    load           解析 wcs_raw_data.json (含 isWin 修正与交互特征注入)
+    is_win_fix     fix_is_win 逐行修正 (单独计时)
+    percentile     按 matchId 百分位化
+    cv             XGBoost 交叉验证 (按 matchId 分组，各折进程池并行)
+    fit            XGBoost 全量训练
+    shap           TreeExplainer + SHAP 汇总统计
+    pair_effects   全体玩家配对矩阵 + 配对效应 / 队友影响 / 蛆指数
+    combo_synergy  最活跃的 --roster 名玩家的组合统计
+
+使用: pixi run bench  (或 python scripts/benchmark.py --sizes 1000,10000 --out bench.json)
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+import numpy as np
+
+from ba_analysis import load_dataset, match_percentile
+from ba_analysis.cv import grouped_cv
+from ba_analysis.dataset import fix_is_win
+from ba_analysis.lineups import lineup_stats
+from ba_analysis.pairs import build_pair_matrix, maggot_index, pair_effects, teammate_impact
+from ba_analysis.profiling import measure, rss_available
+from ba_analysis.shap_stats import shap_stats
+from ba_analysis.synthetic import MATCH_SIZE, generate_columns, iter_dataset_records, write_dataset
+from ba_analysis.pipeline import CV_FOLDS, EXCLUDE_FIELDS, MODEL_PARAMS
+
+STAGES = ['load', 'is_win_fix', 'percentile', 'cv', 'fit', 'shap', 'pair_effects', 'combo_synergy']
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+
+def _versions():
+    out = {'python': platform.python_version()}
+    for name in ('numpy', 'scikit-learn', 'xgboost', 'shap'):
+        try:
+            out[name] = version(name)
+        except PackageNotFoundError:
+            out[name] = None
+    try:
+        out['git'] = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                    text=True, cwd=Path(__file__).parent, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        out['git'] = None
+    return out
+
+
+def run_size(n_rows, stages, workdir, roster, trace_memory, seed):
+    """跑一个规模的全部阶段，返回 {阶段: 测量结果}"""
+    n_matches = max(1, n_rows // MATCH_SIZE)
+    results = {}
+
+    def stage(name, **counts):
+        rec = dict(counts)
+        results[name] = rec
+        return measure(rec, trace_memory)
+
+    t0 = time.perf_counter()
+    cols = generate_columns(n_matches, seed=seed)
+    path = Path(workdir) / f'wcs_raw_data_{n_rows}.json'
+    write_dataset(path, cols)
+    print(f"  生成 {n_matches} 局 / {n_matches * MATCH_SIZE} 行 "
+          f"({path.stat().st_size / (1 << 20):.1f} MB, {time.perf_counter() - t0:.1f}s)")
+
+    with stage('load', rows=n_matches * MATCH_SIZE):
+        ds = load_dataset(path)
+    path.unlink()
+
+    if 'is_win_fix' in stages:
+        records = list(iter_dataset_records(cols))
+        with stage('is_win_fix', rows=len(records)) as rec:
+            rec['fixed'] = sum(fix_is_win(d) for d in records)
+        del records
+    del cols
+
+    feature_names = [k for k in ds.fields if k not in EXCLUDE_FIELDS]
+    X_raw = ds.matrix(feature_names)
+    y = ds.columns['isWin'].astype(np.int64)
+    with stage('percentile', rows=len(y), features=len(feature_names)):
+        X_pct = match_percentile(X_raw, ds.match_code)
+    del X_raw
+    # 与 regress_weights.py 相同: 过滤零方差特征 (selfDamage / unitCount 恒为 0)
+    valid = np.std(X_pct, axis=0) > 1e-8
+    X_pct = X_pct[:, valid]
+    feature_names = [f for f, v in zip(feature_names, valid) if v]
+
+    model = None
+    if 'cv' in stages:
+        with stage('cv', rows=len(y), features=len(feature_names), folds=CV_FOLDS) as rec:
+            cv = grouped_cv(X_pct, y, ds.match_code, MODEL_PARAMS, CV_FOLDS)
+            rec.update(accuracy=float(cv.scores.mean()), workers=cv.workers, threads=cv.threads,
+                       fold_fit_s=[f.fit_s for f in cv.folds])
+    if 'fit' in stages or 'shap' in stages:
+        from xgboost import XGBClassifier
+        with stage('fit', rows=len(y), features=len(feature_names)):
+            model = XGBClassifier(**MODEL_PARAMS).fit(X_pct, y)
+    if 'shap' in stages:
+        import shap
+        with stage('shap', rows=len(y), features=len(feature_names)):
+            shap_stats(shap.TreeExplainer(model).shap_values(X_pct), y)
+
+    if 'pair_effects' in stages or 'combo_synergy' in stages:
+        with stage('pair_effects', rows=len(y)) as rec:
+            pm = build_pair_matrix(ds)
+            eff = pair_effects(pm, min_together=2)
+            teammate_impact(pm, min_with=2, min_without=2)
+            maggot_index(pm, eff)
+            rec['players'] = int(pm.n_players)
+            rec['pairs'] = int(len(pm.indices))
+    if 'combo_synergy' in stages:
+        active = pm.player_ids[np.argsort(-pm.games, kind='stable')[:roster]].tolist()
+        with stage('combo_synergy', rows=len(y), roster=len(active)) as rec:
+            rec['combos'] = len(lineup_stats(ds, active, min_size=3, min_matches=3))
+
+    return {k: v for k, v in results.items() if k in stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WCS 分析管线基准测试 (合成数据)')
+    parser.add_argument('--sizes', default=','.join(str(s) for s in DEFAULT_SIZES),
+                        help='逗号分隔的行数规模 (默认 1000,10000,100000,1000000)')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f'逗号分隔的阶段 (默认全部: {",".join(STAGES)})')
+    parser.add_argument('--roster', type=int, default=30, help='组合统计取最活跃的玩家数 (默认 30)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='同时统计 tracemalloc 峰值 (纯 Python 阶段会明显变慢，计时仅供参考；无法轮询 RSS 的平台上自动开启)')
+    parser.add_argument('--out', default='benchmark_results.json', help='结果 JSON 路径')
+    args = parser.parse_args()
+
+    sizes = [int(float(s)) for s in args.sizes.split(',') if s]
+    stages = [s for s in args.stages.split(',') if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"未知阶段: {', '.join(sorted(unknown))}")
+
+    print(f"\n{'='*70}")
+    print(f"⏱️ WCS 管线基准测试")
+    print(f"{'='*70}")
+
+    runs = []
+    with tempfile.TemporaryDirectory(prefix='wcs_bench_') as workdir:
+        for n_rows in sizes:
+            print(f"\n▶ {n_rows} 行")
+            res = run_size(n_rows, stages, workdir, args.roster, args.tracemalloc or not rss_available(), args.seed)
+            print(f"  {'阶段':14s}  {'墙钟(s)':>9s}  {'CPU(s)':>9s}  {'RSS峰值(MB)':>12s}")
+            for name in STAGES:
+                if name in res:
+                    r = res[name]
+                    rss = f"{r['peak_rss_mb']:12.1f}" if r['peak_rss_mb'] is not None else f"{'-':>12s}"
+                    print(f"  {name:14s}  {r['wall_s']:9.3f}  {r['cpu_s']:9.3f}  {rss}")
+            runs.append({'rows': n_rows, 'stages': res})
+
+    result = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'versions': _versions(),
+        'machine': {'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'model_params': MODEL_PARAMS,
+        'cv_folds': CV_FOLDS,
+        'runs': runs,
+    }
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 基准结果已保存到 {args.out}")
+
+
+if __name__ == '__main__':
+    main()
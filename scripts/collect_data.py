@@ -0,0 +1,88 @@
+"""
+WCS 数据采集 (Python 版 collect-data.js)
+并发拉取采集名单中每个玩家最近的对局，输出与浏览器脚本相同结构的 wcs_raw_data.json
+
+使用: pixi run collect  (或 python scripts/collect_data.py --players 16589,160368 --out wcs_raw_data.json)
+      --concurrency 每个主机的并发连接数，--rate / --burst 全局令牌桶限速 (次/秒)
+      --retries / --backoff 失败重试次数与指数退避基数 (秒)
+      对局详情缓存在输出目录的 .wcs_cache/responses/ 下，已缓存的对局不会重复请求 (--no-cache 关闭)
+      --batrace-base / --barmory-base 指向其他地址 (如本地模拟服务器)
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+
+from ba_analysis.collector import (BARMORY_BASE, BATRACE_BASE, MATCHES_PER_PLAYER, PLAYER_IDS,
+                                   Collector, HttpPool, TokenBucket, build_dataset, collect,
+                                   responses_dir)
+from ba_analysis.profiling import add_profile_args, profile_path, profiler_from_args
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WCS 对局数据采集')
+    parser.add_argument('--players', default=','.join(PLAYER_IDS), help='逗号分隔的玩家 ID (默认同 collect-data.js)')
+    parser.add_argument('--per-player', type=int, default=MATCHES_PER_PLAYER,
+                        help=f'每个玩家取最近多少局 (默认 {MATCHES_PER_PLAYER})')
+    parser.add_argument('--out', default=str(Path(__file__).parent / 'wcs_raw_data.json'), help='输出 JSON 路径')
+    parser.add_argument('--concurrency', type=int, default=8, help='每个主机的并发连接数 (默认 8)')
+    parser.add_argument('--rate', type=float, default=10.0, help='全局请求速率上限 (次/秒，默认 10，0 = 不限)')
+    parser.add_argument('--burst', type=int, default=10, help='令牌桶容量 (默认 10)')
+    parser.add_argument('--retries', type=int, default=5, help='每个请求的最大尝试次数 (默认 5)')
+    parser.add_argument('--backoff', type=float, default=0.5, help='重试退避基数 (秒，默认 0.5)')
+    parser.add_argument('--timeout', type=float, default=30.0, help='单次请求超时 (秒，默认 30)')
+    parser.add_argument('--no-cache', action='store_true', help='不读写对局详情缓存')
+    parser.add_argument('--batrace-base', default=BATRACE_BASE)
+    parser.add_argument('--barmory-base', default=BARMORY_BASE)
+    add_profile_args(parser)
+    args = parser.parse_args()
+
+    prof = profiler_from_args(args)
+    asyncio.run(run(args, prof))
+    prof.report()
+    saved = prof.save(profile_path(args.out), script='collect_data', args=vars(args))
+    if saved:
+        print(f"  ⏱️ 阶段 profile 已保存到 {saved}")
+
+
+async def run(args, prof):
+    player_ids = [p.strip() for p in args.players.split(',') if p.strip()]
+    print(f"\n🔍 开始采集 {len(player_ids)} 个玩家的对局数据 (全量原始版)...\n")
+
+    prof.stage('collect', players=len(player_ids))
+    t0 = time.perf_counter()
+    pool = HttpPool(max_per_host=args.concurrency, timeout=args.timeout)
+    collector = Collector(pool, TokenBucket(args.rate, args.burst),
+                          cache_dir=None if args.no_cache else responses_dir(args.out),
+                          batrace_base=args.batrace_base, barmory_base=args.barmory_base,
+                          retries=args.retries, backoff=args.backoff)
+    try:
+        matches, failed = await collect(collector, player_ids, args.per_player)
+    finally:
+        await pool.close()
+    elapsed = time.perf_counter() - t0
+    st = collector.stats
+    prof.note(matches=len(matches), requests=st['requests'], cache_hits=st['cache_hits'])
+
+    print(f"\n📊 共采集 {len(matches)} 场不重复的有效对局 ({elapsed:.1f}s)")
+    print(f"  请求 {st['requests']} 次 (重试 {st['retries']})  |  新下载 {st['fetched']} 局  |  "
+          f"缓存命中 {st['cache_hits']} 局  |  失败 {failed} 局  |  连接 {pool.opened} 条")
+
+    prof.stage('build', matches=len(matches))
+    result = build_dataset(matches)
+    dataset = result['dataset']
+    if not dataset:
+        print("⚠️ 没有有效对局，未写出文件")
+        return
+    print(f"📊 数据集: {len(dataset)} 样本, {len(dataset[0])} 个字段")
+    print(f"  胜方: {sum(1 for d in dataset if d['isWin'])} | 败方: {sum(1 for d in dataset if not d['isWin'])}")
+
+    prof.stage('write', rows=len(dataset))
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 全量数据已保存到 {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,184 +2,168 @@
 WCS v3 - SHAP + XGBoost 版本
 用 XGBoost 预测胜负，SHAP 解释每个特征的贡献
 最终输出：分类别的 SHAP 权重 + 可直接写入 config.js 的配置
+各阶段 (load / prepare / rank / train / explain / aggregate / report) 见 ba_analysis/pipeline.py
 
 使用: pixi run regress  (或 python scripts/regress_weights.py wcs_raw_data.json)
+      --retrain 忽略缓存的模型/SHAP 强制重训，--no-plot 跳过 Summary Plot
+      --shap-memory-mb 256 分块计算 SHAP (百万行级数据用)，内存由预算决定
+      --incremental 在上次的 booster 上只用新对局继续训练，报告 WCS 权重漂移
+      --profile 记录各阶段耗时/内存到 wcs_shap_analysis.profile.json (--cprofile explain 导出该阶段 cProfile)
+      --interactions tree 用 Tree SHAP 交互值代替相关系数近似 (--top-interactions 控制条数)
+      --cv-workers / --cv-threads 并行折数与每个模型的线程数 (CV 按 matchId 分组，默认按 CPU 核数切分)
+      --search random|grid 并行超参搜索 (早停)，排行榜写入 wcs_hyperparam_search.json，最优配置用于 SHAP；
+      --params wcs_hyperparam_search.json 直接沿用上次搜索的最优配置
+      --export-model 把训练好的 booster 导出为节点表 wcs_model.npz + wcs_model.json
+      (纯 NumPy / 前端 forest.js 评分，不需要 xgboost)
+      --window 20 按 matchId 时间顺序切成每 20 局的滚动窗口 (--expanding 为扩张窗口，--window-step 步长)，
+      各窗口并行训练 + SHAP，输出权重随时间变化表并标记相对 config.js 显著漂移的维度 (wcs_weight_drift.json)
+      --unit-features 从采集缓存的对局详情展平 UnitData，把按玩家聚合的兵种构成特征加入特征矩阵
+      (单独汇总为 "兵种构成" 类别，检验兵种构成对胜负的影响)
 """
+import argparse
 import json
 import sys
 import numpy as np
 from pathlib import Path
-from collections import defaultdict
 
-def main():
-    # ===== 加载数据 =====
-    data_path = sys.argv[1] if len(sys.argv) > 1 else 'wcs_raw_data.json'
-    for p in [data_path, f'scripts/{data_path}', f'../{data_path}']:
-        if Path(p).exists():
-            data_path = p
-            break
-
-    with open(data_path, 'r', encoding='utf-8') as f:
-        raw = json.load(f)
-
-    dataset = raw['dataset']
-
-    # ===== 修正 isWin bug =====
-    # collect-data.js 中 match.WinnerTeam 编号可能与 TeamId 不一致
-    # 用 ratingDelta > 0 = 赢 来覆盖原始 isWin
-    fixed = 0
-    for d in dataset:
-        correct = 1 if d.get('ratingDelta', 0) > 0 else 0
-        if d['isWin'] != correct:
-            fixed += 1
-            d['isWin'] = correct
-
-    # ===== 注入交互特征 =====
-    # 让 SHAP 告诉我们这些交互项是否真的影响胜率
-    for d in dataset:
-        net_inv = max(d.get('netInvestment', 1), 1)
-        loss_score = d.get('lossesScore', 0)
-        dmg_trade = d.get('damageTrade', 0)
-        team_loss = d.get('teamLossShare', 0)
-        team_dmg = d.get('teamDmgShare', 0)
-        team_dest = d.get('teamDestShare', 0)
-        cost_eff = d.get('costEfficiency', 0)
-        dmg_dealt = d.get('damageDealt', 0)
-
-        # 承伤效率: 承压多 + 打得回来 = 高 → 好; 承压多 + 打不回来 = 低 → 差
-        d['tankEfficiency'] = team_loss * dmg_trade
-
-        # 火力性价比: 每点投入产出多少伤害
-        d['firepowerROI'] = dmg_dealt / net_inv
-
-        # 火力集中度: 伤害占比 × 击杀占比都高 = 输出集中在你身上
-        d['combatPresence'] = team_dmg * team_dest
-
-        # 损失有效度: 亏了多少 × 但成本效率高不高
-        d['lossEfficiency'] = loss_score * cost_eff
-
-    # 特征定义（排除标签和非特征字段）
-    exclude = {'matchId', 'playerId', 'teamId', 'isWin',
-               'oldRating', 'newRating', 'ratingDelta'}
-    feature_names = [k for k in dataset[0].keys() if k not in exclude]
+from ba_analysis import pipeline
+from ba_analysis.artifacts import load_artifacts, load_model, models_dir, save_artifacts, save_interactions
+from ba_analysis.forest import export_booster
+from ba_analysis.incremental import (load_state, new_match_rows, reservoir_update, save_state,
+                                     state_dir, weight_drift)
+from ba_analysis.interactions import chunk_rows_for_budget as interaction_chunk_rows
+from ba_analysis.interactions import interaction_strength, top_pairs
+from ba_analysis.pipeline import CV_FOLDS, CV_SPLIT, MODEL_PARAMS, WIN_BONUS
+from ba_analysis.profiling import add_profile_args, profile_path, profiler_from_args
+from ba_analysis.search import INNER_FOLDS, SEARCH_SPACE, best_params, grid_configs, random_configs, search
+from ba_analysis.shap_stats import chunk_rows_for_budget, shap_stats
+from ba_analysis.units import open_unit_table, unit_categories, unit_columns, with_unit_features
+from ba_analysis.wcs_config import category_reference, load_wcs_weights
+from ba_analysis.windows import DEFAULT_BOOTSTRAP, drift_z, window_weights
+
+# 交互值分块计算的默认内存预算 (MB)，--shap-memory-mb 优先
+INTERACTION_MEMORY_MB = 256
+# 增量模式: 每次在新对局上追加的树数 / SHAP 蓄水池样本行数
+INCREMENTAL_ROUNDS = 20
+INCREMENTAL_SAMPLE = 5000
 
-    X_raw = np.array([[d[f] for f in feature_names] for d in dataset])
-    y = np.array([d['isWin'] for d in dataset])
 
+def main():
+    parser = argparse.ArgumentParser(description='WCS v3 - SHAP + XGBoost 权重分析')
+    parser.add_argument('data', nargs='?', default='wcs_raw_data.json', help='wcs_raw_data.json 路径')
+    parser.add_argument('--retrain', action='store_true', help='忽略缓存的模型/SHAP，强制重新训练')
+    parser.add_argument('--no-plot', action='store_true', help='跳过 SHAP Summary Plot')
+    parser.add_argument('--shap-memory-mb', type=float, default=None,
+                        help='分块计算 SHAP，只保留流式统计量；值为 SHAP 阶段的内存预算 (MB)')
+    parser.add_argument('--plot-sample', type=int, default=2000,
+                        help='分块模式下为 Summary Plot 随机保留的行数 (默认 2000)')
+    parser.add_argument('--interactions', choices=['corr', 'tree'], default='corr',
+                        help='交互分析: corr = SHAP 列相关系数近似 (默认)，tree = Tree SHAP 交互值')
+    parser.add_argument('--top-interactions', type=int, default=10, help='报告的交互对数 (默认 10)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量模式: 在上次的 booster 上只用新对局继续训练，并报告权重漂移')
+    parser.add_argument('--rounds', type=int, default=INCREMENTAL_ROUNDS,
+                        help=f'增量模式每次追加的树数 (默认 {INCREMENTAL_ROUNDS})')
+    parser.add_argument('--sample-size', type=int, default=INCREMENTAL_SAMPLE,
+                        help=f'增量模式 SHAP 蓄水池样本行数 (默认 {INCREMENTAL_SAMPLE})')
+    parser.add_argument('--cv-workers', type=int, default=None,
+                        help='并行训练的折数 (含全量训练，默认按 CPU 核数)；1 = 当前进程内顺序执行')
+    parser.add_argument('--cv-threads', type=int, default=None,
+                        help='每个 XGBoost 模型的线程数 (默认 CPU 核数 / 并行折数)')
+    parser.add_argument('--search', choices=['random', 'grid'], default=None,
+                        help='超参搜索: random = 随机抽 --trials 个配置，grid = 全部组合 (并行度同 --cv-workers/--cv-threads)')
+    parser.add_argument('--trials', type=int, default=20, help='随机搜索的配置数 (默认 20)')
+    parser.add_argument('--params', default=None,
+                        help='从搜索排行榜 JSON 读取最优超参 (代替内置 MODEL_PARAMS)')
+    parser.add_argument('--export-model', nargs='?', const='', default=None, metavar='STEM',
+                        help='导出节点表 <STEM>.npz / <STEM>.json (默认 数据目录/wcs_model)')
+    parser.add_argument('--window', type=int, default=None,
+                        help='时间窗口模式: 每个窗口的对局数 (按 matchId 排序)，各窗口并行训练 + SHAP')
+    parser.add_argument('--window-step', type=int, default=None, help='窗口步长 (局，默认等于 --window)')
+    parser.add_argument('--expanding', action='store_true', help='扩张窗口 (从第一局累积)，默认滚动窗口')
+    parser.add_argument('--window-bootstrap', type=int, default=DEFAULT_BOOTSTRAP,
+                        help=f'每个窗口按对局重抽样重训、估计权重标准误的次数 (默认 {DEFAULT_BOOTSTRAP}，0 = 不估计)')
+    parser.add_argument('--drift-z', type=float, default=1.96, help='标记显著漂移的 |z| 阈值 (默认 1.96)')
+    parser.add_argument('--unit-features', action='store_true',
+                        help='加入 UnitData 按玩家聚合的兵种构成特征 (需要采集器缓存的对局详情)')
+    add_profile_args(parser)
+    args = parser.parse_args()
+    # 增量 / 窗口模式的特征集由各自的状态决定，不支持追加单位特征
+    if args.unit_features and (args.incremental or args.window):
+        parser.error('--unit-features 不能与 --incremental / --window 同时使用')
+
+    prof = profiler_from_args(args)
+    out_path = analyze(args, prof)
+    prof.report()
+    saved = prof.save(profile_path(out_path), script='regress_weights', args=vars(args))
+    if saved:
+        print(f"  ⏱️ 阶段 profile 已保存到 {saved}")
+
+
+def print_cv(cv):
+    """按对局分组的 CV 结果与每折耗时"""
+    print(f"\n  XGBoost {CV_FOLDS}-fold CV (按 matchId 分组): {cv.scores.mean():.4f} (±{cv.scores.std():.4f})")
+    print(f"  并行: {cv.workers} 进程 × {cv.threads} 线程, 墙钟 {cv.wall_s:.2f}s (全量训练 {cv.fit_s:.2f}s)")
+    for f in cv.folds:
+        print(f"    折 {f.fold}: 准确率 {f.accuracy:.4f}  验证 {f.test_rows} 行 / {f.test_matches} 局  "
+              f"训练 {f.fit_s:.2f}s  预测 {f.predict_s:.3f}s")
+
+
+def run_search(feats, data_path, args, prof):
+    """并行超参搜索，写出排行榜 JSON，返回最优配置的完整参数"""
+    configs = grid_configs() if args.search == 'grid' else random_configs(n=args.trials)
+    prof.stage('search', rows=len(feats.y), features=len(feats.names), trials=len(configs))
     print(f"\n{'='*70}")
-    print(f"📊 WCS v3 — SHAP + XGBoost 分析")
+    print(f"🔍 超参搜索 ({args.search}, {len(configs)} 个配置, 按 matchId 分组 {CV_FOLDS} 折, "
+          f"训练对局内切出 1/{INNER_FOLDS} 早停)")
     print(f"{'='*70}")
-    print(f"  样本: {len(dataset)}  |  对局: {raw['metadata']['matchCount']}")
-    print(f"  特征: {len(feature_names)}  |  胜/败: {y.sum()}/{len(y)-y.sum()}")
-
-    # ===== 按 matchId 做百分位化 =====
-    match_groups = defaultdict(list)
-    for i, d in enumerate(dataset):
-        match_groups[d['matchId']].append(i)
-
-    X_pct = np.zeros_like(X_raw, dtype=np.float64)
-    for indices in match_groups.values():
-        for fi in range(len(feature_names)):
-            vals = X_raw[indices, fi]
-            for idx in indices:
-                v = X_raw[idx, fi]
-                below = np.sum(vals < v)
-                equal = np.sum(vals == v)
-                X_pct[idx, fi] = (below + equal * 0.5) / len(vals)
-
-    # 过滤零方差特征
-    valid = np.std(X_pct, axis=0) > 1e-8
-    removed = [f for f, v in zip(feature_names, valid) if not v]
-    if removed:
-        print(f"  ⚠️ 移除零方差: {', '.join(removed)}")
-    feature_names = [f for f, v in zip(feature_names, valid) if v]
-    X_pct = X_pct[:, valid]
-
-    # ===== XGBoost 训练 =====
-    from xgboost import XGBClassifier
-    from sklearn.model_selection import cross_val_score
-
-    model = XGBClassifier(
-        n_estimators=200,
-        max_depth=4,
-        learning_rate=0.1,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        random_state=42,
-        use_label_encoder=False,
-        eval_metric='logloss',
-    )
-
-    cv_scores = cross_val_score(model, X_pct, y, cv=5, scoring='accuracy')
-    print(f"\n  XGBoost 5-fold CV: {cv_scores.mean():.4f} (±{cv_scores.std():.4f})")
-
-    model.fit(X_pct, y)
-
-    # ===== SHAP 分析 =====
-    import shap
-    print(f"\n  计算 SHAP 值中...")
+    board = search(feats.X, feats.y, feats.groups, configs, MODEL_PARAMS, CV_FOLDS,
+                   workers=args.cv_workers, threads=args.cv_threads)
+    params = best_params(board, MODEL_PARAMS)
 
-    explainer = shap.TreeExplainer(model)
-    shap_values = explainer.shap_values(X_pct)
-
-    # shap_values 形状: (n_samples, n_features)
-    # 正值 = 倾向胜利, 负值 = 倾向失败
-
-    # ===== 全局特征重要性（平均 |SHAP|）=====
-    mean_abs_shap = np.mean(np.abs(shap_values), axis=0)
-    mean_shap = np.mean(shap_values, axis=0)  # 带方向的平均
+    keys = list(SEARCH_SPACE)
+    print(f"  {'#':>3s}  {'logloss':>8s}  {'准确率':>8s}  {'树数':>5s}  {'耗时(s)':>8s}  " + '  '.join(keys))
+    for r in board[:10]:
+        print(f"  {r['rank']:3d}  {r['logloss']:8.4f}  {r['accuracy']:8.4f}  {r['n_estimators']:5d}  "
+              f"{r['train_s']:8.2f}  " + '  '.join(str(r['config'][k]) for k in keys))
 
+    out_path = Path(data_path).parent / 'wcs_hyperparam_search.json'
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'mode': args.search,
+            'cv_folds': CV_FOLDS,
+            'cv_split': CV_SPLIT,
+            'early_stopping_split': f'每折训练对局的 1/{INNER_FOLDS} (按对局切分，不含验证折)',
+            'search_space': SEARCH_SPACE,
+            'best_params': params,
+            'leaderboard': board,
+        }, f, indent=2, ensure_ascii=False)
+    print(f"\n  最优配置: {board[0]['config']} (n_estimators={params['n_estimators']})")
+    print(f"  ✅ 排行榜已保存到 {out_path}")
+    return params
+
+
+def print_aggregate(agg):
+    """全局重要性 / 分类别 / 胜败对比 / WCS 配置建议"""
     print(f"\n{'='*70}")
     print(f"🔫 全局 SHAP 特征重要性 (mean |SHAP|)")
     print(f"{'='*70}")
 
-    importance = sorted(zip(feature_names, mean_abs_shap, mean_shap),
-                       key=lambda x: -x[1])
-    for fname, imp, direction in importance:
+    for fname, imp, direction in agg.importance:
         bar = "█" * int(imp * 80)
         sign = "↑" if direction > 0 else "↓"
         print(f"  {sign} {fname:22s}: {imp:.4f}  {bar}")
 
     # ===== 分类别汇总 =====
-    CATEGORIES = {
-        '经济管理': ['totalSpawned', 'totalRefunded', 'refundRate', 'netInvestment',
-                   'supplyConsumed'],
-        '战斗效率': ['costEfficiency', 'damageTrade', 'dlRatio', 'survivalRate',
-                   'tankEfficiency', 'lossEfficiency'],
-        '火力输出': ['damageDealt', 'destructionScore', 'damageReceived',
-                   'firepowerROI', 'combatPresence'],
-        '战场贡献': ['lossesScore', 'teamLossShare', 'teamDmgShare',
-                   'teamDestShare', 'teamSpawnShare'],
-        '战略目标': ['objectivesCaptured', 'supplyCaptured', 'buildingsDestroyed'],
-        '团队协作': ['supplyFromAllies', 'supplyToAllies', 'uniqueUnits', 'unitCount'],
-    }
-
-    # 建立 feature_name -> index 映射
-    fname_to_idx = {f: i for i, f in enumerate(feature_names)}
-
     print(f"\n{'='*70}")
     print(f"📊 分类别 SHAP 贡献 (用于雷达图)")
     print(f"{'='*70}")
 
-    category_importance = {}
-    for cat, features in CATEGORIES.items():
-        cat_shap = 0
-        cat_features = []
-        for f in features:
-            if f in fname_to_idx:
-                idx = fname_to_idx[f]
-                cat_shap += mean_abs_shap[idx]
-                cat_features.append((f, mean_abs_shap[idx], mean_shap[idx]))
-        category_importance[cat] = {
-            'total': cat_shap,
-            'features': cat_features,
-        }
-
     # 归一化为百分比
-    total_imp = sum(v['total'] for v in category_importance.values())
+    total_imp = agg.total
     print()
-    for cat in sorted(category_importance, key=lambda c: -category_importance[c]['total']):
-        info = category_importance[cat]
+    for cat in sorted(agg.categories, key=lambda c: -agg.categories[c]['total']):
+        info = agg.categories[cat]
         pct = info['total'] / total_imp * 100 if total_imp > 0 else 0
         bar = "█" * int(pct * 0.6)
         print(f"  {cat:10s}: {pct:5.1f}%  {bar}")
@@ -192,16 +176,9 @@ def main():
     print(f"🏆 胜方 vs 败方的平均 SHAP 值")
     print(f"{'='*70}")
 
-    win_mask = y == 1
-    lose_mask = y == 0
-    win_shap = np.mean(shap_values[win_mask], axis=0)
-    lose_shap = np.mean(shap_values[lose_mask], axis=0)
-
-    diffs = sorted(zip(feature_names, win_shap, lose_shap),
-                  key=lambda x: -(x[1] - x[2]))
     print(f"\n  {'特征':22s}  {'胜方':>8s}  {'败方':>8s}  {'差异':>8s}")
     print(f"  {'-'*52}")
-    for fname, w, l in diffs:
+    for fname, w, l in agg.win_vs_lose:
         diff = w - l
         indicator = "⬆️" if diff > 0.01 else ("⬇️" if diff < -0.01 else "  ")
         print(f"  {fname:22s}  {w:+.4f}  {l:+.4f}  {diff:+.4f} {indicator}")
@@ -211,73 +188,380 @@ def main():
     print(f"📋 WCS 配置建议 (基于 SHAP 分类别权重)")
     print(f"{'='*70}")
 
-    # 正向类别 = SHAP mean > 0 的特征的重要性
-    wcs_dims = {}
-    for cat, info in category_importance.items():
-        wcs_dims[cat] = info['total'] / total_imp if total_imp > 0 else 0
+    wcs_dims = {cat: info['total'] / total_imp if total_imp > 0 else 0
+                for cat, info in agg.categories.items()}
 
-    print(f"\n  WCS 维度权重 (归一化, 留 15% 给 winBonus):")
+    print(f"\n  WCS 维度权重 (归一化, 留 {WIN_BONUS:.0%} 给 winBonus):")
     for cat in sorted(wcs_dims, key=lambda c: -wcs_dims[c]):
-        w = wcs_dims[cat] * 0.85
+        w = wcs_dims[cat] * (1 - WIN_BONUS)
         print(f"    {cat:12s}: {w:.4f}")
-    print(f"    {'winBonus':12s}: 0.1500")
+    print(f"    {'winBonus':12s}: {WIN_BONUS:.4f}")
+
+
+def analyze(args, prof):
+    """完整分析流程，返回结果 JSON 路径"""
+    # ===== 加载数据 =====
+    data_path = pipeline.resolve_data_path(args.data)
+
+    prof.stage('load')
+    ds = pipeline.load(data_path)
+    prof.note(rows=len(ds), matches=len(ds.match_ids))
+    if args.incremental:
+        return run_incremental(ds, data_path, args, prof)
+    if args.window:
+        return run_windows(ds, data_path, args, prof)
+
+    categories = pipeline.CATEGORIES
+    if args.unit_features:
+        prof.stage('units')
+        table, status = open_unit_table(data_path)
+        cols, covered = unit_columns(ds, table)
+        ds = with_unit_features(ds, cols)
+        categories = unit_categories(categories)
+        prof.note(units=len(table), covered=covered, status=status)
+        print(f"  🪖 单位表 ({status}): {len(table)} 条单位记录, {len(table.match_ids)} 局, "
+              f"覆盖 {covered}/{len(ds)} 行")
+        if covered == 0:
+            sys.exit("  ❌ 没有匹配的 UnitData (先运行 pixi run collect 缓存对局详情)，--unit-features 无法使用")
+
+    # 特征定义（排除标签和非特征字段）
+    # isWin 修正与交互特征注入已在加载阶段完成 (结果缓存于 .wcs_cache/)
+    prof.stage('prepare', rows=len(ds))
+    feats = pipeline.prepare(ds)
+    y = feats.y
+
+    print(f"\n{'='*70}")
+    print(f"📊 WCS v3 — SHAP + XGBoost 分析")
+    print(f"{'='*70}")
+    print(f"  样本: {len(ds)}  |  对局: {ds.metadata['matchCount']}")
+    print(f"  特征: {len(feats.names)}  |  胜/败: {y.sum()}/{len(y)-y.sum()}")
+
+    # ===== 按 matchId 做百分位化 (过滤零方差特征) =====
+    prof.stage('rank', rows=len(ds), features=len(feats.names))
+    feats = pipeline.rank(feats)
+    if feats.removed:
+        print(f"  ⚠️ 移除零方差: {', '.join(feats.removed)}")
+    feature_names, X_pct = feats.names, feats.X
+
+    # ===== XGBoost 训练 + SHAP (按 数据 + 特征 + 超参 缓存) =====
+    chunked = args.shap_memory_mb is not None
+    shap_mode = {'memory_mb': args.shap_memory_mb, 'plot_sample': args.plot_sample} if chunked else None
+    art_root = models_dir(data_path)
+    params = MODEL_PARAMS
+    if args.search:
+        params = run_search(feats, data_path, args, prof)
+    elif args.params:
+        with open(args.params, 'r', encoding='utf-8') as f:
+            params = json.load(f)['best_params']
+        print(f"\n  使用 {args.params} 中的超参: {params}")
+    prof.stage('artifact_lookup', rows=len(y), features=len(feature_names))
+    art_key = pipeline.cache_key(feats, params, shap_mode=shap_mode)
+    art = None if args.retrain else load_artifacts(art_root, art_key)
+    prof.note(hit=art is not None)
+
+    if art is not None:
+        cv_scores = art['cv_scores']
+        stats = art['shap_stats']
+        shap_values = art['shap_values']
+        interactions = art['interactions']
+        print(f"\n  ♻️ 复用缓存的模型与 SHAP ({art_key})")
+        print(f"\n  XGBoost {CV_FOLDS}-fold CV (按 matchId 分组): {cv_scores.mean():.4f} (±{cv_scores.std():.4f})")
+    else:
+        interactions = None
+        prof.stage('train', rows=len(y), features=len(feature_names), folds=CV_FOLDS)
+        model, cv = pipeline.train(feats, params, workers=args.cv_workers, threads=args.cv_threads)
+        cv_scores = cv.scores
+        prof.note(workers=cv.workers, threads=cv.threads)
+        print_cv(cv)
+
+        # ===== SHAP 分析 =====
+        prof.stage('explain', rows=len(y), features=len(feature_names), chunked=chunked)
+        print(f"\n  计算 SHAP 值中...")
+        if chunked:
+            # 分块解释 + 流式累加，不保留完整 SHAP 矩阵
+            chunk_rows = chunk_rows_for_budget(len(feature_names), args.shap_memory_mb, args.plot_sample)
+            print(f"  分块模式: 每块 {chunk_rows} 行, 内存预算 {args.shap_memory_mb:g} MB, 绘图样本 {args.plot_sample} 行")
+        stats, shap_values = pipeline.explain(model, feats, args.shap_memory_mb, args.plot_sample)
+
+        prof.stage('save_artifacts')
+        save_artifacts(art_root, art_key, model, cv_scores, stats, shap_values, {
+            'features': feature_names,
+            'params': params,
+            'cv_folds': CV_FOLDS,
+            'cv_split': CV_SPLIT,
+            'shap_chunked': shap_mode,
+            'rows': int(len(y)),
+        })
+
+    if args.export_model is not None:
+        prof.stage('export_model', features=len(feature_names))
+        if art is not None:
+            model = load_model(art['model_path'])
+        stem = Path(args.export_model) if args.export_model else Path(data_path).parent / 'wcs_model'
+        forest = export_booster(model, feature_names)
+        npz_path = forest.save_npz(stem.with_suffix('.npz'))
+        json_path = forest.save_json(stem.with_suffix('.json'))
+        print(f"\n  🌲 模型节点表已导出: {npz_path} / {json_path} "
+              f"({forest.n_trees} 棵树, {len(forest.feature)} 个节点, 深度 ≤ {forest.max_depth})")
+
+    # shap 值: 正值 = 倾向胜利, 负值 = 倾向失败
+    prof.stage('aggregate', features=len(feature_names))
+    agg = pipeline.aggregate(feature_names, stats, categories)
+    print_aggregate(agg)
 
     # ===== SHAP 交互效应 (top 交互对) =====
+    top_k = args.top_interactions
+    prof.stage('interactions', features=len(feature_names), mode=args.interactions)
     print(f"\n{'='*70}")
-    print(f"🔗 SHAP 特征交互分析 (Top 10)")
+    print(f"🔗 SHAP 特征交互分析 (Top {top_k})")
     print(f"{'='*70}")
 
-    # 使用特征重要性的协方差近似交互
-    shap_cov = np.abs(np.corrcoef(shap_values.T))
-    interactions = []
-    for i in range(len(feature_names)):
-        for j in range(i+1, len(feature_names)):
-            interactions.append((feature_names[i], feature_names[j], shap_cov[i, j]))
-    interactions.sort(key=lambda x: -x[2])
+    iu = np.triu_indices(len(feature_names), k=1)
+    if args.interactions == 'tree':
+        # Tree SHAP 交互值: 分块累加上三角平均 |Φ_ij + Φ_ji|
+        if interactions is None:
+            import shap
+            if art is not None:
+                model = load_model(art['model_path'])
+            memory_mb = args.shap_memory_mb or INTERACTION_MEMORY_MB
+            chunk_rows = interaction_chunk_rows(len(feature_names), memory_mb)
+            print(f"\n  计算 SHAP 交互值中... (每块 {chunk_rows} 行)")
+            interactions = interaction_strength(shap.TreeExplainer(model), X_pct, chunk_rows)
+            save_interactions(art_root, art_key, interactions)
+        strength = interactions
+    else:
+        # 使用特征重要性的协方差近似交互
+        strength = np.abs(stats.corr)[iu]
+    top = [(feature_names[i], feature_names[j], v) for i, j, v in top_pairs(strength, iu, top_k)]
 
     print()
-    for f1, f2, strength in interactions[:10]:
-        bar = "█" * int(strength * 30)
-        print(f"  {f1:20s} × {f2:20s}: {strength:.3f}  {bar}")
+    for f1, f2, v in top:
+        bar = "█" * int(v * 30)
+        print(f"  {f1:20s} × {f2:20s}: {v:.3f}  {bar}")
 
     # ===== 保存结果 =====
-    result = {
-        'method': 'XGBoost + SHAP',
-        'cv_accuracy': float(cv_scores.mean()),
-        'cv_std': float(cv_scores.std()),
-        'global_shap_importance': {f: float(v) for f, v in zip(feature_names, mean_abs_shap)},
-        'global_shap_direction': {f: float(v) for f, v in zip(feature_names, mean_shap)},
-        'category_weights': {cat: float(info['total'] / total_imp) for cat, info in category_importance.items()},
-        'win_vs_lose_shap': {
-            f: {'win': float(w), 'lose': float(l), 'diff': float(w-l)}
-            for f, w, l in diffs
-        },
-        'sample_count': len(dataset),
-        'match_count': raw['metadata']['matchCount'],
-    }
-
+    prof.stage('report')
+    result = pipeline.report(agg, cv_scores, ds, top if args.interactions == 'tree' else None,
+                             params if params is not MODEL_PARAMS else None)
     out_path = Path(data_path).parent / 'wcs_shap_analysis.json'
     with open(out_path, 'w', encoding='utf-8') as f:
         json.dump(result, f, indent=2, ensure_ascii=False)
     print(f"\n✅ 分析结果已保存到 {out_path}")
 
     # ===== SHAP Summary Plot =====
+    if args.no_plot:
+        return out_path
+    prof.stage('plot')
     try:
         print(f"\n📊 正在生成 SHAP Summary Plot...")
-        import matplotlib
-        matplotlib.use('Agg')
-        import matplotlib.pyplot as plt
-
-        fig, ax = plt.subplots(figsize=(12, 8))
-        shap.summary_plot(shap_values, X_pct, feature_names=feature_names,
-                         show=False, max_display=20)
-        plot_path = Path(data_path).parent / 'shap_summary.png'
-        plt.tight_layout()
-        plt.savefig(plot_path, dpi=150, bbox_inches='tight')
-        plt.close()
+        # 分块模式下只有蓄水池样本
+        plot_shap, plot_X = (shap_values, X_pct) if shap_values is not None else (stats.sample_shap, stats.sample_X)
+        plot_path = pipeline.plot_summary(plot_shap, plot_X, feature_names,
+                                          Path(data_path).parent / 'shap_summary.png')
         print(f"  📈 SHAP 图已保存到 {plot_path}")
     except Exception as e:
         print(f"  ⚠️ 图表生成失败 (可选): {e}")
+    return out_path
+
+
+def run_incremental(ds, data_path, args, prof):
+    """
+    增量刷新: 在上次保存的 booster 上只用新 matchId 的行继续 boosting，
+    SHAP 在蓄水池样本上重算类别权重，并与上次的权重比较漂移。
+    首次运行 (或 --retrain) 用全量数据初始化状态，漂移基准取 wcs_shap_analysis.json。
+    返回结果 JSON 路径
+    """
+    import shap
+
+    prof.stage('load_state')
+    root = state_dir(data_path)
+    prev = None if args.retrain else load_state(root)
+
+    print(f"\n{'='*70}")
+    print(f"🔁 WCS 增量权重刷新")
+    print(f"{'='*70}")
+
+    if prev is None:
+        prof.stage('rank', rows=len(ds))
+        new = pipeline.rank(pipeline.prepare(ds))
+        feature_names = new.names
+        print(f"  初始化: 全量训练 {len(new.y)} 行 / {len(ds.match_ids)} 局")
+        prof.stage('fit', rows=len(new.y), features=len(feature_names))
+        model = pipeline.fit(new)
+        n_trees = MODEL_PARAMS['n_estimators']
+        n_seen, seen_ids = 0, []
+        sample_X = np.zeros((0, len(feature_names)))
+        sample_y = np.zeros(0, dtype=np.int64)
+        last_path = Path(data_path).parent / 'wcs_shap_analysis.json'
+        try:
+            with open(last_path, 'r', encoding='utf-8') as f:
+                last_weights = json.load(f)['category_weights']
+        except (OSError, ValueError, KeyError):
+            last_weights = {}
+    else:
+        state = prev['state']
+        feature_names = state['features']
+        seen_ids = state['match_ids']
+        fresh = new_match_rows(ds, seen_ids)
+        if not fresh.any():
+            print(f"  没有新对局 (已训练 {len(seen_ids)} 局)，权重不变")
+            return Path(data_path).parent / 'wcs_shap_incremental.json'
+        rows = np.nonzero(fresh)[0]
+        prof.stage('rank', rows=len(rows), features=len(feature_names))
+        new = pipeline.select(pipeline.prepare(ds, rows=rows), feature_names)
+        new = pipeline.rank(new, drop_constant=False)
+        print(f"  新对局: {len(np.unique(new.groups))} 局 / {len(rows)} 行"
+              f"  (已训练 {len(seen_ids)} 局)")
+        print(f"  在上次 booster ({state['n_trees']} 棵树) 上追加 {args.rounds} 棵")
+        prof.stage('fit', rows=len(rows), features=len(feature_names), rounds=args.rounds)
+        model = pipeline.fit(new, {**MODEL_PARAMS, 'n_estimators': args.rounds},
+                             xgb_model=str(prev['model_path']))
+        n_trees = state['n_trees'] + args.rounds
+        n_seen = state['n_seen']
+        sample_X, sample_y = prev['sample_X'], prev['sample_y']
+        last_weights = state['category_weights']
+
+    sample_X, sample_y = reservoir_update(sample_X, sample_y, n_seen, new.X, new.y, args.sample_size)
+    n_seen += len(new.y)
+
+    prof.stage('explain', rows=len(sample_y), features=len(feature_names))
+    print(f"  在 {len(sample_y)} 行样本上计算 SHAP...")
+    stats = shap_stats(shap.TreeExplainer(model).shap_values(sample_X), sample_y)
+    weights = pipeline.category_weights(feature_names, stats.mean_abs)
+    drift, total_drift = weight_drift(last_weights, weights)
+
+    print(f"\n  {'类别':10s}  {'上次':>8s}  {'本次':>8s}  {'漂移':>8s}")
+    print(f"  {'-'*42}")
+    for cat in sorted(weights, key=lambda c: -weights[c]):
+        old = last_weights.get(cat)
+        old_s = f"{old:.4f}" if old is not None else '     -'
+        print(f"  {cat:10s}  {old_s:>8s}  {weights[cat]:8.4f}  {drift[cat]:+8.4f}")
+    print(f"\n  L1 总漂移: {total_drift:.4f}")
+
+    prof.stage('save_state')
+    seen_set = set(seen_ids)
+    seen_ids = list(seen_ids) + [m for m in ds.match_ids if m not in seen_set]
+    save_state(root, model, sample_X, sample_y, {
+        'features': feature_names,
+        'params': MODEL_PARAMS,
+        'n_trees': n_trees,
+        'n_seen': n_seen,
+        'match_ids': seen_ids,
+        'category_weights': weights,
+        'collected_at': ds.metadata.get('collectedAt'),
+    })
+
+    result = {
+        'method': 'XGBoost + SHAP (incremental)',
+        'n_trees': n_trees,
+        'sample_count': int(len(sample_y)),
+        'new_rows': int(len(new.y)),
+        'match_count': len(seen_ids),
+        'category_weights': weights,
+        'previous_weights': last_weights,
+        'drift': drift,
+        'drift_l1': total_drift,
+    }
+    out_path = Path(data_path).parent / 'wcs_shap_incremental.json'
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 增量结果已保存到 {out_path}")
+    return out_path
+
+
+def run_windows(ds, data_path, args, prof):
+    """
+    时间窗口权重漂移: 全量百分位矩阵只算一次，按窗口切行后各窗口并行训练 + SHAP，
+    与 config.js 的 WCS_WEIGHTS 以及第一个窗口比较，|z| 超过阈值的维度标记为漂移
+    返回结果 JSON 路径
+    """
+    prof.stage('rank', rows=len(ds))
+    feats = pipeline.rank(pipeline.prepare(ds))
+    params = MODEL_PARAMS
+    if args.params:
+        with open(args.params, 'r', encoding='utf-8') as f:
+            params = json.load(f)['best_params']
+
+    cats = list(pipeline.CATEGORIES)
+    try:
+        reference = category_reference(load_wcs_weights())
+    except (OSError, ValueError):
+        reference = None
+    ref = np.array([reference[c] for c in cats]) if reference else None
+
+    mode = '扩张' if args.expanding else '滚动'
+    prof.stage('windows', rows=len(feats.y), window=args.window, expanding=args.expanding)
+    print(f"\n{'='*70}")
+    print(f"🕒 时间窗口权重漂移 ({mode}窗口, 每窗口 {args.window} 局, 步长 {args.window_step or args.window} 局)")
+    print(f"{'='*70}")
+    results, wall, workers, threads = window_weights(
+        feats.X, feats.y, feats.groups, ds.match_ids, feats.names, pipeline.CATEGORIES, params,
+        args.window, args.window_step, args.expanding, args.window_bootstrap,
+        workers=args.cv_workers, threads=args.cv_threads)
+    prof.note(windows=len(results), workers=workers, threads=threads)
+    print(f"  {len(results)} 个窗口, 并行 {workers} 进程 × {threads} 线程, 墙钟 {wall:.2f}s")
+
+    vs_ref, first_last = drift_z(results, ref)
+    flag = args.drift_z
+
+    print(f"\n  {'窗口 (matchId)':24s} {'局':>3s}  " + '  '.join(f"{c:>6s}" for c in cats))
+    if ref is not None:
+        print(f"  {'config.js':24s} {'':3s}  " + '  '.join(f"{v:6.3f}" for v in ref))
+    for k, r in enumerate(results):
+        cells = []
+        for c in range(len(cats)):
+            mark = '*' if vs_ref is not None and abs(vs_ref[k, c]) > flag else ' '
+            cells.append(f"{r.weights[c]:5.3f}{mark}")
+        print(f"  {r.first + '~' + r.last:24s} {r.matches:3d}  " + '  '.join(cells))
+    print(f"  (* = 相对 config.js |z| > {flag:g}，标准误来自窗口内按对局重抽样重训 {args.window_bootstrap} 次)")
+
+    drifted = []
+    for c, cat in enumerate(cats):
+        last_z = float(vs_ref[-1, c]) if vs_ref is not None else None
+        if (last_z is not None and abs(last_z) > flag) or (len(results) > 1 and abs(first_last[c]) > flag):
+            drifted.append(cat)
+    if drifted:
+        print(f"\n  ⚠️ 显著漂移的维度: {', '.join(drifted)}")
+        for cat in drifted:
+            c = cats.index(cat)
+            parts = [f"最新窗口 {results[-1].weights[c]:.3f} ± {results[-1].se[c]:.3f}"]
+            if ref is not None:
+                parts.append(f"config.js {ref[c]:.3f} (z={vs_ref[-1, c]:+.1f})")
+            if len(results) > 1:
+                parts.append(f"首窗口 {results[0].weights[c]:.3f} (z={first_last[c]:+.1f})")
+            print(f"     {cat}: " + ', '.join(parts))
+    else:
+        print(f"\n  ✅ 没有维度超过 |z| > {flag:g}")
+
+    prof.stage('report')
+    result = {
+        'method': 'XGBoost + SHAP (time windows)',
+        'mode': 'expanding' if args.expanding else 'rolling',
+        'window_matches': args.window,
+        'step_matches': args.window_step or args.window,
+        'bootstrap': args.window_bootstrap,
+        'drift_z': flag,
+        'reference_weights': reference,
+        'windows': [{
+            'first_match': r.first,
+            'last_match': r.last,
+            'matches': r.matches,
+            'rows': r.rows,
+            'category_weights': {cat: float(r.weights[c]) for c, cat in enumerate(cats)},
+            'category_se': {cat: float(r.se[c]) for c, cat in enumerate(cats)},
+            **({'z_vs_reference': {cat: float(vs_ref[k, c]) for c, cat in enumerate(cats)}}
+               if vs_ref is not None else {}),
+            'global_shap_importance': {f: float(v) for f, v in zip(feats.names, r.mean_abs)},
+        } for k, r in enumerate(results)],
+        'z_last_vs_first': {cat: float(first_last[c]) for c, cat in enumerate(cats)},
+        'drifted': drifted,
+    }
+    out_path = Path(data_path).parent / 'wcs_weight_drift.json'
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ 漂移结果已保存到 {out_path}")
+    return out_path
+
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,203 @@
+"""
+采集器的本地模拟服务器 (仅用标准库 http.server)
+按 batrace / barmory 的 URL 格式返回确定性的合成对局数据，用于在不访问线上 API 的情况下
+检验 collect_data.py 的并发、限速、重试、chunked / gzip 响应与磁盘缓存。
+
+    /api/v1/stb/matchlistid_by_stbId?stbId=<pid>     对局列表 (batrace)
+    /api/v1/stb/match_by_matchid?match_id=<id>       对局详情 (batrace)
+    /stb/commander/<pid>/matches                     对局列表 (barmory)
+    /stb/match/<id>                                  对局详情 (barmory)
+
+使用: python scripts/standin_server.py --latency 0.08 --error-rate 0.1 --missing-rate 0.05
+      python scripts/collect_data.py --batrace-base http://127.0.0.1:8765/api/v1 \\
+          --barmory-base http://127.0.0.1:8765 --out /tmp/standin/wcs_raw_data.json
+      --error-rate     随机返回 503 (带 Retry-After: 0) 的比例，检验重试
+      --missing-rate   对局详情在两个数据源都返回 404 的比例，检验永久错误不重试
+      --chunked / --gzip  响应改用 Transfer-Encoding: chunked / Content-Encoding: gzip
+Ctrl+C 退出时打印各状态码的请求数。
+"""
+import argparse
+import gzip
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from ba_analysis.collector import MATCHES_PER_PLAYER, PLAYER_IDS
+
+_MATCH_BASE = 5_000_000
+# 每名采集玩家的对局从共享池中抽取，不同玩家之间有重叠 (同一局只应下载一次)
+_POOL_FACTOR = 3
+_UNIT_IDS = list(range(100, 160))
+
+
+def synthetic_match(match_id, seed=0):
+    """确定性的合成对局详情 (10 人，胜方 ELO 上升、败方下降)"""
+    rng = random.Random(seed * 1_000_003 + match_id)
+    winner = rng.randint(0, 1)
+    data = {}
+    for k in range(10):
+        pid = 300_000 + rng.randrange(5000)
+        team = k % 2
+        old = rng.uniform(1000, 2000)
+        delta = rng.uniform(5, 25) * (1 if team == winner else -1)
+        units = {}
+        for u in range(rng.randint(3, 12)):
+            units[str(u)] = {
+                'Id': rng.choice(_UNIT_IDS),
+                'OptionIds': list(range(rng.randint(0, 4))),
+                'TotalDamageDealt': rng.uniform(0, 5000),
+                'TotalDamageReceived': rng.uniform(0, 5000),
+                'KilledCount': rng.randint(0, 8),
+                'TotalSupplyPointsConsumed': rng.uniform(0, 500),
+                'WasRefunded': int(rng.random() < 0.1),
+                'BuildingDestroyedCount': rng.randint(0, 2),
+                'TotalSelfDamageDealt': rng.uniform(0, 50),
+                'TotalDamageFriendlyFireDealt': rng.uniform(0, 50),
+                'TotalDamageReceivedByFriendlyFire': rng.uniform(0, 50),
+                'SelfDestruction': int(rng.random() < 0.05),
+                'Destruction': rng.randint(0, 3),
+            }
+        data[str(pid)] = {
+            'Id': pid,
+            'Name': f'P{pid}',
+            'TeamId': team,
+            'OldRating': old,
+            'NewRating': old + delta,
+            'DestructionScore': rng.uniform(0, 20000),
+            'LossesScore': rng.uniform(0, 20000),
+            'DamageDealt': rng.uniform(0, 60000),
+            'DamageReceived': rng.uniform(0, 60000),
+            'ObjectivesCaptured': rng.randint(0, 6),
+            'SupplyCaptured': rng.uniform(0, 3000),
+            'TotalSpawnedUnitScore': rng.uniform(5000, 40000),
+            'TotalRefundedUnitScore': rng.uniform(0, 3000),
+            'SupplyPointsConsumed': rng.uniform(0, 8000),
+            'SupplyPointsConsumedFromAllies': rng.uniform(0, 1000),
+            'SupplyPointsConsumedByAllies': rng.uniform(0, 1000),
+            'TotalSelfDamageDealt': rng.uniform(0, 200),
+            'DLRatio': 0,
+            'UnitData': units,
+        }
+    return {'Id': match_id, 'WinnerTeam': winner, 'Data': data}
+
+
+class StandIn:
+    def __init__(self, players, per_player, latency, error_rate, missing_rate, chunked, use_gzip, seed):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.chunked = chunked
+        self.gzip = use_gzip
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        pool = [_MATCH_BASE + k for k in range(max(per_player, 1) * _POOL_FACTOR)]
+        self.lists = {pid: sorted(random.Random(f'{seed}:{pid}').sample(pool, min(per_player, len(pool))),
+                                  reverse=True) for pid in players}
+        self.missing = {m for m in pool if random.Random(f'{seed}:missing:{m}').random() < missing_rate}
+
+    def route(self, path, query):
+        """返回 (status, 对象)；未知路径 404"""
+        m = re.fullmatch(r'/api/v1/stb/matchlistid_by_stbId', path)
+        pid = query.get('stbId', [None])[0] if m else None
+        m2 = re.fullmatch(r'/stb/commander/(\d+)/matches', path)
+        if m2:
+            pid = m2.group(1)
+        if pid is not None:
+            return (200, self.lists[pid]) if pid in self.lists else (404, {'error': 'unknown player'})
+
+        match_id = None
+        if path == '/api/v1/stb/match_by_matchid':
+            match_id = query.get('match_id', [None])[0]
+        m3 = re.fullmatch(r'/stb/match/(\d+)', path)
+        if m3:
+            match_id = m3.group(1)
+        if match_id is not None and match_id.isdigit():
+            match_id = int(match_id)
+            if match_id in self.missing or match_id < _MATCH_BASE:
+                return 404, {'error': 'match not found'}
+            return 200, synthetic_match(match_id, self.seed)
+        return 404, {'error': 'not found'}
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if state.latency:
+                time.sleep(state.latency)
+            with state.lock:
+                fail = state.rng.random() < state.error_rate
+            parts = urlsplit(self.path)
+            if fail:
+                status, obj = 503, {'error': 'injected'}
+            else:
+                status, obj = state.route(parts.path, parse_qs(parts.query))
+            with state.lock:
+                state.counts[status] += 1
+
+            body = json.dumps(obj).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            if status == 503:
+                self.send_header('Retry-After', '0')
+            if state.gzip and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                body = gzip.compress(body)
+                self.send_header('Content-Encoding', 'gzip')
+            if state.chunked:
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                step = max(1, len(body) // 3)
+                for i in range(0, len(body), step):
+                    piece = body[i:i + step]
+                    self.wfile.write(f'{len(piece):x}\r\n'.encode('ascii') + piece + b'\r\n')
+                self.wfile.write(b'0\r\n\r\n')
+            else:
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采集器的本地模拟服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--players', default=','.join(PLAYER_IDS), help='有对局列表的玩家 ID (默认同采集名单)')
+    parser.add_argument('--per-player', type=int, default=MATCHES_PER_PLAYER, help='每个玩家的对局数')
+    parser.add_argument('--latency', type=float, default=0.08, help='每个请求的延迟 (秒，默认 0.08)')
+    parser.add_argument('--error-rate', type=float, default=0.1, help='随机 503 的比例 (默认 0.1)')
+    parser.add_argument('--missing-rate', type=float, default=0.0, help='对局详情 404 的比例 (默认 0)')
+    parser.add_argument('--chunked', action='store_true', help='以 chunked 编码发送响应')
+    parser.add_argument('--gzip', action='store_true', help='客户端接受时 gzip 压缩响应')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    players = [p.strip() for p in args.players.split(',') if p.strip()]
+    state = StandIn(players, args.per_player, args.latency, args.error_rate, args.missing_rate,
+                    args.chunked, args.gzip, args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"🧪 模拟服务器 http://{args.host}:{args.port}  |  {len(players)} 个玩家  |  "
+          f"对局 404 {len(state.missing)} 场  |  503 比例 {args.error_rate:g}  |  延迟 {args.latency:g}s")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\n  请求: " + '  '.join(f"{k}={v}" for k, v in sorted(state.counts.items())))
+
+
+if __name__ == '__main__':
+    main()
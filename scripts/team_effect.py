@@ -8,22 +8,88 @@ Team Effect 分析
 3. 对于每对组合 (A, B)，计算同队时的实际胜率
 4. Team Effect(A→B) = B在A队时的胜率 - B单独胜率
 5. 正值 = A 让 B 赢更多（增幅），负值 = A 让 B 赢更少（拖累）
+6. 对手效应: 面对 A 时对手的胜率 - 对手在其他对局的胜率，全体玩家按平均值排序 (负值 = A 压制对手)
 
 使用: pixi run python scripts/team_effect.py
+      --profile 记录各阶段耗时/内存到 team_effect.profile.json (--cprofile STAGE 导出该阶段 cProfile)
+      --bootstrap 2000 对局级 bootstrap 重抽样次数 (配对效应/队友影响/组合协同的 95% 区间与 p 值)，0 = 关闭
+                       任一方 <8 局或全胜/全负时不显示区间，JSON 中 ci_reliable=false
 """
+import argparse
 import json
 import sys
 import unicodedata
 from pathlib import Path
-from collections import defaultdict
 from itertools import combinations
 
+import numpy as np
+
+from ba_analysis import load_cached_dataset
+from ba_analysis.bootstrap import DEFAULT_REPLICATES, team_effect_intervals
+from ba_analysis.lineups import lineup_stats
+from ba_analysis.pairs import (build_pair_matrix, maggot_index, opponent_effects, opponent_pressure,
+                               pair_effects, teammate_impact)
+from ba_analysis.profiling import add_profile_args, profile_path, profiler_from_args
+
 def cjk_ljust(s, width):
     """CJK-aware ljust: 中文字符占 2 列宽度"""
     display_width = sum(2 if unicodedata.east_asian_width(c) in ('F', 'W') else 1 for c in s)
     return s + ' ' * max(0, width - display_width)
 
+# 全体玩家蛆指数的入榜门槛
+POP_MIN_GAMES = 10
+POP_MIN_PAIRS = 3
+# 对手效应: 对阵至少多少局的组合才计入 (对手大多只碰到一次，单个组合很嘈杂，靠按玩家平均压低噪声)
+MIN_OPPOSED = 1
+# 对手效应的入榜门槛 (只出场一局的玩家，压制值就是那一局的胜负)
+OPP_MIN_GAMES = 3
+# bootstrap 区间 / p 值可信的最少局数 (配对、队友影响、组合共用)
+MIN_CI_GAMES = 8
+
+def ci_reliable(*arms):
+    """
+    arms: 比较双方各自的 (局数, 胜率)
+    每方都 ≥ MIN_CI_GAMES 局且不是全胜 / 全负时区间才可信
+    (某方胜率恒定时该方重抽样没有方差，区间会塌缩，小样本也能得到极小的 p)
+    """
+    return all(n >= MIN_CI_GAMES and 0 < wr < 1 for n, wr in arms)
+
+
+def fmt_ci(ci, k, reliable=True):
+    """第 k 个统计量的 [下限, 上限] 与 p 值 (百分比)；不可信时只给标记"""
+    if not reliable:
+        return f"(样本不足，<{MIN_CI_GAMES}局或某方全胜/全负)"
+    return f"[{ci.low[k]*100:+6.1f}, {ci.high[k]*100:+6.1f}]  p={ci.p_value[k]:.3f}"
+
+
+def ci_fields(ci, k, reliable=True):
+    return {
+        'ci_low': round(float(ci.low[k]) * 100, 1),
+        'ci_high': round(float(ci.high[k]) * 100, 1),
+        'p_value': round(float(ci.p_value[k]), 4),
+        'ci_reliable': reliable,
+    }
+
+
 def main():
+    parser = argparse.ArgumentParser(description='Team Effect 分析')
+    parser.add_argument('--bootstrap', type=int, default=DEFAULT_REPLICATES,
+                        help=f'对局级 bootstrap 重抽样次数 (默认 {DEFAULT_REPLICATES})，0 = 只输出点估计')
+    parser.add_argument('--alpha', type=float, default=0.05, help='置信区间显著性水平 (默认 0.05 → 95%% 区间)')
+    parser.add_argument('--seed', type=int, default=0, help='bootstrap 随机种子')
+    add_profile_args(parser)
+    args = parser.parse_args()
+
+    prof = profiler_from_args(args)
+    out_path = analyze(args, prof)
+    prof.report()
+    saved = prof.save(profile_path(out_path), script='team_effect', args=vars(args))
+    if saved:
+        print(f"  ⏱️ 阶段 profile 已保存到 {saved}")
+
+
+def analyze(args, prof):
+    """完整分析流程，返回结果 JSON 路径"""
     # 特别关注的玩家列表（从 collect-data.js 中提取）
     TRACKED_PLAYERS = {
         '17366': '在彼扬水',
@@ -40,110 +106,95 @@ def main():
             data_path = p
             break
 
-    with open(data_path, 'r', encoding='utf-8') as f:
-        raw = json.load(f)
-
-    dataset = raw['dataset']
-
-    # ===== 修正 isWin bug =====
-    # collect-data.js 中 match.WinnerTeam 和 TeamId 编号规则不一致
-    # 导致部分比赛胜负反转，改用 ratingDelta 正负判断（正=赢，负=输）
-    fixed_count = 0
-    for d in dataset:
-        correct_win = 1 if d.get('ratingDelta', 0) > 0 else 0
-        if d['isWin'] != correct_win:
-            fixed_count += 1
-            d['isWin'] = correct_win
-
-    # ===== 构建对局结构 =====
-    # matchId -> [{playerId, teamId, isWin}]
-    matches = defaultdict(list)
-    for d in dataset:
-        matches[d['matchId']].append({
-            'playerId': str(d['playerId']),
-            'teamId': d['teamId'],
-            'isWin': d['isWin'],
-        })
+    # 从列式缓存加载，isWin 已按 ratingDelta 正负修正（正=赢，负=输）
+    # collect-data.js 中 match.WinnerTeam 和 TeamId 编号规则不一致，导致部分比赛胜负反转
+    prof.stage('load')
+    ds = load_cached_dataset(data_path)
+    prof.note(rows=len(ds), matches=len(ds.match_ids))
+    fixed_count = ds.fixed
+
+    # ===== 全体玩家配对矩阵 =====
+    # 一次遍历所有对局阵容，得到 player × player 稀疏矩阵 (同队局数/同队胜场/对阵局数)
+    prof.stage('pair_matrix', rows=len(ds))
+    pm = build_pair_matrix(ds)
+    prof.note(players=pm.n_players, pairs=len(pm.indices))
+    win_rates = pm.win_rates()
 
     print(f"\n{'='*70}")
     print(f"🤝 Team Effect 分析")
     print(f"{'='*70}")
-    print(f"  对局数: {len(matches)}  |  数据行: {len(dataset)}")
+    print(f"  对局数: {len(ds.match_ids)}  |  数据行: {len(ds)}  |  玩家: {pm.n_players}")
     print(f"  ⚠️ 修正了 {fixed_count} 条 isWin 错误 (基于 ratingDelta)")
 
-    # ===== 对每个被追踪玩家收集数据 =====
-    # player_matches[pid] = [(matchId, teamId, isWin)]
-    player_matches = defaultdict(list)
-    for mid, players in matches.items():
-        for p in players:
-            if p['playerId'] in TRACKED_PLAYERS:
-                player_matches[p['playerId']].append((mid, p['teamId'], p['isWin']))
+    level = f"{1 - args.alpha:.0%}"
+
+    def intervals(**stats):
+        # 对局级 bootstrap: 同一对局整体进出重抽样，--bootstrap 0 时跳过
+        if args.bootstrap <= 0:
+            return None
+        res = team_effect_intervals(ds, pm, n_replicates=args.bootstrap, alpha=args.alpha,
+                                    seed=args.seed, **stats)
+        return next(iter(res.values()))
+
+    # ===== 被追踪玩家在矩阵中的行号 =====
+    tracked_ids = list(TRACKED_PLAYERS.keys())
+    tracked_code = dict(zip(tracked_ids, (int(c) for c in pm.codes([int(p) for p in tracked_ids]))))
+    code_to_tracked = {c: pid for pid, c in tracked_code.items() if c >= 0}
+    tracked_rows = list(code_to_tracked)
+
+    def games_of(pid):
+        c = tracked_code[pid]
+        return (int(pm.games[c]), int(pm.wins[c])) if c >= 0 else (0, 0)
+
+    def base_wr(pid):
+        c = tracked_code[pid]
+        return float(win_rates[c]) if c >= 0 else 0.5
 
     print(f"\n  追踪玩家:")
     for pid, name in TRACKED_PLAYERS.items():
-        ms = player_matches[pid]
-        wins = sum(1 for _, _, w in ms if w)
-        wr = wins / len(ms) * 100 if ms else 0
-        print(f"    {cjk_ljust(name, 16)}: {len(ms):3d} 局, 胜率 {wr:.1f}%")
+        n, wins = games_of(pid)
+        wr = wins / n * 100 if n else 0
+        print(f"    {cjk_ljust(name, 16)}: {n:3d} 局, 胜率 {wr:.1f}%")
 
     # ===== 计算配对效应 =====
+    prof.stage('pair_effects', players=len(tracked_rows))
     print(f"\n{'='*70}")
     print(f"📊 配对分析：同队时的胜率变化")
     print(f"{'='*70}")
 
-    # 对于每对 (A, B)，找出他们同队的对局
+    # 矩阵非零元上向量化计算: 效应 = 同队胜率 - (A 胜率 + B 胜率) / 2，同队 ≥ 2 局
+    eff = pair_effects(pm, min_together=2, subset=tracked_rows)
+    pair_ci = intervals(pairs=eff)
+    tracked_pos = {pid: k for k, pid in enumerate(tracked_ids)}
     pair_results = {}
-    tracked_ids = list(TRACKED_PLAYERS.keys())
-
-    for id_a, id_b in combinations(tracked_ids, 2):
-        name_a = TRACKED_PLAYERS[id_a]
-        name_b = TRACKED_PLAYERS[id_b]
-
-        # A 的基准胜率
-        a_matches = player_matches[id_a]
-        a_wins = sum(1 for _, _, w in a_matches if w)
-        a_wr = a_wins / len(a_matches) if a_matches else 0.5
-
-        # B 的基准胜率
-        b_matches = player_matches[id_b]
-        b_wins = sum(1 for _, _, w in b_matches if w)
-        b_wr = b_wins / len(b_matches) if b_matches else 0.5
-
-        # 找同队对局
-        a_match_dict = {mid: (tid, w) for mid, tid, w in a_matches}
-        together_wins = 0
-        together_total = 0
-        for mid, tid_b, win_b in b_matches:
-            if mid in a_match_dict:
-                tid_a, win_a = a_match_dict[mid]
-                if tid_a == tid_b:  # 同队
-                    together_total += 1
-                    if win_a:  # 同队时的胜负
-                        together_wins += 1
-
-        if together_total < 2:
-            continue
-
-        together_wr = together_wins / together_total
-        expected_wr = (a_wr + b_wr) / 2  # 简单期望
-        effect = together_wr - expected_wr
-
+    for k in range(len(eff['i'])):
+        id_a, id_b = code_to_tracked[int(eff['i'][k])], code_to_tracked[int(eff['j'][k])]
+        a_wr, b_wr = float(eff['a_wr'][k]), float(eff['b_wr'][k])
+        if tracked_pos[id_a] > tracked_pos[id_b]:
+            id_a, id_b, a_wr, b_wr = id_b, id_a, b_wr, a_wr
         pair_results[(id_a, id_b)] = {
-            'name_a': name_a,
-            'name_b': name_b,
-            'together': together_total,
-            'wins': together_wins,
-            'wr': together_wr,
+            'name_a': TRACKED_PLAYERS[id_a],
+            'name_b': TRACKED_PLAYERS[id_b],
+            'together': int(eff['together'][k]),
+            'wins': int(eff['wins'][k]),
+            'wr': float(eff['wr'][k]),
             'a_wr': a_wr,
             'b_wr': b_wr,
-            'expected': expected_wr,
-            'effect': effect,
+            'expected': float(eff['expected'][k]),
+            'effect': float(eff['effect'][k]),
+            'ci': k,
+            # 同队局 vs 两人各自的全部对局
+            'ci_ok': ci_reliable((int(eff['together'][k]), float(eff['wr'][k])),
+                                 (games_of(id_a)[0], a_wr), (games_of(id_b)[0], b_wr)),
         }
+    # 保持追踪名单的组合顺序
+    pair_results = {key: pair_results[key] for key in combinations(tracked_ids, 2) if key in pair_results}
 
     # 排序: 正面效应 → 负面效应
     sorted_pairs = sorted(pair_results.values(), key=lambda x: -x['effect'])
 
-    print(f"\n  配对                       同队局  实际胜率  期望胜率    效应")
+    ci_header = f"  {level} 区间 (对局 bootstrap)" if pair_ci else ''
+    print(f"\n  配对                       同队局  实际胜率  期望胜率    效应{ci_header}")
     print(f"  {'-'*62}")
     for r in sorted_pairs:
         effect_icon = '🟢' if r['effect'] > 0.05 else ('🔴' if r['effect'] < -0.05 else '⚪')
@@ -152,92 +203,88 @@ def main():
               f"{r['together']:3d}局  "
               f"{r['wr']*100:5.1f}%  "
               f"{r['expected']*100:5.1f}%  "
-              f"{r['effect']*100:+5.1f}%")
+              f"{r['effect']*100:+5.1f}%"
+              + (f"  {fmt_ci(pair_ci, r['ci'], r['ci_ok'])}" if pair_ci else ''))
 
     # ===== 个人对团队的影响（正确视角：X 加入后队友赢更多还是更少）=====
+    prof.stage('teammate_impact', players=len(tracked_rows))
     print(f"\n{'='*70}")
     print(f"👤 个人对团队的影响 (X 加入后，队友的胜率变化)")
     print(f"{'='*70}")
     print(f"  含义：当 X 在队友的队伍里时 vs 不在时，队友赢得更多还是更少？")
-    print(f"  ✅=双方≥8局  ⚠️=某方<5局\n")
+    if args.bootstrap > 0:
+        print(f"  ✅=双方≥{MIN_CI_GAMES}局、非全胜/全负且 {level} 区间不含 0 (p<{args.alpha:g})  ⚠️=某方<5局\n")
+    else:
+        print(f"  ✅=双方≥{MIN_CI_GAMES}局且非全胜/全负  ⚠️=某方<5局\n")
+
+    # 有向非零元 (X, 队友): 有我 = 同队局数，没我 = 队友总局数 - 同队局数
+    imp = teammate_impact(pm, min_with=2, min_without=2, subset=tracked_rows)
+    imp_ci = intervals(impacts=imp)
+    impact_results = []
+    impact_of = {
+        (code_to_tracked[int(x)], code_to_tracked[int(o)]): k
+        for k, (x, o) in enumerate(zip(imp['x'], imp['o']))
+    }
 
     for pid in tracked_ids:
         name = TRACKED_PLAYERS[pid]
         impacts = []
 
         for other_id in tracked_ids:
-            if other_id == pid:
+            k = impact_of.get((pid, other_id))
+            if k is None:
                 continue
-            other_name = TRACKED_PLAYERS[other_id]
-            other_ms = player_matches[other_id]  # 队友的所有对局
-            my_ms = player_matches[pid]
-
-            # 以队友的视角：队友的对局中，我有没有在他队里
-            my_match_team = {mid: tid for mid, tid, w in my_ms}
-            with_wins, with_total = 0, 0
-            without_wins, without_total = 0, 0
-
-            for mid, tid, w in other_ms:
-                if mid in my_match_team and my_match_team[mid] == tid:
-                    # 我和队友同队
-                    with_total += 1
-                    if w: with_wins += 1
-                else:
-                    # 我不在队友这边
-                    without_total += 1
-                    if w: without_wins += 1
-
-            if with_total >= 2 and without_total >= 2:
-                with_wr = with_wins / with_total
-                without_wr = without_wins / without_total
-                delta = with_wr - without_wr
-                # 置信度
-                if with_total >= 8 and without_total >= 8:
-                    conf = '✅'
-                elif with_total < 5 or without_total < 5:
-                    conf = '⚠️'
-                else:
-                    conf = '  '
-                impacts.append((other_name, with_total, with_wr, without_total, without_wr, delta, conf))
+            with_total, without_total = int(imp['with'][k]), int(imp['without'][k])
+            with_wr, without_wr = float(imp['with_wr'][k]), float(imp['without_wr'][k])
+            # 置信度: 双方都要 ≥ MIN_CI_GAMES 局且不恒定；有 bootstrap 时还要区间不跨 0
+            reliable = ci_reliable((with_total, with_wr), (without_total, without_wr))
+            if with_total < 5 or without_total < 5:
+                conf = '⚠️'
+            elif not reliable:
+                conf = '  '
+            elif imp_ci is not None:
+                conf = '✅' if imp_ci.p_value[k] < args.alpha else '  '
+            else:
+                conf = '✅'
+            impacts.append((TRACKED_PLAYERS[other_id], with_total, with_wr,
+                            without_total, without_wr, float(imp['delta'][k]), conf, k, reliable))
 
         if impacts:
             impacts.sort(key=lambda x: -x[5])
-            avg_impact = sum(d for _, _, _, _, _, d, _ in impacts) / len(impacts)
+            avg_impact = sum(d for _, _, _, _, _, d, _, _, _ in impacts) / len(impacts)
             impact_icon = '⬆️' if avg_impact > 0.03 else ('⬇️' if avg_impact < -0.03 else '➡️')
             print(f"\n  📌 {name} 对队友的影响 (平均 {avg_impact*100:+.1f}% {impact_icon})")
-            for other_name, n_with, wr_with, n_without, wr_without, delta, conf in impacts:
+            for other_name, n_with, wr_with, n_without, wr_without, delta, conf, k, reliable in impacts:
                 icon = '⬆️' if delta > 0.05 else ('⬇️' if delta < -0.05 else '➡️')
                 print(f"  {conf} {icon} {cjk_ljust(other_name, 14)} "
                       f"有我: {wr_with*100:5.1f}% ({n_with}局) | "
                       f"没我: {wr_without*100:5.1f}% ({n_without}局) | "
-                      f"影响: {delta*100:+5.1f}%")
+                      f"影响: {delta*100:+5.1f}%"
+                      + (f"  {fmt_ci(imp_ci, k, reliable)}" if imp_ci else ''))
+                impact_results.append({
+                    'player': name,
+                    'teammate': other_name,
+                    'with_matches': n_with,
+                    'with_wr': round(wr_with * 100, 1),
+                    'without_matches': n_without,
+                    'without_wr': round(wr_without * 100, 1),
+                    'impact': round(delta * 100, 1),
+                    **(ci_fields(imp_ci, k, reliable) if imp_ci else {}),
+                })
 
     # ===== "蛆指数" — 团队拖累排名 =====
+    prof.stage('maggot_index', players=len(tracked_rows))
     print(f"\n{'='*70}")
     print(f"🐛 蛆指数 — 谁拖累团队最多？")
     print(f"{'='*70}")
 
+    # 每人平均配对效应 = 配对效应按双方行号聚合
+    maggot_avg, _ = maggot_index(pm, eff)
     maggot_scores = []
     for pid in tracked_ids:
-        name = TRACKED_PLAYERS[pid]
-        # 收集所有队友跟此人同队时的效应
-        total_effect = 0
-        count = 0
-        for other_id in tracked_ids:
-            if other_id == pid:
-                continue
-            # 用其他人的视角看此人的效应
-            key1 = (pid, other_id)
-            key2 = (other_id, pid)
-            r = pair_results.get(key1) or pair_results.get(key2)
-            if r:
-                total_effect += r['effect']
-                count += 1
-
-        avg_effect = total_effect / count if count > 0 else 0
-        base_ms = player_matches[pid]
-        base_wr = sum(1 for _, _, w in base_ms if w) / len(base_ms) if base_ms else 0.5
-        maggot_scores.append((name, avg_effect, base_wr, len(base_ms)))
+        c = tracked_code[pid]
+        avg_effect = float(maggot_avg[c]) if c >= 0 else 0
+        maggot_scores.append((TRACKED_PLAYERS[pid], avg_effect, base_wr(pid), games_of(pid)[0]))
 
     maggot_scores.sort(key=lambda x: x[1])  # 最拖累的在前
 
@@ -255,70 +302,121 @@ def main():
             comment = '🐛 蛆'
         print(f"  {rank:3d}. {cjk_ljust(name, 16)}  {effect*100:+6.1f}%    {wr*100:5.1f}%   {n:3d}局  {comment}")
 
+    # ===== 全体玩家蛆指数 (不限追踪名单) =====
+    prof.stage('population_maggot', players=pm.n_players)
+    all_eff = pair_effects(pm, min_together=2)
+    pop_avg, pop_cnt = maggot_index(pm, all_eff)
+    eligible = np.nonzero((pm.games >= POP_MIN_GAMES) & (pop_cnt >= POP_MIN_PAIRS))[0]
+    eligible = eligible[np.argsort(pop_avg[eligible], kind='stable')]
+    population_ranking = [{
+        'player_id': str(pm.player_ids[c]),
+        'name': TRACKED_PLAYERS.get(str(pm.player_ids[c]), ''),
+        'avg_team_effect': round(float(pop_avg[c]) * 100, 1),
+        'personal_wr': round(float(win_rates[c]) * 100, 1),
+        'pairs': int(pop_cnt[c]),
+        'matches': int(pm.games[c]),
+    } for c in eligible]
+
+    print(f"\n  🌍 全体玩家 (≥{POP_MIN_GAMES}局, ≥{POP_MIN_PAIRS}个配对): {len(population_ranking)} 人")
+    shown = population_ranking if len(population_ranking) <= 10 else population_ranking[:5] + population_ranking[-5:]
+    for r in shown:
+        label = r['name'] or r['player_id']
+        print(f"     {cjk_ljust(label, 16)}  {r['avg_team_effect']:+6.1f}%    {r['personal_wr']:5.1f}%   "
+              f"{r['matches']:3d}局  {r['pairs']:3d}对")
+
+    # ===== 全体玩家对手效应 =====
+    # 对阵效应(x, o) = 面对 o 时 x 的胜率 - 不面对 o 时 x 的胜率；按 o 聚合得到 o 对对手的压制
+    prof.stage('opponent_effects', players=pm.n_players)
+    print(f"\n{'='*70}")
+    print(f"⚔️ 对手效应 — 谁让对手赢得更少？")
+    print(f"{'='*70}")
+    print(f"  压制 = 对手面对 TA 时的胜率 - 对手在其他对局的胜率 (各对手平均，对阵≥{MIN_OPPOSED}局、其他对局≥2局)")
+    print(f"  负值 = 对手碰上 TA 更容易输\n")
+
+    opp = opponent_effects(pm, min_opposed=MIN_OPPOSED)
+    opp_avg, opp_cnt = opponent_pressure(pm, opp)
+    eligible = np.nonzero((pm.games >= OPP_MIN_GAMES) & (opp_cnt >= POP_MIN_PAIRS))[0]
+    eligible = eligible[np.argsort(opp_avg[eligible], kind='stable')]
+    opponent_ranking = [{
+        'player_id': str(pm.player_ids[c]),
+        'name': TRACKED_PLAYERS.get(str(pm.player_ids[c]), ''),
+        'opponent_effect': round(float(opp_avg[c]) * 100, 1),
+        'personal_wr': round(float(win_rates[c]) * 100, 1),
+        'opponents': int(opp_cnt[c]),
+        'matches': int(pm.games[c]),
+    } for c in eligible]
+
+    print(f"  🌍 全体玩家 (≥{OPP_MIN_GAMES}局, ≥{POP_MIN_PAIRS}个对手): {len(opponent_ranking)} 人")
+    print(f"     {cjk_ljust('玩家', 16)}      压制   个人胜率   局数  对手")
+    shown = opponent_ranking if len(opponent_ranking) <= 10 else opponent_ranking[:5] + opponent_ranking[-5:]
+    for r in shown:
+        label = r['name'] or r['player_id']
+        print(f"     {cjk_ljust(label, 16)}  {r['opponent_effect']:+6.1f}%    {r['personal_wr']:5.1f}%   "
+              f"{r['matches']:3d}局  {r['opponents']:3d}人")
+
+    # 追踪玩家之间的对阵 (有向: x 面对 o)
+    opp_of = {
+        (code_to_tracked[int(x)], code_to_tracked[int(o)]): k
+        for k, (x, o) in enumerate(zip(opp['x'], opp['o']))
+        if int(x) in code_to_tracked and int(o) in code_to_tracked
+    }
+    tracked_opponents = []
+    for pid in tracked_ids:
+        for other_id in tracked_ids:
+            k = opp_of.get((pid, other_id))
+            if k is None:
+                continue
+            tracked_opponents.append({
+                'player': TRACKED_PLAYERS[pid],
+                'opponent': TRACKED_PLAYERS[other_id],
+                'opposed_matches': int(opp['opposed'][k]),
+                'vs_wr': round(float(opp['vs_wr'][k]) * 100, 1),
+                'without_wr': round(float(opp['without_wr'][k]) * 100, 1),
+                'effect': round(float(opp['effect'][k]) * 100, 1),
+            })
+    if tracked_opponents:
+        print(f"\n  追踪玩家互相对阵:")
+        for r in tracked_opponents:
+            pair_str = f"{r['player']} vs {r['opponent']}"
+            print(f"     {cjk_ljust(pair_str, 30)} {r['opposed_matches']:3d}局  "
+                  f"胜率 {r['vs_wr']:5.1f}%  效应 {r['effect']:+5.1f}%")
+
     # ===== 多人组合协同分析 =====
+    prof.stage('combo_synergy', players=len(tracked_ids))
     print(f"\n{'='*70}")
     print(f"🧩 多人组合协同分析 (3~6人)")
     print(f"{'='*70}")
     print(f"  协同效应 = 实际胜率 - 成员平均个人胜率")
     print(f"  正值 = 化学反应好, 负值 = 互相拖累\n")
 
-    # 预计算每个人的个人胜率
-    individual_wr = {}
-    for pid in tracked_ids:
-        ms = player_matches[pid]
-        if ms:
-            individual_wr[pid] = sum(1 for _, _, w in ms if w) / len(ms)
-        else:
-            individual_wr[pid] = 0.5
-
-    # 构建 match -> {pid: (teamId, isWin)} 快速查找
-    match_player_map = defaultdict(dict)
-    for pid in tracked_ids:
-        for mid, tid, w in player_matches[pid]:
-            match_player_map[mid][pid] = (tid, w)
+    # 每个人的个人胜率
+    individual_wr = {pid: base_wr(pid) for pid in tracked_ids}
 
+    # 位掩码阵容引擎: 每侧阵容编码为掩码，Apriori 逐层统计同队≥3局的组合
+    lineups = lineup_stats(ds, tracked_ids, min_size=3, min_matches=3)
+    combo_ci = intervals(lineups=[tuple(tracked_code[pid] for pid in combo) for combo, _, _ in lineups]) \
+        if lineups else None
     combo_results = []
-
-    for size in range(3, len(tracked_ids) + 1):
-        for combo in combinations(tracked_ids, size):
-            # 找出这个组合全部同队的对局
-            combo_set = set(combo)
-            together_wins = 0
-            together_total = 0
-
-            for mid, players_in_match in match_player_map.items():
-                # 检查组合中所有人是否都在这场比赛
-                if not combo_set.issubset(players_in_match.keys()):
-                    continue
-                # 检查是否同队
-                teams = {players_in_match[pid][0] for pid in combo}
-                if len(teams) != 1:
-                    continue  # 不同队
-                # 同队！
-                together_total += 1
-                # 用第一个人的胜负代表全队（同队同输赢）
-                first_pid = combo[0]
-                if players_in_match[first_pid][1]:
-                    together_wins += 1
-
-            if together_total < 3:
-                continue
-
-            actual_wr = together_wins / together_total
-            expected_wr = sum(individual_wr[pid] for pid in combo) / len(combo)
-            synergy = actual_wr - expected_wr
-            names = [TRACKED_PLAYERS[pid] for pid in combo]
-
-            combo_results.append({
-                'size': size,
-                'names': names,
-                'label': ' + '.join(n[:4] for n in names),  # 简称
-                'total': together_total,
-                'wins': together_wins,
-                'wr': actual_wr,
-                'expected': expected_wr,
-                'synergy': synergy,
-            })
+    for k, (combo, together_total, together_wins) in enumerate(lineups):
+        size = len(combo)
+        actual_wr = together_wins / together_total
+        expected_wr = sum(individual_wr[pid] for pid in combo) / len(combo)
+        synergy = actual_wr - expected_wr
+        names = [TRACKED_PLAYERS[pid] for pid in combo]
+
+        combo_results.append({
+            'size': size,
+            'names': names,
+            'label': ' + '.join(n[:4] for n in names),  # 简称
+            'total': together_total,
+            'wins': together_wins,
+            'wr': actual_wr,
+            'expected': expected_wr,
+            'synergy': synergy,
+            'ci': k,
+            'ci_ok': ci_reliable((together_total, actual_wr),
+                                 *((games_of(pid)[0], individual_wr[pid]) for pid in combo)),
+        })
 
     # 按 size 分组展示
     for size in range(3, len(tracked_ids) + 1):
@@ -335,7 +433,8 @@ def main():
                   f"{c['total']:2d}局  "
                   f"胜率:{c['wr']*100:5.1f}%  "
                   f"期望:{c['expected']*100:5.1f}%  "
-                  f"协同:{c['synergy']*100:+5.1f}%")
+                  f"协同:{c['synergy']*100:+5.1f}%"
+                  + (f"  {fmt_ci(combo_ci, c['ci'], c['ci_ok'])}" if combo_ci else ''))
         print()
 
     # ===== 最佳/最差阵容 =====
@@ -353,6 +452,7 @@ def main():
         print(f"     胜率 {highest_wr['wr']*100:.1f}% ({highest_wr['total']}局)")
 
     # ===== 输出 JSON =====
+    prof.stage('report')
     result = {
         'pairs': [{
             'pair': f"{r['name_a']} + {r['name_b']}",
@@ -360,6 +460,7 @@ def main():
             'actual_wr': round(r['wr'] * 100, 1),
             'expected_wr': round(r['expected'] * 100, 1),
             'effect': round(r['effect'] * 100, 1),
+            **(ci_fields(pair_ci, r['ci'], r['ci_ok']) if pair_ci else {}),
         } for r in sorted_pairs],
         'combos': [{
             'players': c['names'],
@@ -368,19 +469,27 @@ def main():
             'win_rate': round(c['wr'] * 100, 1),
             'expected_wr': round(c['expected'] * 100, 1),
             'synergy': round(c['synergy'] * 100, 1),
+            **(ci_fields(combo_ci, c['ci'], c['ci_ok']) if combo_ci else {}),
         } for c in combo_results],
+        'teammate_impact': impact_results,
         'maggot_ranking': [{
             'name': name,
             'avg_team_effect': round(effect * 100, 1),
             'personal_wr': round(wr * 100, 1),
             'matches': n,
         } for name, effect, wr, n in maggot_scores],
+        'population_maggot_ranking': population_ranking,
+        'opponent_effects': {
+            'population': opponent_ranking,
+            'tracked': tracked_opponents,
+        },
     }
 
     out_path = Path(data_path).parent / 'team_effect.json'
     with open(out_path, 'w', encoding='utf-8') as f:
         json.dump(result, f, indent=2, ensure_ascii=False)
     print(f"\n✅ 结果已保存到 {out_path}")
+    return out_path
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,26 @@
+/**
+ * WCS 评分比对脚本 (供 python -m ba_analysis wcs --parity 调用)
+ * 对每场对局的每名有名字的玩家单独运行 processFinalData，输出该局的六维分与 WCS
+ *
+ * 使用方法：node scripts/wcs-parity.js matches.json
+ *   matches.json: [{ id, data: 对局详情 }]
+ * 输出 (stdout)：{ matchId: { playerId: { wcs, breakdown, isWin, isDraw } } }
+ */
+import { readFileSync } from 'node:fs';
+import { processFinalData } from '../src/engine/analyzer.js';
+
+const matches = JSON.parse(readFileSync(process.argv[2], 'utf-8'));
+const out = {};
+
+for (const m of matches) {
+  out[m.id] = {};
+  Object.entries(m.data.Data).forEach(([key, p]) => {
+    if (!p.Name) return;
+    const uid = String(p.Id ?? key);
+    // processFinalData 会原地修改对局数据，每名玩家用一份副本
+    const s = processFinalData(uid, [{ id: m.id, data: structuredClone(m.data) }]).stats[0];
+    out[m.id][uid] = { wcs: s.wcs, breakdown: s.wcsBreakdown, isWin: s.isWin, isDraw: s.isDraw };
+  });
+}
+
+process.stdout.write(JSON.stringify(out));
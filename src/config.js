@@ -29,6 +29,11 @@ export const CONFIG = {
     winBonus:     0.15,   // 胜负修正
   },
 
+  // ===== 总体百分位断点表 =====
+  // python -m ba_analysis percentiles 生成的 JSON (相对页面的 URL，如 'wcs_percentiles.json')；
+  // null = 只用对局内百分位。加载失败时同样回退到对局内百分位
+  PERCENTILE_TABLE_URL: null,
+
   // ===== WCS 等级定义 =====
   WCS_LEVELS: [
     { min: 80, key: 'legendary' },
@@ -5,22 +5,12 @@
  */
 import { CONFIG } from '../config.js';
 import { assignMedals } from './medals.js';
+import { percentileFromTable, percentileSorted, sortedColumn } from './percentiles.js';
 
 // ============================================
 // 工具函数
 // ============================================
 
-/**
- * 计算百分位 (0-100)
- * 使用中位数法处理并列
- */
-function percentile(value, allValues) {
-  if (allValues.length <= 1) return 50;
-  const below = allValues.filter((v) => v < value).length;
-  const equal = allValues.filter((v) => v === value).length;
-  return ((below + equal * 0.5) / allValues.length) * 100;
-}
-
 function safeDivide(a, b, fallback = 0) {
   return b > 0 ? a / b : fallback;
 }
@@ -67,9 +57,11 @@ function extractUnitStats(unitData) {
  * 处理所有对局数据，生成双轴评价
  * @param {string} myUid
  * @param {Array<{id: string, data: Object}>} matches
+ * @param {Object|null} [reference] - 总体断点表 ({ 指标: { values, lt, le } })，
+ *   给定时有断点表的指标按总体百分位计算，其余仍用对局内百分位
  * @returns {Object}
  */
-export function processFinalData(myUid, matches) {
+export function processFinalData(myUid, matches, reference = null) {
   const medalCounts = {};
   let wins = 0;
 
@@ -208,7 +200,13 @@ export function processFinalData(myUid, matches) {
     // ========================================
     // 计算六维类别百分位
     // ========================================
-    const pct = (val, key) => percentile(val, allMetrics.map((m) => m[key]));
+    // 每个指标列只排序一次，之后二分查找；有总体断点表时直接在断点表上二分
+    const columns = {};
+    const pct = (val, key) => {
+      if (reference?.[key]) return percentileFromTable(val, reference[key]);
+      if (!columns[key]) columns[key] = sortedColumn(allMetrics.map((m) => m[key]));
+      return percentileSorted(val, columns[key]);
+    };
     const myMetrics = allMetrics.find((m) => String(m.id) === String(myUid));
     const W = CONFIG.WCS_WEIGHTS;
 
@@ -0,0 +1,70 @@
+/**
+ * 树模型评分 (读取 regress_weights.py --export-model 导出的节点表 JSON)
+ * 节点表格式见 scripts/ba_analysis/forest.py:
+ *   feature / threshold / left / right / default_left / value 为所有树拼接后的全局节点数组，roots 为各树根节点
+ * 与 xgboost 相同: 特征按 float32 比较，x < threshold 走左，缺失值按 default_left
+ */
+
+/**
+ * 把 JSON 转为定长数组，便于反复评分
+ */
+export function compileForest(data) {
+  return {
+    features: data.features,
+    baseMargin: data.base_margin,
+    roots: Int32Array.from(data.roots),
+    feature: Int32Array.from(data.feature),
+    threshold: Float32Array.from(data.threshold),
+    left: Int32Array.from(data.left),
+    right: Int32Array.from(data.right),
+    defaultLeft: Uint8Array.from(data.default_left),
+    value: Float32Array.from(data.value),
+  };
+}
+
+/**
+ * 加载节点表，失败时返回 null
+ */
+export async function loadForest(url) {
+  try {
+    const res = await fetch(url);
+    if (!res.ok) return null;
+    return compileForest(await res.json());
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * 单行的 margin；row 为按 forest.features 顺序排列的特征值
+ */
+function margin(forest, row) {
+  const { roots, feature, threshold, left, right, defaultLeft, value } = forest;
+  let sum = forest.baseMargin;
+  for (let t = 0; t < roots.length; t++) {
+    let node = roots[t];
+    while (feature[node] >= 0) {
+      const x = row[feature[node]];
+      const goLeft = (x === undefined || x === null || Number.isNaN(x))
+        ? defaultLeft[node] === 1
+        : Math.fround(x) < threshold[node];
+      node = goLeft ? left[node] : right[node];
+    }
+    sum += value[node];
+  }
+  return sum;
+}
+
+/**
+ * 批量获胜概率；rows 为特征值数组的数组
+ */
+export function predictProba(forest, rows) {
+  return rows.map((row) => 1 / (1 + Math.exp(-margin(forest, row))));
+}
+
+/**
+ * 按特征名从对象中取出一行 (缺失的特征记为 NaN)
+ */
+export function rowFromMetrics(forest, metrics) {
+  return forest.features.map((name) => (name in metrics ? metrics[name] : NaN));
+}
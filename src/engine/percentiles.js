@@ -0,0 +1,74 @@
+/**
+ * 百分位计算
+ * 对局内: 每个指标列排序一次，之后每次查询二分查找 O(log n)
+ * 总体参考: 加载 Python 端生成的断点表 (python -m ba_analysis percentiles)，按断点二分 + 线性插值
+ * 两者都使用中位数法处理并列: (below + equal * 0.5) / n
+ */
+
+function lowerBound(sorted, value) {
+  let lo = 0, hi = sorted.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (sorted[mid] < value) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+function upperBound(sorted, value) {
+  let lo = 0, hi = sorted.length;
+  while (lo < hi) {
+    const mid = (lo + hi) >>> 1;
+    if (sorted[mid] <= value) lo = mid + 1;
+    else hi = mid;
+  }
+  return lo;
+}
+
+/**
+ * 预排序一列数值 (非数值不参与比较，但计入总数，与逐个比较的结果一致)
+ */
+export function sortedColumn(values) {
+  const sorted = values.filter((v) => typeof v === 'number' && v === v).sort((a, b) => a - b);
+  return { sorted, n: values.length };
+}
+
+/**
+ * 在预排序列中计算百分位 (0-100)
+ */
+export function percentileSorted(value, column) {
+  if (column.n <= 1) return 50;
+  const below = lowerBound(column.sorted, value);
+  const equal = upperBound(column.sorted, value) - below;
+  return ((below + equal * 0.5) / column.n) * 100;
+}
+
+/**
+ * 按总体断点表计算百分位 (0-100)
+ * table: { values, lt, le }，lt / le 为 P(X < v) / P(X ≤ v)
+ */
+export function percentileFromTable(value, table) {
+  const { values, lt, le } = table;
+  if (!values || values.length === 0) return 50;
+  if (typeof value !== 'number' || value !== value) return 0;
+  const i = lowerBound(values, value);
+  if (i < values.length && values[i] === value) return ((lt[i] + le[i]) / 2) * 100;
+  if (i === 0) return 0;
+  if (i === values.length) return 100;
+  const frac = (value - values[i - 1]) / (values[i] - values[i - 1]);
+  return (le[i - 1] + frac * (lt[i] - le[i - 1])) * 100;
+}
+
+/**
+ * 加载断点表 JSON，失败时返回 null (调用方回退到对局内百分位)
+ */
+export async function loadPercentileTables(url) {
+  try {
+    const res = await fetch(url);
+    if (!res.ok) return null;
+    const data = await res.json();
+    return data.features || null;
+  } catch {
+    return null;
+  }
+}
@@ -7,6 +7,7 @@ import { setLang, t, updateUIStrings } from './i18n/index.js';
 import { resolvePlayerId, fetchMatchList, fetchMatchDetail, searchPlayerByName, robustFetch } from './api/fetcher.js';
 import { ensureGlobalUnitList } from './engine/units.js';
 import { processFinalData, calculateFavoriteUnits } from './engine/analyzer.js';
+import { loadPercentileTables } from './engine/percentiles.js';
 import {
   updateProgress,
   renderResults,
@@ -166,7 +167,8 @@ async function handleCheck() {
     document.getElementById('calcTimeDisplay').innerText = `Calculated: ${new Date().toLocaleString()}`;
 
     // 5. 分析 & 渲染结果
-    const result = processFinalData(uid, validMatches);
+    const reference = CONFIG.PERCENTILE_TABLE_URL ? await loadPercentileTables(CONFIG.PERCENTILE_TABLE_URL) : null;
+    const result = processFinalData(uid, validMatches, reference);
     renderResults(result);
 
     // 更新历史标题显示实际对局数